@@ -0,0 +1,153 @@
+"""
+Comparaison $1 / Protractor sur un corpus de traces.
+
+Pour chaque taille de bibliotheque de templates, reconnait tout le corpus
+avec `DollarOneRecognizer` puis `ProtractorRecognizer` et affiche la
+precision (label attendu, sur les traces dont la forme a un template),
+l'accord avec le $1 et la latence par trace.
+
+Le corpus est un JSON `[{"label": "circle", "points": [[x, y], ...]}, ...]`
+(traces enregistres) ; sans `--corpus`, un corpus synthetique bruite est
+genere a partir de `--seed` (`--write-corpus` le sauvegarde pour le rejouer).
+
+    python -m client.benchmarks.template_matchers
+    python -m client.benchmarks.template_matchers --library 3 50 200 --corpus strokes.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+
+from client.magic.recognition.dollar_one import DollarOneRecognizer
+from client.magic.recognition.protractor import ProtractorRecognizer
+from client.magic.recognition.types import Point
+
+# Formes generees ; les trois premieres ont des templates par defaut
+SHAPES = ("line", "triangle", "circle", "square", "zigzag", "star", "arc", "check")
+
+
+def _polyline(vertices: list[Point], per_edge: int = 12) -> list[Point]:
+    points: list[Point] = []
+    for (ax, ay), (bx, by) in zip(vertices, vertices[1:]):
+        for i in range(per_edge):
+            t = i / per_edge
+            points.append((ax + t * (bx - ax), ay + t * (by - ay)))
+    points.append(vertices[-1])
+    return points
+
+
+def make_stroke(shape: str, rng: random.Random, noise: float = 4.0) -> list[Point]:
+    """Trace bruite de la forme, a position, taille, rotation et sens aleatoires."""
+    r = rng.uniform(40.0, 180.0)
+    if shape == "line":
+        points = _polyline([(-r, 0.0), (r, rng.uniform(-0.1, 0.1) * r)])
+    elif shape == "triangle":
+        points = _polyline([(0.0, -r), (0.87 * r, 0.5 * r), (-0.87 * r, 0.5 * r), (0.0, -r)])
+    elif shape == "square":
+        points = _polyline([(-r, -r), (r, -r), (r, r), (-r, r), (-r, -r)])
+    elif shape == "zigzag":
+        points = _polyline([(-r, 0.0), (-0.5 * r, 0.5 * r), (0.0, 0.0), (0.5 * r, 0.5 * r), (r, 0.0)])
+    elif shape == "star":
+        points = _polyline([
+            (r * math.cos(i * 4.0 * math.pi / 5.0), r * math.sin(i * 4.0 * math.pi / 5.0)) for i in range(6)
+        ])
+    elif shape == "arc":
+        points = [(r * math.cos(i * math.pi / 40), r * math.sin(i * math.pi / 40)) for i in range(41)]
+    elif shape == "check":
+        points = _polyline([(-0.5 * r, 0.0), (0.0, 0.5 * r), (r, -0.7 * r)])
+    else:
+        start = rng.uniform(0.0, 2.0 * math.pi)
+        squash = rng.uniform(0.75, 1.0)
+        points = [
+            (r * math.cos(start + i * math.pi / 24), squash * r * math.sin(start + i * math.pi / 24))
+            for i in range(49)
+        ]
+    if rng.random() < 0.5:
+        points.reverse()
+    # Les formes ouvertes gardent une orientation proche (le $1 ne cherche que +/- 45 deg)
+    closed = shape in ("triangle", "circle", "square", "star")
+    rotation = rng.uniform(-math.pi, math.pi) if closed else rng.uniform(-0.5, 0.5)
+    cos_r, sin_r = math.cos(rotation), math.sin(rotation)
+    cx, cy = rng.uniform(0.0, 600.0), rng.uniform(0.0, 400.0)
+    return [
+        (cx + x * cos_r - y * sin_r + rng.gauss(0.0, noise), cy + x * sin_r + y * cos_r + rng.gauss(0.0, noise))
+        for x, y in points
+    ]
+
+
+def make_corpus(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {"label": shape, "points": make_stroke(shape, rng)}
+        for shape in (rng.choice(SHAPES) for _ in range(count))
+    ]
+
+
+def build_library(matcher_cls: type[DollarOneRecognizer], size: int, seed: int) -> DollarOneRecognizer:
+    """Templates par defaut (3), completes jusqu'a `size` par des traces propres de SHAPES."""
+    rng = random.Random(seed + 1)
+    matcher = matcher_cls()
+    while len(matcher.templates) < size:
+        shape = SHAPES[len(matcher.templates) % len(SHAPES)]
+        matcher.add_template(shape, make_stroke(shape, rng, noise=0.0))
+    return matcher
+
+
+def measure(matcher: DollarOneRecognizer, corpus: list[dict]) -> tuple[list[str | None], list[float]]:
+    labels: list[str | None] = []
+    timings: list[float] = []
+    for entry in corpus:
+        start = time.perf_counter()
+        result = matcher.recognize(entry["points"])
+        timings.append(time.perf_counter() - start)
+        labels.append(None if result is None else result.label)
+    return labels, timings
+
+
+def run(corpus: list[dict], library_sizes: list[int], seed: int) -> None:
+    print(f"{len(corpus)} strokes")
+    print(f"{'templates':>9} {'matcher':>10} {'accuracy':>9} {'agree $1':>9} {'mean (ms)':>10} {'p95 (ms)':>9}")
+    for size in library_sizes:
+        reference: list[str | None] = []
+        for name, matcher_cls in (("$1", DollarOneRecognizer), ("protractor", ProtractorRecognizer)):
+            matcher = build_library(matcher_cls, size, seed)
+            labels, timings = measure(matcher, corpus)
+            if not reference:
+                reference = labels
+            known = {template.label for template in matcher.templates}
+            scored = [(label, entry["label"]) for label, entry in zip(labels, corpus) if entry["label"] in known]
+            accuracy = sum(label == expected for label, expected in scored) / max(1, len(scored))
+            agreement = sum(a == b for a, b in zip(labels, reference)) / len(corpus)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            print(
+                f"{len(matcher.templates):>9} {name:>10} {accuracy:>8.1%} {agreement:>8.1%} "
+                f"{statistics.fmean(timings) * 1000:>10.3f} {p95 * 1000:>9.3f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--library", nargs="*", type=int, default=[3, 40, 200], help="tailles de bibliotheque")
+    parser.add_argument("--corpus", help="corpus JSON de traces enregistres")
+    parser.add_argument("--write-corpus", help="sauvegarde le corpus synthetique genere")
+    parser.add_argument("--strokes", type=int, default=300, help="taille du corpus synthetique")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            corpus = json.load(f)
+    else:
+        corpus = make_corpus(args.strokes, args.seed)
+        if args.write_corpus:
+            with open(args.write_corpus, "w", encoding="utf-8") as f:
+                json.dump(corpus, f)
+    run(corpus, args.library, args.seed)
+
+
+if __name__ == "__main__":
+    main()
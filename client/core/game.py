@@ -11,6 +11,7 @@ from client.graphics.game_menu import GameMenu
 from client.magic.geometry_analyzer import GeometryAnalyzer
 from client.magic.ast.ast_builder import ASTBuilder
 from client.magic.resolver.resolver import ASTResolver
+from client.magic.spell_worker import SpellWorker
 from client.network.network import NetworkClient
 from client.ui.spell_debug_overlay import SpellDebugOverlay
 from client.debug.spell_logger import SpellLogger
@@ -70,6 +71,8 @@ class Game:
         self.loading_map_id: str | None = None
         self._awaiting_map_data = False
         self._awaiting_game_state = False
+        # map_id -> (hash, map) des maps deja recues, pour ne pas les retelecharger
+        self._map_cache: dict[str, tuple[str, dict]] = {}
 
         self.game_menu:GameMenu = GameMenu(screen_width=self.screen.get_width(), screen_height=self.screen.get_height())
 
@@ -92,6 +95,15 @@ class Game:
         self.debug_mode = False
         self.spell_debug_overlay = SpellDebugOverlay(self)
         self.spell_logger = SpellLogger()
+        # Analyse des sorts hors de la boucle ; (request_id, board_revision) en attente
+        self.spell_worker = SpellWorker(
+            self.geometry_analyzer,
+            self.ast_builder,
+            self.ast_resolver,
+            self.spell_logger,
+        )
+        self.spell_worker.start()
+        self.pending_spell: tuple[int, int] | None = None
         self._server_spells: list[dict] = []
         self._spell_renderer = ActiveSpellRenderer()
 
@@ -116,6 +128,7 @@ class Game:
                 self.clock.tick(FPS)
         finally:
             self.disconnect_from_server()
+            self.spell_worker.stop()
             self.spell_logger.close()
             pygame.quit()
 
@@ -212,7 +225,8 @@ class Game:
 
     def join_the_server(self, map_id):
         if self.net is not None:
-            self.net.send_join_request(map_id, uid=self.player_uuid)
+            cached = self._map_cache.get(map_id)
+            self.net.send_join_request(map_id, uid=self.player_uuid, map_hash=cached[0] if cached else "")
 
     def _close_network_client(self):
         if self.net is None:
@@ -250,6 +264,7 @@ class Game:
         self.input_prev_mask = 0
         self.last_input_send = 0.0
         self.prev_board_pressed = False
+        self.pending_spell = None
         self._server_spells = []
 
         self.game_manager.clear()
@@ -515,23 +530,38 @@ class Game:
                 self.player.data_from_the_server(player_data)
                 continue
 
-            remote_player = self.game_manager.get_remote_player(player_id)
-            if remote_player:
-                remote_player.update_from_server(player_data)
-            else:
-                logging.warning(f"Remote player {player_id} not found in game_manager")
+            # Un joueur peut entrer dans notre zone d'interet a tout moment
+            self.update_or_create_remote_player(player_id, player_data)
 
         remote_enemy_list = msg.get("enemies", {})
         self.sync_remote_enemies(remote_enemy_list)
 
+        # Entites sorties de notre zone d'interet
+        left = msg.get("left", {})
+        for player_id in left.get("players", ()):
+            if player_id != self.client_id:
+                self.game_manager.remove_object(self.game_manager.get_remote_player(player_id))
+        for enemy_id in left.get("enemies", ()):
+            self.game_manager.remove_object(self.game_manager.get_remote_enemy(enemy_id))
+
         if "spells" in msg:
             self._server_spells = msg["spells"]
 
     def handle_map_data(self, msg: dict) -> bool:
-        try:
-            map_data: dict = msg["map"]
-        except KeyError:
-            raise KeyError(f"Map data not found in game_manager: {msg}")
+        if msg.get("cached"):
+            # Le serveur confirme que notre copie est a jour
+            cached = self._map_cache.get(msg.get("map_id"))
+            if cached is None or cached[0] != msg.get("hash"):
+                logging.warning(f"Server referenced an unknown cached map: {msg}")
+                return False
+            map_data = cached[1]
+        else:
+            try:
+                map_data: dict = msg["map"]
+            except KeyError:
+                raise KeyError(f"Map data not found in game_manager: {msg}")
+            if msg.get("hash") and map_data:
+                self._map_cache[map_data.get("id")] = (msg["hash"], map_data)
         if not map_data:
             logging.warning("No map data received")
             return False
@@ -666,7 +696,8 @@ class Game:
                 f"active_points={magical_snapshot.get('active_points', 0)} "
                 f"primitives={magical_snapshot.get('primitives', 0)} "
                 f"order_fx={magical_snapshot.get('order_effects', 0)} "
-                f"clear_waiting={1 if magical_snapshot.get('clear_waiting', False) else 0}"
+                f"clear_waiting={1 if magical_snapshot.get('clear_waiting', False) else 0} "
+                f"pending={1 if magical_snapshot.get('pending', False) else 0}"
             )
 
         font = self._get_font(18)
@@ -38,6 +38,7 @@ class MagicalDraw:
             "active_points": len(self._points),
             "primitives": len(self._magical_graph.iter_primitives()),
             "clear_waiting": self._clear_at is not None,
+            "pending": self._pending,
         }
 
     def __init__(
@@ -67,6 +68,10 @@ class MagicalDraw:
         self._last_spell_cast_sound_ms = -100000
         self._stroke_length = 0.0
         self._last_segment_speed = 0.0
+        # Incremente a chaque trace valide / effacement : date le contenu du tableau
+        self.board_revision = 0
+        # Analyse en cours dans le SpellWorker
+        self._pending = False
 
     def resize_surface(self, size: tuple[int, int]) -> None:
         width = max(1, int(size[0]))
@@ -175,11 +180,16 @@ class MagicalDraw:
             dt = current_time - last[1]
             self._update_magic_audio(point, current_time, segment_length, dt)
 
-    def validate_points_to_board(self) -> None:
+    def validate_points_to_board(self) -> Stroke | None:
+        """Range le trace en cours sur le tableau ; le renvoie s'il y en avait un."""
+        stroke = None
         if self._points:
-            self._point_list.append(self._points)
+            stroke = self._points
+            self._point_list.append(stroke)
             self._points = []
+            self.board_revision += 1
         self._stop_magic_audio()
+        return stroke
 
     def clear_board(self) -> None:
         self._magical_graph = GraphGeo()
@@ -187,8 +197,16 @@ class MagicalDraw:
         self._point_list = []
         self._points = []
         self._clear_at = None
+        self._pending = False
+        self.board_revision += 1
         self._stop_magic_audio()
 
+    def set_pending(self, pending: bool) -> None:
+        self._pending = pending
+
+    def is_pending(self) -> bool:
+        return self._pending
+
     def play_spell_cast_sound(self) -> None:
         if not self._spell_cast_sound:
             return
@@ -222,6 +240,9 @@ class MagicalDraw:
             self.cancel_clear()
             return True
 
+        if self._pending:
+            return True
+
         if self._clear_at is None:
             return bool(self._point_list or self._points or self.has_primitives())
 
@@ -371,5 +392,22 @@ class MagicalDraw:
                 drawer(primitive)
             simplified_stroke = simplified_stroke.child
 
+        if self._pending:
+            self._draw_pending_indicator(to_draw, now)
+
         self._recognition_effect_renderer.draw(self.surface, now)
         return self.surface
+
+    def _draw_pending_indicator(self, strokes: list[Stroke], now: float) -> None:
+        """Arc tournant au centre des traces pendant l'analyse du sort."""
+        points = [sample[0] for stroke in strokes for sample in stroke]
+        if not points:
+            return
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        center = ((min(xs) + max(xs)) / 2.0, (min(ys) + max(ys)) / 2.0)
+        radius = 14
+        rect = pygame.Rect(int(center[0] - radius), int(center[1] - radius), radius * 2, radius * 2)
+        start = now * 6.0
+        pygame.draw.arc(self.surface, (170, 70, 255, 140), rect, start, start + 4.2, 5)
+        pygame.draw.arc(self.surface, (245, 235, 255, 210), rect, start, start + 4.2, 2)
@@ -3,6 +3,42 @@ import pygame
 from client.entities.player import IN_BOARD, IN_DRAWING
 
 
+def _apply_spell_results(game, current_time):
+    """Lance les sorts dont l'analyse vient de se terminer."""
+    magical_draw = game.player.magical_draw
+    for result in game.spell_worker.poll():
+        if game.pending_spell is None or result.request_id != game.pending_spell[0]:
+            # Remplacee par une demande plus recente
+            continue
+        revision = game.pending_spell[1]
+        game.pending_spell = None
+        magical_draw.set_pending(False)
+        if revision != magical_draw.board_revision:
+            # Tableau modifie ou efface pendant l'analyse : resultat perime
+            continue
+
+        for primitive in result.primitives:
+            magical_draw.add_node(primitive)
+
+        if result.primitives:
+            if result.net_spec is not None:
+                game.cast_ast_spell(result.net_spec)
+            if result.debug_data is not None:
+                game.spell_debug_overlay.set_data(result.debug_data)
+            magical_draw.clear_board()
+            magical_draw.cancel_clear()
+        else:
+            magical_draw.schedule_clear(current_time)
+
+
+def _validate_stroke(game):
+    """Valide le trace en cours et lance sa reconnaissance sans attendre le relachement."""
+    magical_draw = game.player.magical_draw
+    stroke = magical_draw.validate_points_to_board()
+    if stroke is not None:
+        game.spell_worker.submit_stroke(stroke, len(magical_draw.get_strokes()) - 1)
+
+
 def playing(game, tick_rate):
     if game.start_time is None:
         game.start_time = pygame.time.get_ticks()
@@ -25,72 +61,16 @@ def playing(game, tick_rate):
                 pressure=inp.get("pressure"),
             )
         else:
-            game.player.magical_draw.validate_points_to_board()
+            _validate_stroke(game)
     elif game.prev_board_pressed:
-        game.player.magical_draw.validate_points_to_board()
-        primitives = game.geometry_analyzer.analyze(game.player.magical_draw.get_strokes())
-        has_primitive = False
-        if primitives:
-            if isinstance(primitives, list):
-                for primitive in primitives:
-                    game.player.magical_draw.add_node(primitive)
-                has_primitive = len(primitives) > 0
-            else:
-                game.player.magical_draw.add_node(primitives)
-                has_primitive = True
-
-        if has_primitive:
-            import logging
-            import time
-            from client.magic.grammar import parse as grammar_parse, build_intent, describe
-            from client.magic.resolver.resolved_spell import (
-                intent_to_network_spec,
-                params_to_network_spec,
-            )
-            from client.ui.spell_debug_overlay import SpellDebugData
-            ast = game.ast_builder.build(game.player.magical_draw._magical_graph)
-            resolved = game.ast_resolver.resolve(ast)
-
-            # Grammaire : la racine doit etre un cercle (phrase/fonction/zone
-            # de lecture). Tout dessin sans cercle englobant est rejete.
-            parse_tree = grammar_parse(ast)
-            net_spec = {}
-            if parse_tree is None:
-                logging.info("Spell rejected: no root circle (grammaire)")
-            else:
-                intent = build_intent(parse_tree)
-                logging.debug(
-                    "Grammaire parse:\n%s\nintent=%s",
-                    describe(parse_tree),
-                    None if intent is None else f"{len(intent.phases)} phase(s) element={intent.element}",
-                )
-                if intent is not None:
-                    # Composition reconnue -> format multi-phase s2.
-                    net_spec = intent_to_network_spec(intent)
-                else:
-                    # Cercle present mais composition non reconnue :
-                    # fallback sur le resolver geometrique emergent (format s).
-                    net_spec = params_to_network_spec(resolved)
-                game.cast_ast_spell(net_spec)
-
-            debug_data = SpellDebugData(
-                primitives=list(primitives) if isinstance(primitives, list) else [primitives],
-                spatial_relations=list(ast.spatial_relations),
-                ast=ast,
-                pass1_bags=dict(game.ast_resolver.last_pass1_bags),
-                pass2_bags=dict(game.ast_resolver.last_pass2_bags),
-                cross_entries=list(game.ast_resolver.last_cross_entries),
-                resolved_params=dict(resolved.params),
-                network_spec=dict(net_spec),
-                timestamp=time.time(),
-            )
-            game.spell_debug_overlay.set_data(debug_data)
-            game.spell_logger.log_cast(debug_data)
+        magical_draw = game.player.magical_draw
+        _validate_stroke(game)
+        # Analyse dans le SpellWorker ; le resultat arrive par _apply_spell_results
+        request_id = game.spell_worker.submit(magical_draw.get_strokes())
+        game.pending_spell = (request_id, magical_draw.board_revision)
+        magical_draw.set_pending(True)
 
-            game.player.magical_draw.clear_board()
-            game.player.magical_draw.cancel_clear()
-        else:
-            game.player.magical_draw.schedule_clear(current_time)
+    _apply_spell_results(game, current_time)
 
     game.prev_board_pressed = board_pressed
 
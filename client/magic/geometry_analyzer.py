@@ -26,6 +26,14 @@ class GeometryAnalyzer:
     def analyze(self, strokes: Sequence[Sequence[Any]]) -> list[Any]:
         return self._engine.recognize_strokes(strokes)
 
+    def add_stroke(self, stroke: Sequence[Any], stroke_index: int | None = None) -> None:
+        """Reconnait un trace des sa validation ; `analyze` le reutilisera."""
+        self._engine.add_stroke(stroke, stroke_index)
+
+    def recognition_cache_stats(self) -> dict[str, int]:
+        """Compteurs du cache de decisions par trace (entries, hits, misses, evictions)."""
+        return self._engine.result_cache.stats()
+
     def register_shape(
         self,
         shape: ShapeDefinition,
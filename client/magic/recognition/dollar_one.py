@@ -4,9 +4,10 @@ import math
 from dataclasses import dataclass
 from typing import Sequence
 
+import numpy as np
+
 from client.magic.recognition.preprocessing import (
     bounding_box,
-    distance_at_best_angle,
     euclidean_distance,
     indicative_angle,
     path_length,
@@ -26,10 +27,21 @@ class DollarOneTemplate:
     is_closed: bool
 
 
+# Nombre d'or de la recherche d'angle ($1)
+_PHI = 0.5 * (-1.0 + math.sqrt(5.0))
+# En dessous, chercher tous les couples d'un coup coute moins que l'elagage
+_PRUNE_MIN_PAIRS = 256
+
+
 class DollarOneRecognizer:
     """
     Implementation du $1 Unistroke Recognizer.
     Référence: Wobbrock et al. (UIST 2007).
+
+    Les templates sont empiles par (fermeture, nombre de points) dans des
+    tableaux (T, N, 2) ; le candidat est compare a tous les templates, et
+    pour un trace ferme a tous ses decalages et sens de parcours, en une
+    seule recherche d'angle (golden section) menee en parallele sur numpy.
     """
 
     def __init__(
@@ -49,6 +61,9 @@ class DollarOneRecognizer:
         self.closed_angle_range = math.radians(closed_angle_range_deg)
         self.closed_shift_steps = max(4, closed_shift_steps)
         self.templates: list[DollarOneTemplate] = []
+        # (ferme, nb de points) -> (indices dans self.templates, points (T, N, 2))
+        self._banks: dict[tuple[bool, int], tuple[np.ndarray, np.ndarray]] = {}
+        self._banked_count = 0
         if register_default_templates:
             self.register_default_templates()
 
@@ -67,39 +82,40 @@ class DollarOneRecognizer:
         if not candidate:
             return None
 
-        best_label = ""
-        best_distance = float("inf")
-
-        for template in self.templates:
-            if template.is_closed != closed:
+        candidate_array = np.asarray(candidate, dtype=np.float64)
+        distances = np.full(len(self.templates), np.inf)
+        for (bank_closed, length), (indices, bank) in self._template_banks().items():
+            if bank_closed != closed:
                 continue
-
+            count = min(len(candidate_array), length)
             if closed:
-                distance = self._best_closed_distance(candidate, template.points)
+                distances[indices] = self._best_closed_distances(candidate_array[:count], bank[:, :count])
             else:
-                distance = distance_at_best_angle(
-                    candidate,
-                    template.points,
-                    angle_range=self.angle_range,
-                    angle_precision=self.angle_precision,
-                )
-            if distance < best_distance:
-                best_distance = distance
-                best_label = template.label
-
+                distances[indices] = self._best_angle_distances(
+                    candidate_array[None, :count],
+                    bank[:, :count],
+                    self.angle_range,
+                )[:, 0]
+
+        # Premier minimum dans l'ordre d'enregistrement, comme la boucle scalaire
+        best_index = int(np.argmin(distances))
+        best_distance = float(distances[best_index])
+        best_label = self.templates[best_index].label if math.isfinite(best_distance) else ""
         if not best_label:
             return None
 
-        half_diagonal = 0.5 * math.sqrt(2 * (self.square_size ** 2))
-        score = max(0.0, 1.0 - (best_distance / half_diagonal))
-
         return RecognizerResult(
             label=best_label,
-            score=score,
+            score=self._score(best_distance),
             source="$1",
             payload={"distance": best_distance},
         )
 
+    def _score(self, distance: float) -> float:
+        """Distance moyenne -> score [0, 1] (0 a la demi-diagonale du carre de normalisation)."""
+        half_diagonal = 0.5 * math.sqrt(2 * (self.square_size ** 2))
+        return max(0.0, 1.0 - (distance / half_diagonal))
+
     def _normalize(self, points: Sequence[Point], is_closed: bool = False) -> list[Point]:
         if len(points) < 2:
             return []
@@ -113,32 +129,118 @@ class DollarOneRecognizer:
         normalized = translate_to_origin(normalized)
         return normalized
 
-    def _best_closed_distance(self, candidate: list[Point], template: list[Point]) -> float:
-        if not candidate or not template:
-            return float("inf")
-
-        count = min(len(candidate), len(template))
-        if count < 3:
-            return float("inf")
-
-        cand = list(candidate[:count])
-        templ = list(template[:count])
-        shift_step = max(1, count // self.closed_shift_steps)
-        best = float("inf")
-
-        for variant in (cand, list(reversed(cand))):
-            for shift in range(0, count, shift_step):
-                shifted = variant[shift:] + variant[:shift]
-                distance = distance_at_best_angle(
-                    shifted,
-                    templ,
-                    angle_range=self.closed_angle_range,
-                    angle_precision=self.angle_precision,
+    def _template_banks(self) -> dict[tuple[bool, int], tuple[np.ndarray, np.ndarray]]:
+        """Empile les templates par (fermeture, nombre de points) ; refait si la liste a change."""
+        if self._banked_count != len(self.templates):
+            groups: dict[tuple[bool, int], list[int]] = {}
+            for index, template in enumerate(self.templates):
+                groups.setdefault((template.is_closed, len(template.points)), []).append(index)
+            self._banks = {
+                key: (
+                    np.asarray(indices, dtype=np.intp),
+                    np.asarray([self.templates[index].points for index in indices], dtype=np.float64),
                 )
-                if distance < best:
-                    best = distance
-
-        return best
+                for key, indices in groups.items()
+            }
+            self._banked_count = len(self.templates)
+        return self._banks
+
+    def _best_closed_distances(self, candidate: np.ndarray, templates: np.ndarray) -> np.ndarray:
+        """Distance de chaque template au meilleur decalage / sens / angle du candidat ferme."""
+        if len(candidate) < 3:
+            return np.full(len(templates), np.inf)
+        variants = self._closed_variants(candidate)
+        return self._best_angle_distances(variants, templates, self.closed_angle_range).min(axis=1)
+
+    def _closed_variants(self, candidate: np.ndarray) -> np.ndarray:
+        """Points de depart decales (closed_shift_steps) dans les deux sens de parcours : (V, N, 2)."""
+        count = len(candidate)
+        shift_step = max(1, count // self.closed_shift_steps)
+        shifts = np.arange(0, count, shift_step)
+        order = (shifts[:, None] + np.arange(count)[None, :]) % count
+        return np.concatenate((candidate[order], candidate[::-1][order]))
+
+    def _best_angle_distances(self, variants: np.ndarray, templates: np.ndarray, angle_range: float) -> np.ndarray:
+        """
+        Distance a l'angle trouve par la recherche du $1 pour chaque couple (template, variante).
+        variants: (V, N, 2), memes points dans des ordres differents (donc meme centre) ;
+        templates: (T, N, 2) -> distances (T, V).
+
+        |R(a).d + e| >= ||d| - |e|| quel que soit l'angle : les couples dont ce
+        minorant depasse deja la distance du couple le plus prometteur ne
+        peuvent pas gagner et valent inf sans etre cherches.
+        """
+        center = variants[0].mean(axis=0)
+        offsets = variants - center
+        gaps = center - templates
+        template_count, variant_count = len(templates), len(variants)
+        if template_count * variant_count < _PRUNE_MIN_PAIRS:
+            lane_t, lane_v = np.divmod(np.arange(template_count * variant_count), variant_count)
+            distances = self._golden_section(offsets[lane_v], gaps[lane_t], angle_range)
+            return distances.reshape(template_count, variant_count)
+
+        bound = np.abs(
+            np.hypot(offsets[..., 0], offsets[..., 1])[None, :, :]
+            - np.hypot(gaps[..., 0], gaps[..., 1])[:, None, :]
+        ).mean(axis=-1).ravel()
+        first_t, first_v = divmod(int(np.argmin(bound)), variant_count)
+        reference = self._golden_section(offsets[[first_v]], gaps[[first_t]], angle_range)[0]
+
+        lanes = np.flatnonzero(bound <= reference * (1.0 + 1e-9))
+        lane_t, lane_v = np.divmod(lanes, variant_count)
+        distances = np.full(template_count * variant_count, np.inf)
+        distances[lanes] = self._golden_section(offsets[lane_v], gaps[lane_t], angle_range)
+        return distances.reshape(template_count, variant_count)
+
+    def _golden_section(self, offsets: np.ndarray, gaps: np.ndarray, angle_range: float) -> np.ndarray:
+        """
+        Recherche d'angle du $1 (golden section) menee en parallele sur L couples.
+        offsets: points du candidat moins son centre c, gaps: c - points du template,
+        tous deux (L, N, 2) -> distances (L,).  Chaque couple suit exactement les
+        pas de la recherche scalaire.
+        """
+        # |R(a).d + e|^2 = |d|^2 + |e|^2 + 2 R(a).d . e = k + cos(a) * p + sin(a) * q
+        dx, dy = offsets[..., 0], offsets[..., 1]
+        ex, ey = 2.0 * gaps[..., 0], 2.0 * gaps[..., 1]
+        k = dx * dx + dy * dy + 0.25 * (ex * ex + ey * ey)
+        p = dx * ex + dy * ey
+        q = dx * ey - dy * ex
+        squared = np.empty_like(k)
+        term = np.empty_like(k)
+
+        def distance_at(angles: np.ndarray) -> np.ndarray:
+            np.multiply(p, np.cos(angles)[:, None], out=squared)
+            np.multiply(q, np.sin(angles)[:, None], out=term)
+            np.add(squared, term, out=squared)
+            np.add(squared, k, out=squared)
+            np.maximum(squared, 0.0, out=squared)
+            np.sqrt(squared, out=squared)
+            return squared.mean(axis=-1)
+
+        a = np.full(len(offsets), -angle_range)
+        b = np.full(len(offsets), angle_range)
+        x1 = _PHI * a + (1 - _PHI) * b
+        x2 = (1 - _PHI) * a + _PHI * b
+        f1 = distance_at(x1)
+        f2 = distance_at(x2)
+
+        active = np.abs(b - a) > self.angle_precision
+        while active.any():
+            left = active & (f1 < f2)
+            right = active & ~left
+            b = np.where(left, x2, b)
+            a = np.where(right, x1, a)
+            x2, x1 = np.where(left, x1, x2), np.where(right, x2, x1)
+            f2, f1 = np.where(left, f1, f2), np.where(right, f2, f1)
+            probe = np.where(left, _PHI * a + (1 - _PHI) * b, (1 - _PHI) * a + _PHI * b)
+            f_probe = distance_at(probe)
+            x1 = np.where(left, probe, x1)
+            f1 = np.where(left, f_probe, f1)
+            x2 = np.where(right, probe, x2)
+            f2 = np.where(right, f_probe, f2)
+            active = np.abs(b - a) > self.angle_precision
+
+        return np.minimum(f1, f2)
 
     @staticmethod
     def _canonicalize_closed_path(points: Sequence[Point]) -> list[Point]:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from dataclasses import fields
 from typing import Any, Sequence
 
 from client.magic.primitives import Segment
@@ -20,6 +21,8 @@ from client.magic.recognition.preprocessing import (
     rdp,
     turn_angle,
 )
+from client.magic.recognition.protractor import ProtractorRecognizer
+from client.magic.recognition.result_cache import MISSING, RecognitionResultCache
 from client.magic.recognition.shape_registry import ShapeRegistry
 from client.magic.recognition.types import (
     HeuristicDetector,
@@ -28,8 +31,14 @@ from client.magic.recognition.types import (
     RecognitionConfig,
     RecognizerResult,
     ShapeDefinition,
+    StrokeAnalysis,
 )
 
+TEMPLATE_MATCHERS: dict[str, type[DollarOneRecognizer]] = {
+    "dollar_one": DollarOneRecognizer,
+    "protractor": ProtractorRecognizer,
+}
+
 
 class PrimitiveRecognitionEngine:
     """
@@ -38,6 +47,15 @@ class PrimitiveRecognitionEngine:
     - agrégation de candidats (heuristique + $1)
     - fusion/scoring via registre de formes
     - construction de primitive via builder dédié
+
+    Chaque trace est analyse une fois : `add_stroke` l'analyse des sa
+    validation et le met en cache, `recognize_strokes` reutilise les traces
+    deja vus (meme objet) et ne relance que la composition multi-traces.
+
+    La decision fusionnee d'un trace est aussi cachee par empreinte de forme
+    (`result_cache`) : un signe redessine ne relance que son builder.  Ce
+    cache et les analyses par trace sont vides a chaque enregistrement de
+    forme, regle ou template ; le cache l'est aussi quand la config change.
     """
 
     def __init__(
@@ -50,7 +68,7 @@ class PrimitiveRecognitionEngine:
     ):
         self.config = config or RecognitionConfig()
         self.heuristic = heuristic or HeuristicPrimitiveRecognizer()
-        self.dollar_one = dollar_one or DollarOneRecognizer()
+        self.dollar_one = dollar_one or self._build_template_matcher(self.config.template_matcher)
         self.shape_registry = shape_registry or build_default_shape_registry(self.config)
         self._fusion_policy = CandidateFusionPolicy(
             shape_registry=self.shape_registry,
@@ -69,6 +87,21 @@ class PrimitiveRecognitionEngine:
         for label, composer in default_composers:
             self.register_complex_composer(label, composer)
 
+        # Traces du tableau courant, dans l'ordre ; reconnus une seule fois
+        self._stroke_cache: list[StrokeAnalysis] = []
+        self.result_cache = RecognitionResultCache(
+            max_entries=self.config.result_cache_size,
+            quantization=self.config.result_cache_quantization,
+        )
+        self._result_cache_config = self._config_signature()
+
+    @staticmethod
+    def _build_template_matcher(name: str) -> DollarOneRecognizer:
+        matcher = TEMPLATE_MATCHERS.get(name)
+        if matcher is None:
+            raise ValueError(f"Unknown template matcher {name!r} (expected one of {sorted(TEMPLATE_MATCHERS)})")
+        return matcher()
+
     def register_shape(
         self,
         shape: ShapeDefinition,
@@ -86,6 +119,7 @@ class PrimitiveRecognitionEngine:
         if dollar_templates:
             for template in dollar_templates:
                 self.dollar_one.add_template(shape.label, template)
+        self.reset_strokes()
 
     def register_heuristic_rule(
         self,
@@ -95,40 +129,80 @@ class PrimitiveRecognitionEngine:
         requires_closed: bool | None = None,
     ) -> None:
         self.heuristic.register_rule(label=label, detector=detector, requires_closed=requires_closed)
+        self.reset_strokes()
 
     def register_dollar_template(self, label: str, points: Sequence[Point]) -> None:
         canonical = self.shape_registry.canonical_label(label) or label.strip().lower()
         self.dollar_one.add_template(canonical, points)
+        self.reset_strokes()
 
     def register_complex_composer(self, label: str, composer: ComplexShapeComposer) -> None:
         self._complex_engine.register_composer(label, composer)
 
+    def add_stroke(self, raw_stroke: Sequence[Any], stroke_index: int | None = None) -> StrokeAnalysis:
+        """
+        Analyse un trace valide et le range a `stroke_index` (par defaut a la
+        suite) ; les traces mis en cache apres cet index sont oublies.
+        """
+        cache = self._stroke_cache
+        if stroke_index is None:
+            stroke_index = len(cache)
+        if stroke_index < len(cache) and cache[stroke_index].raw_stroke is raw_stroke:
+            return cache[stroke_index]
+        del cache[stroke_index:]
+        analysis = self._analyze_stroke(raw_stroke)
+        if stroke_index == len(cache):
+            cache.append(analysis)
+        return analysis
+
+    def reset_strokes(self) -> None:
+        """Oublie les analyses par trace et les decisions cachees (formes ou templates modifies)."""
+        self._stroke_cache = []
+        self.result_cache.clear()
+
     def recognize_strokes(self, strokes: Sequence[Sequence[Any]]) -> list[Any]:
+        """Primitives du tableau `strokes` ; seuls les traces absents du cache sont analyses."""
+        cache = self._stroke_cache
+        for stroke_index, raw_stroke in enumerate(strokes):
+            if stroke_index < len(cache):
+                if cache[stroke_index].raw_stroke is raw_stroke:
+                    continue
+                cache[stroke_index] = self._analyze_stroke(raw_stroke)
+            else:
+                cache.append(self._analyze_stroke(raw_stroke))
+        del cache[len(strokes):]
+        return self.compose_strokes()
+
+    def compose_strokes(self) -> list[Any]:
+        """Composition multi-traces sur les analyses en cache."""
         normalized_strokes: dict[int, NormalizedStroke] = {}
         primitive_entries: list[PrimitiveEntry] = []
-
-        for stroke_index, raw_stroke in enumerate(strokes):
-            stroke = normalize_stroke(
-                raw_stroke,
-                min_sample_distance=self.config.min_sample_distance,
-                closed_ratio=self.config.closed_ratio,
-            )
-            if stroke is None:
+        for stroke_index, analysis in enumerate(self._stroke_cache):
+            if analysis.stroke is None:
                 continue
-            normalized_strokes[stroke_index] = stroke
-            primitive = self._recognize_normalized_stroke(stroke)
-            if self._should_split_stroke_into_segments(stroke, primitive):
-                split_segments = self._decompose_stroke_into_segments(stroke)
-                if split_segments:
-                    for segment in split_segments:
-                        primitive_entries.append(PrimitiveEntry(primitive=segment, stroke_index=stroke_index))
-                    continue
-            if primitive is not None:
+            normalized_strokes[stroke_index] = analysis.stroke
+            for primitive in analysis.primitives:
                 primitive_entries.append(PrimitiveEntry(primitive=primitive, stroke_index=stroke_index))
 
         merged_entries = self._complex_engine.compose(primitive_entries, normalized_strokes)
         return [entry.primitive for entry in merged_entries]
 
+    def _analyze_stroke(self, raw_stroke: Sequence[Any]) -> StrokeAnalysis:
+        stroke = normalize_stroke(
+            raw_stroke,
+            min_sample_distance=self.config.min_sample_distance,
+            closed_ratio=self.config.closed_ratio,
+        )
+        if stroke is None:
+            return StrokeAnalysis(raw_stroke=raw_stroke, stroke=None)
+        primitive = self._recognize_normalized_stroke(stroke)
+        if self._should_split_stroke_into_segments(stroke, primitive):
+            split_segments = self._decompose_stroke_into_segments(stroke)
+            if split_segments:
+                return StrokeAnalysis(raw_stroke=raw_stroke, stroke=stroke, primitives=list(split_segments))
+        primitives = [primitive] if primitive is not None else []
+        return StrokeAnalysis(raw_stroke=raw_stroke, stroke=stroke, primitives=primitives)
+
     def recognize_stroke(self, raw_stroke: Sequence[Any]) -> Any | None:
         stroke = normalize_stroke(
             raw_stroke,
@@ -140,14 +214,35 @@ class PrimitiveRecognitionEngine:
         return self._recognize_normalized_stroke(stroke)
 
     def _recognize_normalized_stroke(self, stroke: NormalizedStroke) -> Any | None:
-        heuristic_candidates = self.heuristic.recognize(stroke)
-        dollar_candidate = self.dollar_one.recognize(stroke.points, is_closed=stroke.is_closed)
-        merged = self._fusion_policy.merge(stroke, heuristic_candidates, dollar_candidate)
+        key = self.result_cache.key_for(stroke)
+        if key is None:
+            merged = self._fuse_candidates(stroke)
+        else:
+            config = self._config_signature()
+            if config != self._result_cache_config:
+                # Seuils/poids modifies depuis la mise en cache
+                self.result_cache.clear()
+                self._result_cache_config = config
+            merged = self.result_cache.get(key, stroke)
+            if merged is MISSING:
+                merged = self._fuse_candidates(stroke)
+                self.result_cache.put(key, stroke, merged)
         if merged is None:
             return None
 
         return self._build_primitive(stroke, merged)
 
+    def _fuse_candidates(self, stroke: NormalizedStroke) -> RecognizerResult | None:
+        heuristic_candidates = self.heuristic.recognize(stroke)
+        dollar_candidate = self.dollar_one.recognize(stroke.points, is_closed=stroke.is_closed)
+        return self._fusion_policy.merge(stroke, heuristic_candidates, dollar_candidate)
+
+    def _config_signature(self) -> tuple:
+        return tuple(
+            tuple(sorted(value.items())) if isinstance(value, dict) else value
+            for value in (getattr(self.config, f.name) for f in fields(self.config))
+        )
+
     def _should_split_stroke_into_segments(
         self,
         stroke: NormalizedStroke,
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import math
+from typing import Sequence
+
+import numpy as np
+
+from client.magic.recognition.dollar_one import DollarOneRecognizer
+from client.magic.recognition.types import Point, RecognizerResult
+
+
+class ProtractorRecognizer(DollarOneRecognizer):
+    """
+    Variante Protractor du $1.
+    Référence: Li (CHI 2010).
+
+    Memes templates et meme normalisation que `DollarOneRecognizer`, mais
+    la rotation optimale est calculee en forme close : pour des traces
+    vus comme des vecteurs de 2N coordonnees, la similarite cosinus a
+    l'angle a vaut (A cos a + B sin a) / (|c| |t|), maximale en
+    a = atan2(B, A).  A et B pour tous les templates et toutes les
+    variantes d'un trace ferme sont deux produits matriciels, au lieu
+    d'une recherche d'angle par couple.
+
+    Le classement se fait a la similarite ; le score rendu reste celui du
+    $1 (distance moyenne a l'angle retenu) pour garder les seuils et les
+    poids de fusion.
+    """
+
+    def recognize(self, points: Sequence[Point], is_closed: bool | None = None) -> RecognizerResult | None:
+        if len(points) < 2 or not self.templates:
+            return None
+
+        closed = self._is_closed_path(points) if is_closed is None else is_closed
+        candidate = self._normalize(points, is_closed=closed)
+        if not candidate:
+            return None
+
+        candidate_array = np.asarray(candidate, dtype=np.float64)
+        angle_range = self.closed_angle_range if closed else self.angle_range
+        best: tuple[float, int, np.ndarray, np.ndarray, np.ndarray, float] | None = None
+        for (bank_closed, length), (indices, bank) in self._template_banks().items():
+            if bank_closed != closed:
+                continue
+            count = min(len(candidate_array), length)
+            if closed and count < 3:
+                continue
+            # Rotation autour du centre du candidat, comme le $1
+            center = candidate_array[:count].mean(axis=0)
+            offsets = candidate_array[:count] - center
+            variants = self._closed_variants(offsets) if closed else offsets[None]
+            templates = bank[:, :count]
+
+            similarities, angles = self._best_similarities(
+                variants,
+                templates - templates.mean(axis=1, keepdims=True),
+                angle_range,
+            )
+            flat = int(np.argmax(similarities))
+            template_pos, variant_pos = divmod(flat, len(variants))
+            similarity = float(similarities[template_pos, variant_pos])
+            index = int(indices[template_pos])
+            # Premier maximum dans l'ordre d'enregistrement
+            if best is None or similarity > best[0] or (similarity == best[0] and index < best[1]):
+                best = (
+                    similarity,
+                    index,
+                    variants[variant_pos],
+                    center,
+                    templates[template_pos],
+                    float(angles[template_pos, variant_pos]),
+                )
+
+        if best is None:
+            return None
+        similarity, index, offsets, center, template, angle = best
+        label = self.templates[index].label
+        if not label:
+            return None
+
+        distance = self._distance_at_angle(offsets, center, template, angle)
+        return RecognizerResult(
+            label=label,
+            score=self._score(distance),
+            source="protractor",
+            payload={"distance": distance, "similarity": similarity, "angle": angle},
+        )
+
+    @staticmethod
+    def _best_similarities(
+        variants: np.ndarray,
+        templates: np.ndarray,
+        angle_range: float,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Similarite cosinus a l'angle optimal (borne a +/- angle_range) et cet angle,
+        pour chaque couple (template, variante) -> deux tableaux (T, V).
+        Variantes et templates sont centres sur l'origine.
+        """
+        flat_variants = variants.reshape(len(variants), -1)
+        flat_templates = templates.reshape(len(templates), -1)
+        # t . R(a)c = cos(a) (t . c) + sin(a) (t . c_perp), c_perp = (-cy, cx)
+        perpendicular = np.empty_like(variants)
+        perpendicular[..., 0] = -variants[..., 1]
+        perpendicular[..., 1] = variants[..., 0]
+        a = flat_templates @ flat_variants.T
+        b = flat_templates @ perpendicular.reshape(len(variants), -1).T
+
+        angles = np.clip(np.arctan2(b, a), -angle_range, angle_range)
+        norms = np.outer(np.linalg.norm(flat_templates, axis=1), np.linalg.norm(flat_variants, axis=1))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            similarities = (a * np.cos(angles) + b * np.sin(angles)) / norms
+        return np.nan_to_num(similarities, nan=-1.0), angles
+
+    @staticmethod
+    def _distance_at_angle(offsets: np.ndarray, center: np.ndarray, template: np.ndarray, angle: float) -> float:
+        """Distance moyenne du $1 entre le candidat (offsets autour de `center`) tourne de `angle` et le template."""
+        cos_a, sin_a = math.cos(angle), math.sin(angle)
+        rx = offsets[:, 0] * cos_a - offsets[:, 1] * sin_a + center[0]
+        ry = offsets[:, 0] * sin_a + offsets[:, 1] * cos_a + center[1]
+        return float(np.hypot(rx - template[:, 0], ry - template[:, 1]).mean())
@@ -0,0 +1,144 @@
+"""
+Cache LRU des decisions de reconnaissance d'un trace.
+
+Les joueurs redessinent sans cesse les memes signes : la cle est une
+empreinte du trace reechantillonne, ramene a son coin de bbox et a sa
+diagonale puis quantifie, donc independante de la position et de la taille.
+La valeur est la decision fusionnee (label, score, source, payload) ; le
+payload contient des coordonnees absolues (centre, sommets, rayon...), il
+est stocke dans le repere du trace et replace sur le nouveau trace a chaque
+lecture.  Seul le builder de la primitive est relance sur un hit.
+
+Sous `SCALE_INVARIANT_DIAGONAL` pixels, les heuristiques ont des seuils
+planchers absolus (longueur minimale d'arete, de jambe...) : les petits
+traces sont alors aussi distingues par tranche de taille.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from client.magic.recognition.preprocessing import resample
+from client.magic.recognition.types import NormalizedStroke, RecognizerResult
+
+FINGERPRINT_SAMPLES = 32
+SCALE_INVARIANT_DIAGONAL = 160.0
+SCALE_BAND = 16.0
+# Cles de payload exprimees en pixels (les autres scalaires sont des ratios/angles)
+LENGTH_PAYLOAD_KEYS = frozenset({"radius"})
+
+# Absence de cle (None est une decision cachee : "aucune primitive")
+MISSING = object()
+
+
+@dataclass(slots=True)
+class CachedDecision:
+    label: str
+    score: float
+    source: str
+    payload: dict[str, Any]
+
+
+def _is_point(value: Any) -> bool:
+    return (
+        isinstance(value, (tuple, list))
+        and len(value) == 2
+        and all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in value)
+    )
+
+
+def _map_payload(value: Any, key: str | None, origin: tuple[float, float], scale: float, inverse: bool) -> Any:
+    """Change de repere les points et longueurs d'un payload (recursif)."""
+    ox, oy = origin
+    if _is_point(value):
+        if inverse:
+            return (ox + value[0] * scale, oy + value[1] * scale)
+        return ((value[0] - ox) / scale, (value[1] - oy) / scale)
+    if isinstance(value, dict):
+        return {k: _map_payload(v, k, origin, scale, inverse) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_map_payload(item, None, origin, scale, inverse) for item in value]
+    if key in LENGTH_PAYLOAD_KEYS and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value * scale if inverse else value / scale
+    return value
+
+
+class RecognitionResultCache:
+    """
+    LRU borne a `max_entries` decisions (cle et valeur de taille fixe, la
+    memoire l'est donc aussi).  `max_entries <= 0` desactive le cache.
+    """
+
+    def __init__(self, max_entries: int = 512, quantization: float = 0.03):
+        self.max_entries = int(max_entries)
+        self.quantization = max(1e-6, float(quantization))
+        self._entries: OrderedDict[tuple, CachedDecision | None] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key_for(self, stroke: NormalizedStroke) -> tuple | None:
+        """Empreinte invariante du trace, None si non cachable (trace degenere, cache coupe)."""
+        if not self.enabled or stroke.diagonal <= 1e-6 or len(stroke.points) < 2:
+            return None
+        ox, oy = stroke.bbox[0], stroke.bbox[1]
+        step = stroke.diagonal * self.quantization
+        coords: list[int] = []
+        for x, y in resample(stroke.points, FINGERPRINT_SAMPLES):
+            coords.append(round((x - ox) / step))
+            coords.append(round((y - oy) / step))
+        band = int(min(stroke.diagonal, SCALE_INVARIANT_DIAGONAL) / SCALE_BAND)
+        return (stroke.is_closed, band, tuple(coords))
+
+    def get(self, key: tuple, stroke: NormalizedStroke) -> RecognizerResult | None | object:
+        """Decision replacee sur `stroke`, None si le trace n'est pas reconnu, `MISSING` sinon."""
+        entry = self._entries.get(key, MISSING)
+        if entry is MISSING:
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if entry is None:
+            return None
+        return RecognizerResult(
+            label=entry.label,
+            score=entry.score,
+            source=entry.source,
+            payload=_map_payload(entry.payload, None, (stroke.bbox[0], stroke.bbox[1]), stroke.diagonal, True),
+        )
+
+    def put(self, key: tuple, stroke: NormalizedStroke, result: RecognizerResult | None) -> None:
+        entry = None
+        if result is not None:
+            entry = CachedDecision(
+                label=result.label,
+                score=result.score,
+                source=result.source,
+                payload=_map_payload(result.payload, None, (stroke.bbox[0], stroke.bbox[1]), stroke.diagonal, False),
+            )
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Invalide toutes les decisions (formes, templates ou seuils modifies)."""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
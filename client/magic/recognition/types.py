@@ -27,6 +27,14 @@ class NormalizedStroke:
     features: dict[str, float] = field(default_factory=dict)
 
 
+@dataclass(slots=True)
+class StrokeAnalysis:
+    """Resultat mis en cache d'un trace : sa normalisation et ses primitives (avant composition)."""
+    raw_stroke: Any
+    stroke: NormalizedStroke | None
+    primitives: list[Any] = field(default_factory=list)
+
+
 @dataclass(slots=True)
 class RecognizerResult:
     label: str
@@ -67,6 +75,11 @@ class RecognitionConfig:
     fallback_source_weight: float = 0.90
     multi_source_bonus: float = 0.08
     closed_shape_open_penalty: float = 0.65
+    # Comparaison aux templates : "dollar_one" (recherche d'angle) ou "protractor" (forme close)
+    template_matcher: str = "dollar_one"
+    # Cache LRU des decisions par trace (0 : desactive) ; pas de quantification en fraction de diagonale
+    result_cache_size: int = 512
+    result_cache_quantization: float = 0.03
 
     def get_shape_threshold(self, label: str, default: float = 0.65) -> float:
         key = label.lower()
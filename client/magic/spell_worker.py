@@ -0,0 +1,184 @@
+"""
+Pipeline trace -> net_spec hors de la boucle de jeu.
+
+Au relachement du tableau, `playing` soumet les traces au `SpellWorker`
+et continue ses ticks ; le thread enchaine reconnaissance des primitives,
+AST, resolver, grammaire et log du cast, puis depose un `SpellResult`
+que la boucle recupere avec `poll()` pour lancer le sort.
+
+Chaque trace est aussi soumis des sa validation (`submit_stroke`) : le
+thread le reconnait pendant que le joueur dessine le suivant, et au
+relachement il ne reste que la composition multi-traces et la suite.
+
+Seule la derniere demande de sort compte : si plusieurs attendent (tableau
+relache plusieurs fois pendant un calcul), les plus anciennes sont
+abandonnees sans etre calculees.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from client.debug.spell_logger import SpellLogger
+from client.magic.ast.ast_builder import ASTBuilder
+from client.magic.geometry_analyzer import GeometryAnalyzer
+from client.magic.graph_geo import GraphGeo
+from client.magic.grammar import build_intent, describe, parse as grammar_parse
+from client.magic.resolver.resolved_spell import intent_to_network_spec, params_to_network_spec
+from client.magic.resolver.resolver import ASTResolver
+from client.ui.spell_debug_overlay import SpellDebugData
+
+
+@dataclass(slots=True)
+class SpellRequest:
+    request_id: int
+    strokes: list
+
+
+@dataclass(slots=True)
+class StrokeRequest:
+    stroke: list
+    stroke_index: int
+
+
+@dataclass(slots=True)
+class SpellResult:
+    request_id: int
+    primitives: list = field(default_factory=list)
+    # None : pas de sort (aucune primitive, ou rejete par la grammaire)
+    net_spec: dict | None = None
+    debug_data: SpellDebugData | None = None
+
+
+class SpellWorker(threading.Thread):
+    """
+    Thread d'analyse des sorts.  Les objets du pipeline (analyseur, AST,
+    resolver, logger) ne sont utilises que par ce thread une fois demarre.
+    """
+
+    def __init__(
+        self,
+        geometry_analyzer: GeometryAnalyzer,
+        ast_builder: ASTBuilder,
+        ast_resolver: ASTResolver,
+        spell_logger: SpellLogger | None = None,
+    ):
+        super().__init__(daemon=True, name="spell-worker")
+        self.geometry_analyzer = geometry_analyzer
+        self.ast_builder = ast_builder
+        self.ast_resolver = ast_resolver
+        self.spell_logger = spell_logger
+        self.stop_event = threading.Event()
+        self.request_q: queue.Queue[SpellRequest | StrokeRequest] = queue.Queue()
+        self.result_q: queue.Queue[SpellResult] = queue.Queue()
+        self._next_id = 0
+
+    def submit(self, strokes: list) -> int:
+        """Demande l'analyse de `strokes` ; renvoie l'id a retrouver dans le SpellResult."""
+        self._next_id += 1
+        self.request_q.put(SpellRequest(self._next_id, strokes))
+        return self._next_id
+
+    def submit_stroke(self, stroke: list, stroke_index: int) -> None:
+        """Reconnaissance anticipee d'un trace valide, `stroke_index`-ieme du tableau."""
+        self.request_q.put(StrokeRequest(stroke, stroke_index))
+
+    def poll(self) -> list[SpellResult]:
+        """Resultats prets, sans attendre."""
+        results = []
+        try:
+            while True:
+                results.append(self.result_q.get_nowait())
+        except queue.Empty:
+            pass
+        return results
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                batch = [self.request_q.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            try:
+                while True:
+                    batch.append(self.request_q.get_nowait())
+            except queue.Empty:
+                pass
+
+            # Traces dans l'ordre ; seul le sort le plus recent est calcule
+            last_spell = max(
+                (i for i, request in enumerate(batch) if isinstance(request, SpellRequest)),
+                default=-1,
+            )
+            for i, request in enumerate(batch):
+                if isinstance(request, StrokeRequest):
+                    try:
+                        self.geometry_analyzer.add_stroke(request.stroke, request.stroke_index)
+                    except Exception:
+                        logging.exception("Stroke recognition failed")
+                elif i == last_spell:
+                    try:
+                        result = self.analyze(request)
+                    except Exception:
+                        logging.exception("Spell analysis failed")
+                        result = SpellResult(request.request_id)
+                    self.result_q.put(result)
+
+    def analyze(self, request: SpellRequest) -> SpellResult:
+        primitives = self.geometry_analyzer.analyze(request.strokes)
+        if not isinstance(primitives, list):
+            primitives = [primitives] if primitives else []
+        result = SpellResult(request.request_id, primitives=primitives)
+        if not primitives:
+            return result
+
+        graph = GraphGeo()
+        for primitive in primitives:
+            graph.add_node(primitive)
+        ast = self.ast_builder.build(graph)
+        resolved = self.ast_resolver.resolve(ast)
+
+        # Grammaire : la racine doit etre un cercle (phrase/fonction/zone
+        # de lecture). Tout dessin sans cercle englobant est rejete.
+        parse_tree = grammar_parse(ast)
+        net_spec = {}
+        if parse_tree is None:
+            logging.info("Spell rejected: no root circle (grammaire)")
+        else:
+            intent = build_intent(parse_tree)
+            logging.debug(
+                "Grammaire parse:\n%s\nintent=%s",
+                describe(parse_tree),
+                None if intent is None else f"{len(intent.phases)} phase(s) element={intent.element}",
+            )
+            if intent is not None:
+                # Composition reconnue -> format multi-phase s2.
+                net_spec = intent_to_network_spec(intent)
+            else:
+                # Cercle present mais composition non reconnue :
+                # fallback sur le resolver geometrique emergent (format s).
+                net_spec = params_to_network_spec(resolved)
+            result.net_spec = net_spec
+
+        result.debug_data = SpellDebugData(
+            primitives=list(primitives),
+            spatial_relations=list(ast.spatial_relations),
+            ast=ast,
+            pass1_bags=dict(self.ast_resolver.last_pass1_bags),
+            pass2_bags=dict(self.ast_resolver.last_pass2_bags),
+            cross_entries=list(self.ast_resolver.last_cross_entries),
+            resolved_params=dict(resolved.params),
+            network_spec=dict(net_spec),
+            timestamp=time.time(),
+        )
+        if self.spell_logger is not None:
+            self.spell_logger.log_cast(result.debug_data)
+        return result
@@ -2,6 +2,17 @@ import json
 import queue
 import threading
 import socket
+import time
+
+from client.network.snapshot_codec import (
+    FRAME_MARKER,
+    SNAPSHOT_FORMAT,
+    SnapshotDecoder,
+    frame_length,
+)
+
+# Ack autonome si aucun input n'a porte le dernier seq de snapshot
+ACK_INTERVAL = 0.1
 
 
 class NetworkClient(threading.Thread):
@@ -15,6 +26,9 @@ class NetworkClient(threading.Thread):
         self.send_q = queue.Queue()
         self.recv_q = queue.Queue()
         self.connected = False
+        self.snapshot_decoder: SnapshotDecoder | None = None
+        self._acked_seq = 0
+        self._last_ack_at = 0.0
 
     def connect(self):
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -33,6 +47,8 @@ class NetworkClient(threading.Thread):
                 try:
                     while True:
                         msg = self.send_q.get_nowait()
+                        if msg.get("t") == "in":
+                            self._attach_ack(msg)
                         data = (json.dumps(msg) + "\n").encode("utf-8")
                         self.socket.sendall(data)
                 except queue.Empty:
@@ -42,24 +58,13 @@ class NetworkClient(threading.Thread):
                     break
 
                 try:
+                    self._send_pending_ack()
                     chunk = self.socket.recv(4096)
                     if not chunk:
                         self.recv_q.put({"t": "_info", "event": "server_closed"})
                         break
                     buf += chunk
-                    while True:
-                        nl = buf.find(b"\n")
-                        if nl == -1:
-                            break
-                        line = buf[:nl]
-                        buf  = buf[nl+1:]
-                        if not line:
-                            continue
-                        try:
-                            obj = json.loads(line.decode("utf-8"))
-                        except json.JSONDecodeError:
-                            obj = {"t": "_raw", "data": line.decode("utf-8", errors="ignore")}
-                        self.recv_q.put(obj)
+                    buf = self._parse_buffer(buf)
                 except socket.timeout:
                     pass
                 except Exception as e:
@@ -73,6 +78,60 @@ class NetworkClient(threading.Thread):
                 pass
             self.connected = False
 
+    def _parse_buffer(self, buf: bytes) -> bytes:
+        """Extrait les lignes JSON et les trames binaires completes de `buf`."""
+        while buf:
+            if buf[0] == FRAME_MARKER:
+                size = frame_length(buf)
+                if size is None or len(buf) < size:
+                    break
+                frame = buf[:size]
+                buf = buf[size:]
+                if self.snapshot_decoder is not None:
+                    obj = self.snapshot_decoder.decode(frame)
+                    if obj is not None:
+                        self.recv_q.put(obj)
+                continue
+
+            nl = buf.find(b"\n")
+            if nl == -1:
+                break
+            line = buf[:nl]
+            buf  = buf[nl+1:]
+            if not line:
+                continue
+            try:
+                obj = json.loads(line.decode("utf-8"))
+            except json.JSONDecodeError:
+                obj = {"t": "_raw", "data": line.decode("utf-8", errors="ignore")}
+            if isinstance(obj, dict) and obj.get("t") == "game_state":
+                # Nouvelle instance : le serveur repart de seq 1
+                self._acked_seq = 0
+                self.snapshot_decoder = (
+                    SnapshotDecoder() if obj.get("snapshot_format") == SNAPSHOT_FORMAT else None
+                )
+            self.recv_q.put(obj)
+        return buf
+
+    def _attach_ack(self, msg: dict) -> None:
+        decoder = self.snapshot_decoder
+        if decoder is not None and decoder.last_seq > self._acked_seq:
+            msg["ack"] = decoder.last_seq
+            self._acked_seq = decoder.last_seq
+            self._last_ack_at = time.monotonic()
+
+    def _send_pending_ack(self) -> None:
+        decoder = self.snapshot_decoder
+        if decoder is None or decoder.last_seq <= self._acked_seq:
+            return
+        now = time.monotonic()
+        if now - self._last_ack_at < ACK_INTERVAL:
+            return
+        data = (json.dumps({"t": "ack", "s": decoder.last_seq}) + "\n").encode("utf-8")
+        self.socket.sendall(data)
+        self._acked_seq = decoder.last_seq
+        self._last_ack_at = now
+
     def _send(self, obj:dict):
         if not self.connected:
             return
@@ -90,10 +149,13 @@ class NetworkClient(threading.Thread):
         self._send(msg)
         return msg
 
-    def send_join_request(self, map, uid: str = "") -> dict:
-        msg = {"t": "join", "map": map}
+    def send_join_request(self, map, uid: str = "", map_hash: str = "") -> dict:
+        msg = {"t": "join", "map": map, "snap": [SNAPSHOT_FORMAT]}
         if uid:
             msg["uid"] = uid
+        if map_hash:
+            # Le serveur n'enverra pas les objets si la map n'a pas change
+            msg["map_hash"] = map_hash
         self._send(msg)
         return msg
 
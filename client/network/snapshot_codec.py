@@ -0,0 +1,237 @@
+"""
+Decodeur des snapshots binaires "bin1" (voir server/snapshot_codec.py).
+
+Chaque trame est un delta contre un snapshot deja decode (`baseline`) ; le
+decodeur reconstruit l'etat complet puis produit un message `game_update`
+identique a celui du chemin JSON (seules les entites modifiees depuis la
+trame precedente y figurent).
+"""
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any
+
+SNAPSHOT_FORMAT = "bin1"
+SNAPSHOT_VERSION = 1
+FRAME_MARKER = 0x00
+
+FLAG_SPELLS = 0x01
+FLAG_EXTRAS = 0x02
+
+FIELD_X = 0x01
+FIELD_Y = 0x02
+FIELD_HEALTH = 0x04
+FIELD_ALIVE = 0x08
+FIELD_SEQ = 0x10
+FIELD_DELTA_POS = 0x20
+FIELD_DIRECTION = 0x40
+FIELD_REMOVED = 0x80
+
+POSITION_SCALE = 16.0
+SPELL_SCALE = 10.0
+STRING_INLINE = 0xFF
+
+STRING_CODES: tuple[str, ...] = (
+    "neutral", "fire", "lightning", "plasma", "inferno", "storm", "arcane", "ice",
+    "parametric", "fire_rune", "fire_projectile", "lightning_rune",
+)
+
+_HEADER = struct.Struct("<BBIId")
+_FRAME_LEN = struct.Struct("<I")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_I8 = struct.Struct("<b")
+_I16 = struct.Struct("<h")
+_I32 = struct.Struct("<i")
+_F32 = struct.Struct("<f")
+_NAME = struct.Struct("<HB")
+_RECORD = struct.Struct("<HB")
+_SPELL = struct.Struct("<iiHhhB")
+_ELLIPSE = struct.Struct("<HHh")
+
+FRAME_HEADER_SIZE = 1 + _FRAME_LEN.size
+
+# (qx, qy, health, alive, seq, direction)
+EntityState = tuple[int, int, float, bool, int, int]
+
+
+def frame_length(buf: bytes) -> int | None:
+    """Taille totale de la trame en tete de `buf`, None si incomplete."""
+    if len(buf) < FRAME_HEADER_SIZE:
+        return None
+    return FRAME_HEADER_SIZE + _FRAME_LEN.unpack_from(buf, 1)[0]
+
+
+class _Reader:
+    __slots__ = ("data", "offset")
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.offset = offset
+
+    def read(self, fmt: struct.Struct) -> tuple:
+        values = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def one(self, fmt: struct.Struct) -> Any:
+        return self.read(fmt)[0]
+
+    def raw(self, size: int) -> bytes:
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+    def string(self) -> str:
+        code = self.one(_U8)
+        if code != STRING_INLINE:
+            return STRING_CODES[code] if code < len(STRING_CODES) else ""
+        return self.raw(self.one(_U8)).decode("utf-8", errors="replace")
+
+
+class SnapshotDecoder:
+    def __init__(self) -> None:
+        self.last_seq = 0
+        self._names: dict[int, str] = {}
+        self._states: dict[int, tuple[dict[str, EntityState], dict[str, EntityState]]] = {0: ({}, {})}
+        self._latest: tuple[dict[str, EntityState], dict[str, EntityState]] = ({}, {})
+
+    def decode(self, frame: bytes) -> dict | None:
+        """Decode une trame complete (marqueur inclus) en message `game_update`.
+
+        Renvoie None si la baseline est inconnue (trame perimee) : le serveur
+        repartira d'une baseline que nous avons acquittee.
+        """
+        reader = _Reader(frame, FRAME_HEADER_SIZE)
+        version, flags, seq, baseline, timestamp = reader.read(_HEADER)
+        if version != SNAPSHOT_VERSION or seq <= self.last_seq:
+            return None
+        base = self._states.get(baseline)
+        if base is None:
+            return None
+
+        for _ in range(reader.one(_U16)):
+            handle, size = reader.read(_NAME)
+            self._names[handle] = reader.raw(size).decode("utf-8", errors="replace")
+
+        players = self._read_entities(reader, base[0])
+        enemies = self._read_entities(reader, base[1])
+
+        message: dict[str, Any] = {"t": "game_update", "timestamp": timestamp}
+        changed_players = {
+            pid: _player_dict(state)
+            for pid, state in players.items()
+            if self._latest[0].get(pid) != state
+        }
+        changed_enemies = {
+            eid: _enemy_dict(state)
+            for eid, state in enemies.items()
+            if self._latest[1].get(eid) != state
+        }
+        if changed_players:
+            message["players"] = changed_players
+        if changed_enemies:
+            message["enemies"] = changed_enemies
+        # Entites retirees (sorties de la zone d'interet)
+        left = {}
+        left_players = self._latest[0].keys() - players.keys()
+        left_enemies = self._latest[1].keys() - enemies.keys()
+        if left_players:
+            left["players"] = list(left_players)
+        if left_enemies:
+            left["enemies"] = list(left_enemies)
+        if left:
+            message["left"] = left
+        if flags & FLAG_SPELLS:
+            message["spells"] = _read_spells(reader)
+        if flags & FLAG_EXTRAS:
+            extras = json.loads(reader.raw(reader.one(_U32)).decode("utf-8"))
+            if extras.get("terrain"):
+                message["terrain"] = extras["terrain"]
+            if extras.get("effects"):
+                message["effects"] = extras["effects"]
+
+        # Les baselines anterieures a celle-ci ne serviront plus ; l'etat vide
+        # 0 reste : le serveur y revient apres trop de trames non acquittees
+        for old_seq in [s for s in self._states if 0 < s < baseline]:
+            del self._states[old_seq]
+        self._states[seq] = self._latest = (players, enemies)
+        self.last_seq = seq
+        return message
+
+    def _read_entities(self, reader: _Reader, base: dict[str, EntityState]) -> dict[str, EntityState]:
+        states = dict(base)
+        for _ in range(reader.one(_U16)):
+            handle, mask = reader.read(_RECORD)
+            name = self._names.get(handle, str(handle))
+            if mask & FIELD_REMOVED:
+                states.pop(name, None)
+                continue
+            qx, qy, health, alive, seq, direction = states.get(name, (0, 0, 0.0, True, -1, 1))
+            if mask & FIELD_DELTA_POS:
+                if mask & FIELD_X:
+                    qx += reader.one(_I16)
+                if mask & FIELD_Y:
+                    qy += reader.one(_I16)
+            else:
+                if mask & FIELD_X:
+                    qx = reader.one(_I32)
+                if mask & FIELD_Y:
+                    qy = reader.one(_I32)
+            if mask & FIELD_HEALTH:
+                health = reader.one(_F32)
+            if mask & FIELD_ALIVE:
+                alive = bool(reader.one(_U8))
+            if mask & FIELD_SEQ:
+                seq = reader.one(_I32)
+            if mask & FIELD_DIRECTION:
+                direction = reader.one(_I8)
+            states[name] = (qx, qy, health, alive, seq, direction)
+        return states
+
+
+def _player_dict(state: EntityState) -> dict:
+    qx, qy, health, alive, seq, _ = state
+    return {
+        "x": qx / POSITION_SCALE,
+        "y": qy / POSITION_SCALE,
+        "health": health,
+        "alive": alive,
+        "last_input_seq": seq,
+    }
+
+
+def _enemy_dict(state: EntityState) -> dict:
+    qx, qy, health, alive, seq, direction = state
+    return {
+        "x": qx / POSITION_SCALE,
+        "y": qy / POSITION_SCALE,
+        "health": health,
+        "alive": alive,
+        "direction": direction,
+        "attack_seq": seq,
+    }
+
+
+def _read_spells(reader: _Reader) -> list[dict]:
+    spells = []
+    for _ in range(reader.one(_U16)):
+        qx, qy, radius, vx, vy, has_ellipse = reader.read(_SPELL)
+        spell = {
+            "x": round(qx / POSITION_SCALE, 1),
+            "y": round(qy / POSITION_SCALE, 1),
+            "r": radius / SPELL_SCALE,
+            "e": reader.string(),
+            "vx": vx / SPELL_SCALE,
+            "vy": vy / SPELL_SCALE,
+        }
+        spell["bh"] = reader.string()
+        if has_ellipse:
+            rx, ry, angle = reader.read(_ELLIPSE)
+            spell["rx"] = rx / SPELL_SCALE
+            spell["ry"] = ry / SPELL_SCALE
+            spell["ea"] = angle
+        spells.append(spell)
+    return spells
@@ -0,0 +1,274 @@
+"""
+Clients de jeu sans affichage pour les tests de charge.
+
+Un `BotClient` parle le protocole du client pygame (sans pygame) : join
+avec UUID, `in` a la frequence du client avec un masque de touches qui suit
+une marche aleatoire, sorts `s` / `s2`, `ping` periodique.  Il decode les
+snapshots binaires comme le vrai client (acks compris) et mesure octets
+recus, messages par type et aller-retour ping / pong.
+
+Le comportement ne depend que de `seed` et de l'index du bot : deux
+executions envoient la meme suite de messages, seul l'ordonnancement reel
+change.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Periode d'envoi d'un ack seul quand aucun input ne part : celle du client
+from client.network.network import ACK_INTERVAL
+from client.network.snapshot_codec import FRAME_MARKER, SNAPSHOT_FORMAT, SnapshotDecoder, frame_length
+
+# Bits du masque d'input (client/entities/player.py)
+IN_UP = 1
+IN_DOWN = 2
+IN_LEFT = 4
+IN_RIGHT = 8
+
+# Masques tenus par les bots : immobile, 4 directions, 4 diagonales
+MOVE_MASKS = (
+    0,
+    IN_UP, IN_DOWN, IN_LEFT, IN_RIGHT,
+    IN_UP | IN_LEFT, IN_UP | IN_RIGHT, IN_DOWN | IN_LEFT, IN_DOWN | IN_RIGHT,
+)
+
+# Sorts lances, au format reseau de client/magic/resolver/resolved_spell.py
+SPEC_TEMPLATES = (
+    {"t": "s", "cmp": 0.6, "e": "fire", "bh": "projectile", "spd": 0.7, "pwr": 0.6},
+    {"t": "s", "cmp": 0.3, "e": "lightning", "bh": "aoe", "pwr": 0.5, "spr": 0.2},
+    {"t": "s", "cmp": 0.8, "e": "plasma", "bh": "projectile", "spd": 0.9, "pwr": 0.8, "spl": 3, "spi": 1},
+)
+INTENT_TEMPLATES = (
+    {"t": "s2", "pwr": 0.6, "phases": [
+        {"form": "projectile", "spd": 0.7, "sub": "damage", "e": "fire", "pwr": 0.6,
+         "trigger": {"type": "on_expire", "next": 1}},
+        {"form": "aoe", "rad": 0.3, "sub": "damage", "e": "inferno", "pwr": 0.5},
+    ]},
+    {"t": "s2", "pwr": 0.5, "phases": [
+        {"form": "wall", "rad": 0.2, "dur": 0.5, "ax": [2.0, 0.0], "sub": "freeze", "e": "storm", "pwr": 0.5},
+    ]},
+)
+
+
+@dataclass(slots=True)
+class BotStats:
+    bytes_in: int = 0
+    bytes_out: int = 0
+    messages: Counter = field(default_factory=Counter)
+    inputs: int = 0
+    casts: int = 0
+    # Aller-retour ping -> pong (secondes)
+    rtts: list[float] = field(default_factory=list)
+    # Envoi du join -> reception du game_state (secondes)
+    join_latency: Optional[float] = None
+    error: Optional[str] = None
+
+    def start_window(self) -> None:
+        """Remet a zero les compteurs (debut de la phase de mesure)."""
+        self.bytes_in = self.bytes_out = self.inputs = self.casts = 0
+        self.messages.clear()
+        self.rtts.clear()
+
+
+class BotClient:
+    def __init__(
+        self,
+        index: int,
+        map_id: str,
+        *,
+        seed: int = 0,
+        input_hz: float = 60.0,
+        cast_interval: float = 2.0,
+        ping_interval: float = 1.0,
+        binary: bool = True,
+    ):
+        self.index = index
+        self.map_id = map_id
+        self.uid = f"bot-{seed}-{index}"
+        self.rng = random.Random(seed * 1_000_003 + index)
+        self.input_hz = input_hz
+        self.cast_interval = cast_interval
+        self.ping_interval = ping_interval
+        self.binary = binary
+        self.stats = BotStats()
+        self.joined = asyncio.Event()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._decoder: Optional[SnapshotDecoder] = None
+        self._acked_seq = 0
+        self._last_ack_at = 0.0
+        self._pings: deque[float] = deque()
+        self._join_sent_at = 0.0
+
+    # ------------------------------------------------------------------
+    # Envoi
+    # ------------------------------------------------------------------
+
+    def _send(self, msg: dict) -> None:
+        data = (json.dumps(msg) + "\n").encode("utf-8")
+        self.stats.bytes_out += len(data)
+        self._writer.write(data)
+
+    def _attach_ack(self, msg: dict) -> None:
+        decoder = self._decoder
+        if decoder is not None and decoder.last_seq > self._acked_seq:
+            msg["ack"] = decoder.last_seq
+            self._acked_seq = decoder.last_seq
+            self._last_ack_at = time.monotonic()
+
+    def _send_pending_ack(self) -> None:
+        decoder = self._decoder
+        if decoder is None or decoder.last_seq <= self._acked_seq:
+            return
+        now = time.monotonic()
+        if now - self._last_ack_at >= ACK_INTERVAL:
+            self._send({"t": "ack", "s": decoder.last_seq})
+            self._acked_seq = decoder.last_seq
+            self._last_ack_at = now
+
+    def _next_cast(self) -> dict:
+        rng = self.rng
+        if rng.random() < 0.5:
+            msg = dict(rng.choice(SPEC_TEMPLATES))
+        else:
+            msg = json.loads(json.dumps(rng.choice(INTENT_TEMPLATES)))
+        angle = rng.uniform(0.0, 2.0 * math.pi)
+        direction = [round(math.cos(angle), 4), round(math.sin(angle), 4)]
+        if msg["t"] == "s":
+            msg["dir"] = direction
+        else:
+            msg["phases"][0]["dir"] = direction
+        return msg
+
+    # ------------------------------------------------------------------
+    # Reception
+    # ------------------------------------------------------------------
+
+    def _on_message(self, msg: dict) -> None:
+        msg_type = msg.get("t", "?")
+        self.stats.messages[msg_type] += 1
+        if msg_type == "game_state":
+            self._acked_seq = 0
+            self._decoder = SnapshotDecoder() if msg.get("snapshot_format") == SNAPSHOT_FORMAT else None
+            if self.stats.join_latency is None:
+                self.stats.join_latency = time.monotonic() - self._join_sent_at
+            self.joined.set()
+        elif msg_type == "pong" and self._pings:
+            self.stats.rtts.append(time.monotonic() - self._pings.popleft())
+
+    def _parse(self, buf: bytes) -> bytes:
+        while buf:
+            if buf[0] == FRAME_MARKER:
+                size = frame_length(buf)
+                if size is None or len(buf) < size:
+                    break
+                frame, buf = buf[:size], buf[size:]
+                self.stats.messages["snapshot_bin"] += 1
+                if self._decoder is not None:
+                    self._decoder.decode(frame)
+                continue
+            nl = buf.find(b"\n")
+            if nl == -1:
+                break
+            line, buf = buf[:nl], buf[nl + 1:]
+            if line:
+                try:
+                    msg = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(msg, dict):
+                    self._on_message(msg)
+        return buf
+
+    async def _read_loop(self) -> None:
+        buf = b""
+        while True:
+            chunk = await self._reader.read(65536)
+            if not chunk:
+                raise ConnectionError("server closed the connection")
+            self.stats.bytes_in += len(chunk)
+            buf = self._parse(buf + chunk)
+
+    # ------------------------------------------------------------------
+    # Boucle principale
+    # ------------------------------------------------------------------
+
+    async def _play(self, duration: float) -> None:
+        period = 1.0 / self.input_hz
+        rng = self.rng
+        seq = 0
+        mask = 0
+        hold_steps = 0
+        next_cast = rng.expovariate(1.0 / self.cast_interval) if self.cast_interval > 0 else math.inf
+        next_ping = 0.0
+        start = time.monotonic()
+        step = 0
+        while True:
+            elapsed = step * period
+            if elapsed >= duration:
+                break
+            # Marche aleatoire : un masque tenu 0.25 a 2 s, comme un joueur au clavier
+            if hold_steps <= 0:
+                mask = rng.choice(MOVE_MASKS)
+                hold_steps = int(rng.uniform(0.25, 2.0) * self.input_hz)
+            hold_steps -= 1
+            seq += 1
+            msg = {"t": "in", "seq": seq, "k": mask}
+            self._attach_ack(msg)
+            self._send(msg)
+            self.stats.inputs += 1
+            if elapsed >= next_cast:
+                self._send(self._next_cast())
+                self.stats.casts += 1
+                next_cast = elapsed + rng.expovariate(1.0 / self.cast_interval)
+            if elapsed >= next_ping:
+                self._pings.append(time.monotonic())
+                self._send({"t": "ping"})
+                next_ping = elapsed + self.ping_interval
+            self._send_pending_ack()
+            await self._writer.drain()
+            step += 1
+            delay = start + step * period - time.monotonic()
+            await asyncio.sleep(max(0.0, delay))
+
+    async def run(self, host: str, port: int, duration: float, join_timeout: float = 10.0) -> BotStats:
+        """Se connecte, rejoint `map_id` et joue `duration` secondes."""
+        reader_task = None
+        try:
+            self._reader, self._writer = await asyncio.open_connection(host, port)
+            reader_task = asyncio.create_task(self._read_loop())
+            self._join_sent_at = time.monotonic()
+            join = {"t": "join", "map": self.map_id, "uid": self.uid}
+            if self.binary:
+                join["snap"] = [SNAPSHOT_FORMAT]
+            self._send(join)
+            await asyncio.wait_for(self.joined.wait(), join_timeout)
+            play = asyncio.create_task(self._play(duration))
+            done, _ = await asyncio.wait({play, reader_task}, return_when=asyncio.FIRST_COMPLETED)
+            if reader_task in done:
+                play.cancel()
+                reader_task.result()
+            play.result()
+            # Fin propre : demi-fermeture, puis attendre que le serveur ferme
+            self._writer.write_eof()
+            try:
+                await asyncio.wait_for(reader_task, join_timeout)
+            except ConnectionError:
+                pass
+        except asyncio.TimeoutError:
+            self.stats.error = "join timeout"
+        except (ConnectionError, OSError) as e:
+            self.stats.error = str(e) or type(e).__name__
+        finally:
+            if reader_task is not None:
+                reader_task.cancel()
+            if self._writer is not None:
+                self._writer.close()
+        return self.stats
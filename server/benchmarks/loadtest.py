@@ -0,0 +1,374 @@
+"""
+Test de charge : N bots sans affichage repartis sur les maps.
+
+Par defaut le serveur (`server_run.main`) est lance dans un processus a part,
+dans un repertoire temporaire (sauvegarde vierge a chaque execution), avec
+son endpoint de mesures sur un port libre.  Les bots rejoignent les maps a
+tour de role pendant `--ramp` secondes, jouent `--duration` secondes, puis
+le rapport combine leurs mesures (aller-retour, octets/s, messages) et
+celles du serveur (phases du tick, pas sautes, octets par type) relevees
+sur /metrics au debut et a la fin de la phase de mesure.
+
+    python -m server.benchmarks.loadtest --bots 50 --maps forest,desert --duration 30
+    python -m server.benchmarks.loadtest --json run.json --compare baseline.json
+    python -m server.benchmarks.loadtest --connect 127.0.0.1:9000 --metrics 127.0.0.1:9100
+
+Avec `--shards`, les mesures du serveur arrivent des shards toutes les
+2 s : prevoir une duree de plusieurs dizaines de secondes.  Le code de
+sortie est non nul si un bot n'a pas pu jouer jusqu'au bout.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Optional
+
+import numpy as np
+
+from server.benchmarks.bots import BotClient, BotStats
+
+# Quantiles des distributions du rapport
+REPORT_QUANTILES = (50, 95, 99)
+# Attente maximale du demarrage du serveur lance par le test
+SERVER_START_TIMEOUT = 15.0
+# Les bots restent connectes un peu apres la mesure (deconnexions hors fenetre)
+END_MARGIN = 1.0
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+# ---------------------------------------------------------------------------
+# Serveur
+# ---------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(workdir: str, port: int, metrics_port: int, shards: int, log_level: int) -> None:
+    """Point d'entree du processus serveur."""
+    os.chdir(workdir)
+    logging.basicConfig(level=log_level, format="%(asctime)s %(levelname)s %(message)s", force=True)
+    from server import server_run
+
+    try:
+        asyncio.run(server_run.main("127.0.0.1", port, metrics_port, shards))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _wait_listening(host: str, port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            # Lire le welcome avant de fermer (pas de reset cote serveur)
+            await asyncio.wait_for(reader.readline(), timeout)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+# ---------------------------------------------------------------------------
+# Mesures du serveur (/metrics)
+# ---------------------------------------------------------------------------
+
+async def scrape_metrics(host: str, port: int) -> list[tuple[str, dict[str, str], float]]:
+    """Echantillons (nom, labels, valeur) de l'endpoint Prometheus du serveur."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(b"GET /metrics HTTP/1.0\r\nHost: loadtest\r\n\r\n")
+        await writer.drain()
+        data = await reader.read()
+    finally:
+        writer.close()
+    _, _, body = data.decode("utf-8").partition("\r\n\r\n")
+    samples = []
+    for line in body.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        samples.append((name, dict(_LABEL.findall(labels or "")), float(value)))
+    return samples
+
+
+def _counters(samples, name: str, *keys: str) -> dict[tuple, float]:
+    return {
+        tuple(labels.get(key, "") for key in keys): value
+        for sample_name, labels, value in samples
+        if sample_name == name
+    }
+
+
+def server_report(before: list, after: list, seconds: float) -> dict:
+    """Phases du tick (fin de mesure) et compteurs ramenes a la periode mesuree."""
+    maps: dict[str, dict] = defaultdict(lambda: {"phases": {}})
+    for name, labels, value in after:
+        map_id = labels.get("map")
+        if map_id is None or "quantile" not in labels:
+            continue
+        key = f"p{round(float(labels['quantile']) * 100)}_ms"
+        if name == "game_tick_phase_seconds":
+            maps[map_id]["phases"].setdefault(labels["phase"], {})[key] = value * 1000.0
+        elif name == "game_tick_seconds":
+            maps[map_id].setdefault("tick", {})[key] = value * 1000.0
+        elif name == "game_tick_interval_seconds":
+            maps[map_id].setdefault("tick_interval", {})[key] = value * 1000.0
+
+    for series, out in (("game_ticks_total", "ticks"), ("game_tick_overruns_total", "tick_overruns"),
+                        ("game_inputs_processed_total", "inputs")):
+        start = _counters(before, series, "map")
+        for (map_id,), value in _counters(after, series, "map").items():
+            maps[map_id][out] = value - start.get((map_id,), 0.0)
+    for (map_id,), value in _counters(after, "game_players", "map").items():
+        maps[map_id]["players"] = value
+    for map_id, data in maps.items():
+        if "ticks" in data and seconds > 0:
+            data["tick_rate"] = data["ticks"] / seconds
+
+    outbound: dict[str, float] = defaultdict(float)
+    start = _counters(before, "game_outbound_bytes_total", "map", "type")
+    for (map_id, msg_type), value in _counters(after, "game_outbound_bytes_total", "map", "type").items():
+        outbound[msg_type] += value - start.get((map_id, msg_type), 0.0)
+    return {
+        "maps": dict(sorted(maps.items())),
+        "outbound_bytes_per_s": {
+            msg_type: total / seconds for msg_type, total in sorted(outbound.items()) if total > 0 and seconds > 0
+        },
+    }
+
+
+# ---------------------------------------------------------------------------
+# Rapport
+# ---------------------------------------------------------------------------
+
+def _distribution_ms(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    samples = np.asarray(values) * 1000.0
+    result = {f"p{q}_ms": float(v) for q, v in zip(REPORT_QUANTILES, np.percentile(samples, REPORT_QUANTILES))}
+    result["max_ms"] = float(samples.max())
+    return result
+
+
+def client_report(stats: list[BotStats], seconds: float) -> dict:
+    messages: Counter = Counter()
+    for bot in stats:
+        messages.update(bot.messages)
+    bytes_in = sum(bot.bytes_in for bot in stats)
+    bytes_out = sum(bot.bytes_out for bot in stats)
+    playing = max(1, sum(1 for bot in stats if bot.error is None))
+    return {
+        "bots": len(stats),
+        "failed": sum(1 for bot in stats if bot.error is not None),
+        "errors": dict(Counter(bot.error for bot in stats if bot.error is not None)),
+        "rtt": _distribution_ms([rtt for bot in stats for rtt in bot.rtts]),
+        "join": _distribution_ms([bot.join_latency for bot in stats if bot.join_latency is not None]),
+        "bytes_in_per_s": bytes_in / seconds,
+        "bytes_in_per_s_per_bot": bytes_in / seconds / playing,
+        "bytes_out_per_s": bytes_out / seconds,
+        "inputs": sum(bot.inputs for bot in stats),
+        "casts": sum(bot.casts for bot in stats),
+        "messages_per_s": {msg_type: count / seconds for msg_type, count in sorted(messages.items())},
+    }
+
+
+def _flatten(data: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def format_report(report: dict, baseline: Optional[dict] = None) -> str:
+    """Rapport texte ; avec `baseline`, ecart relatif a une execution precedente."""
+    current = _flatten({"clients": report["clients"], "server": report["server"]})
+    previous = _flatten({"clients": baseline["clients"], "server": baseline["server"]}) if baseline else {}
+    config = report["config"]
+    lines = [
+        f"loadtest: {config['bots']} bots on {','.join(config['maps'])} for {config['duration']}s "
+        f"(seed {config['seed']}, {'bin1' if config['binary'] else 'json'} snapshots, "
+        f"{config['input_hz']} Hz inputs, shards {config['shards']})"
+    ]
+    width = max((len(key) for key in current), default=0)
+    for key, value in current.items():
+        line = f"  {key:<{width}}  {value:>14.3f}"
+        if key in previous:
+            before = previous[key]
+            if before:
+                line += f"  {(value - before) / abs(before) * 100.0:+8.1f}%"
+            else:
+                line += f"  (was {before:g})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+async def run_load(
+    host: str,
+    port: int,
+    metrics: Optional[tuple[str, int]],
+    *,
+    bots: int,
+    maps: list[str],
+    duration: float,
+    ramp: float,
+    seed: int,
+    input_hz: float,
+    cast_interval: float,
+    binary: bool,
+) -> tuple[list[BotStats], dict, float]:
+    clients = [
+        BotClient(
+            index,
+            maps[index % len(maps)],
+            seed=seed,
+            input_hz=input_hz,
+            cast_interval=cast_interval,
+            binary=binary,
+        )
+        for index in range(bots)
+    ]
+    tasks = []
+    for index, bot in enumerate(clients):
+        # Tous les bots jouent jusqu'a la fin de la phase de mesure commune
+        play = duration + ramp - index * ramp / bots + END_MARGIN
+        tasks.append(asyncio.create_task(bot.run(host, port, play)))
+        await asyncio.sleep(ramp / bots)
+
+    before = await scrape_metrics(*metrics) if metrics else []
+    for bot in clients:
+        bot.stats.start_window()
+    started = time.monotonic()
+    await asyncio.sleep(duration)
+    after = await scrape_metrics(*metrics) if metrics else []
+    window = [copy.deepcopy(bot.stats) for bot in clients]
+    seconds = time.monotonic() - started
+    # Les erreurs comptent jusqu'a la fin, deconnexions comprises
+    for stats, final in zip(window, await asyncio.gather(*tasks)):
+        stats.error = final.error
+    return window, server_report(before, after, seconds) if metrics else {}, seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bots", type=int, default=20)
+    parser.add_argument("--maps", default="forest", help="maps separees par des virgules")
+    parser.add_argument("--duration", type=float, default=20.0, help="duree de la phase de mesure (s)")
+    parser.add_argument("--ramp", type=float, default=2.0, help="etalement des connexions (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--input-hz", type=float, default=60.0)
+    parser.add_argument("--cast-interval", type=float, default=2.0, help="intervalle moyen entre deux sorts (s)")
+    parser.add_argument("--json-snapshots", action="store_true", help="snapshots JSON au lieu de bin1")
+    parser.add_argument("--shards", type=int, default=0, help="processus d'instances du serveur lance")
+    parser.add_argument("--connect", help="host:port d'un serveur deja lance")
+    parser.add_argument("--metrics", help="host:port de son endpoint /metrics")
+    parser.add_argument("--json", dest="json_path", help="ecrit le rapport JSON dans ce fichier")
+    parser.add_argument("--compare", help="rapport JSON d'une execution precedente")
+    parser.add_argument("--server-log", default="WARNING", help="niveau de log du serveur lance")
+    args = parser.parse_args()
+    maps = [m for m in args.maps.split(",") if m]
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    server = None
+    workdir = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        port = int(port)
+        metrics = None
+        if args.metrics:
+            metrics_host, _, metrics_port = args.metrics.rpartition(":")
+            metrics = (metrics_host, int(metrics_port))
+    else:
+        host, port = "127.0.0.1", _free_port()
+        metrics = ("127.0.0.1", _free_port())
+        workdir = tempfile.TemporaryDirectory(prefix="loadtest-")
+        server = multiprocessing.get_context("spawn").Process(
+            target=_serve,
+            args=(workdir.name, port, metrics[1], args.shards, getattr(logging, args.server_log.upper())),
+            name="loadtest-server",
+        )
+        server.start()
+
+    async def run() -> tuple[list[BotStats], dict, float]:
+        await _wait_listening(host, port, SERVER_START_TIMEOUT)
+        return await run_load(
+            host, port, metrics,
+            bots=args.bots,
+            maps=maps,
+            duration=args.duration,
+            ramp=args.ramp,
+            seed=args.seed,
+            input_hz=args.input_hz,
+            cast_interval=args.cast_interval,
+            binary=not args.json_snapshots,
+        )
+
+    try:
+        stats, server_stats, seconds = asyncio.run(run())
+    finally:
+        if server is not None:
+            os.kill(server.pid, signal.SIGTERM)
+            server.join(10.0)
+            if server.is_alive():
+                server.kill()
+        if workdir is not None:
+            workdir.cleanup()
+
+    report = {
+        "config": {
+            "bots": args.bots,
+            "maps": maps,
+            "duration": args.duration,
+            "seed": args.seed,
+            "input_hz": args.input_hz,
+            "cast_interval": args.cast_interval,
+            "binary": not args.json_snapshots,
+            "shards": args.shards,
+        },
+        "measured_seconds": seconds,
+        "clients": client_report(stats, seconds),
+        "server": server_stats,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(format_report(report, baseline))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if report["clients"]["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
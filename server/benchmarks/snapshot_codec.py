@@ -0,0 +1,133 @@
+"""
+Verification et taille des snapshots binaires "bin1".
+
+Fait tourner un `SnapshotEncoder` serveur et un `SnapshotDecoder` client sur
+un monde qui bouge, et verifie a chaque tick que l'etat reconstruit par le
+client (messages `game_update` appliques) est celui du serveur :
+
+- acquittement a chaque trame ;
+- coupure de `--stall` trames (perdues, non acquittees) : au-dela de 120 le
+  serveur repart de la baseline 0, le client doit suivre sans desynchro.
+
+Affiche aussi les octets par trame face au message JSON equivalent.
+
+    python -m server.benchmarks.snapshot_codec
+    python -m server.benchmarks.snapshot_codec --players 64 --enemies 200 --stall 130
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+
+from client.network.snapshot_codec import POSITION_SCALE, SnapshotDecoder
+from server.snapshot_codec import SnapshotEncoder, WorldSnapshot
+
+
+def _quantized(value: float) -> float:
+    return round(value * POSITION_SCALE) / POSITION_SCALE
+
+
+class _World:
+    def __init__(self, players: int, enemies: int, seed: int):
+        self.rng = random.Random(seed)
+        self.players = {
+            f"p{k}": {"x": self.rng.uniform(0, 2000), "y": self.rng.uniform(0, 2000), "health": 100.0,
+                      "alive": True, "last_input_seq": 0}
+            for k in range(players)
+        }
+        self.enemies = {
+            f"e{k}": {"x": self.rng.uniform(0, 2000), "y": self.rng.uniform(0, 2000), "health": 50.0,
+                      "alive": True, "direction": 1, "attack_seq": 0}
+            for k in range(enemies)
+        }
+        self.tick = 0
+
+    def step(self) -> WorldSnapshot:
+        rng = self.rng
+        self.tick += 1
+        for data in self.players.values():
+            if rng.random() < 0.6:
+                data["x"] += rng.uniform(-4, 4)
+                data["y"] += rng.uniform(-4, 4)
+                data["last_input_seq"] += 1
+        for data in self.enemies.values():
+            if rng.random() < 0.3:
+                data["x"] += rng.uniform(-2, 2)
+                data["direction"] = rng.choice((-1, 1))
+            if rng.random() < 0.01:
+                data["health"] = max(0.0, data["health"] - 10.0)
+        return WorldSnapshot(
+            timestamp=self.tick / 30.0,
+            players={pid: dict(data) for pid, data in self.players.items()},
+            enemies={eid: dict(data) for eid, data in self.enemies.items()},
+        )
+
+
+def _apply(view: dict[str, dict], changed: dict[str, dict], left: list[str]) -> None:
+    for key, data in changed.items():
+        view[key] = data
+    for key in left:
+        view.pop(key, None)
+
+
+def _check(view: dict[str, dict], expected: dict[str, dict], fields: tuple[str, ...]) -> None:
+    assert view.keys() == expected.keys()
+    for key, data in expected.items():
+        got = view[key]
+        assert got["x"] == _quantized(data["x"]) and got["y"] == _quantized(data["y"]), key
+        for name in fields:
+            assert got[name] == data[name], (key, name)
+
+
+def run(players: int, enemies: int, ticks: int, stall: int, seed: int) -> None:
+    world = _World(players, enemies, seed)
+    encoder = SnapshotEncoder()
+    decoder = SnapshotDecoder()
+    client_players: dict[str, dict] = {}
+    client_enemies: dict[str, dict] = {}
+    stall_start = ticks // 4
+    binary_bytes = json_bytes = frames = decoded = 0
+
+    for tick in range(ticks):
+        snapshot = world.step()
+        frame = encoder.encode(snapshot)
+        json_bytes += len(json.dumps({
+            "t": "game_update", "timestamp": snapshot.timestamp,
+            "players": snapshot.players, "enemies": snapshot.enemies,
+        }))
+        if frame is None:
+            continue
+        frames += 1
+        binary_bytes += len(frame)
+        if stall_start <= tick < stall_start + stall:
+            continue  # trame perdue, pas d'ack
+
+        message = decoder.decode(frame)
+        assert message is not None, f"tick {tick}: trame non decodee (baseline {encoder.baseline_seq})"
+        decoded += 1
+        left = message.get("left", {})
+        _apply(client_players, message.get("players", {}), left.get("players", []))
+        _apply(client_enemies, message.get("enemies", {}), left.get("enemies", []))
+        _check(client_players, snapshot.players, ("health", "alive", "last_input_seq"))
+        _check(client_enemies, snapshot.enemies, ("health", "alive", "direction", "attack_seq"))
+        encoder.ack(decoder.last_seq)
+
+    print(f"{players} players, {enemies} enemies, {ticks} ticks, stall of {stall} frames at tick {stall_start}")
+    print(f"decoded {decoded}/{frames - stall} delivered frames, client state matches server")
+    print(f"bytes/frame: json {json_bytes / ticks:.0f}  bin1 {binary_bytes / max(1, frames):.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=16)
+    parser.add_argument("--enemies", type=int, default=60)
+    parser.add_argument("--ticks", type=int, default=400)
+    parser.add_argument("--stall", type=int, default=130, help="trames perdues d'affilee (> 120 : retour a la baseline 0)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.players, args.enemies, args.ticks, args.stall, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Micro-benchmark de la collision sort-vs-sort.
+
+Compare l'ancienne double boucle O(n^2) a la broad phase sort-and-sweep de
+`resolve_spell_vs_spell` pour 50 / 200 / 1000 sorts actifs, et verifie que
+les deux donnent le meme resultat.
+
+    python -m server.benchmarks.spell_vs_spell
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import timeit
+
+from server.spells.active_spell import ActiveSpell
+from server.spells.parametric_spell import resolve_spell_vs_spell
+
+
+def resolve_spell_vs_spell_naive(active: list[ActiveSpell]) -> list[ActiveSpell]:
+    """Implementation de reference (double boucle sur toutes les paires)."""
+    to_remove: set[int] = set()
+    for i in range(len(active)):
+        for j in range(i + 1, len(active)):
+            if i in to_remove or j in to_remove:
+                continue
+            si, sj = active[i], active[j]
+            if si.owner_id == sj.owner_id:
+                continue
+            dist = math.hypot(si.x - sj.x, si.y - sj.y)
+            if dist < (si.bounding_radius + sj.bounding_radius) * 0.5:
+                if si.compression > sj.compression:
+                    to_remove.add(j)
+                elif sj.compression > si.compression:
+                    to_remove.add(i)
+    return [s for k, s in enumerate(active) if k not in to_remove]
+
+
+def make_spells(count: int, *, seed: int = 0, map_size: tuple[float, float] = (8000.0, 6000.0)) -> list[ActiveSpell]:
+    """Melange de projectiles, fragments et murs repartis sur une map de la taille de forest."""
+    rng = random.Random(seed)
+    owners = [f"p{k}" for k in range(8)]
+    spells = []
+    for _ in range(count):
+        radius = rng.choice((8.0, 12.0, 24.0, 60.0, 140.0))
+        elongation = rng.choice((1.0, 1.0, 1.0, 3.0))
+        spells.append(ActiveSpell(
+            spell_id="parametric",
+            owner_id=rng.choice(owners),
+            x=rng.uniform(0.0, map_size[0]),
+            y=rng.uniform(0.0, map_size[1]),
+            hitbox_radius=radius,
+            hitbox_radius_x=radius * elongation,
+            hitbox_radius_y=radius / elongation,
+            remaining=2.0,
+            compression=rng.choice((0.0, 0.0, 1.0, 2.0, 3.5)),
+        ))
+    return spells
+
+
+def run(counts: list[int], repeat: int) -> None:
+    print(f"{'spells':>8} {'before (ms)':>12} {'after (ms)':>12} {'speedup':>9}")
+    for count in counts:
+        spells = make_spells(count)
+        assert resolve_spell_vs_spell(spells) == resolve_spell_vs_spell_naive(spells)
+
+        number = max(1, repeat // max(1, count // 50))
+        before = min(timeit.repeat(lambda: resolve_spell_vs_spell_naive(spells), number=number, repeat=3)) / number
+        after = min(timeit.repeat(lambda: resolve_spell_vs_spell(spells), number=number, repeat=3)) / number
+        print(f"{count:>8} {before * 1000:>12.3f} {after * 1000:>12.3f} {before / after:>8.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("counts", nargs="*", type=int, default=[50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.counts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+collision_index.py -- Index de collision statique des objets de map.
+
+Les objets de la map (rochers, arbres, murs...) sont convertis une seule
+fois en AABB puis repartis dans une grille de buckets.  Un test de collision
+ne regarde que les AABB des cellules couvertes par la boite testee, quel que
+soit le nombre d'objets declares dans la map.
+"""
+from __future__ import annotations
+
+import math
+from typing import Iterable
+
+from server.spatial_grid import cell_size_for_map
+
+AABB = tuple[float, float, float, float]  # (x1, y1, x2, y2)
+
+
+def object_aabb(obj: dict) -> AABB | None:
+    """AABB d'un objet de map, None s'il n'est pas collidable (moins de 4 points)."""
+    points = obj.get("points", [])
+    if len(points) < 4:
+        return None
+    x_coords = [p[0] for p in points]
+    y_coords = [p[1] for p in points]
+    return min(x_coords), min(y_coords), max(x_coords), max(y_coords)
+
+
+class StaticCollisionIndex:
+    def __init__(self, objects: Iterable[dict], cell_size: float = 128.0):
+        self.cell_size = max(1.0, float(cell_size))
+        self._inv_cell = 1.0 / self.cell_size
+        self.aabbs: list[AABB] = []
+        self._buckets: dict[tuple[int, int], list[int]] = {}
+        self.rebuild(objects)
+
+    @classmethod
+    def from_map_data(cls, map_data: dict) -> "StaticCollisionIndex":
+        return cls(
+            map_data.get("objects") or [],
+            cell_size=cell_size_for_map(map_data.get("size", [1280, 720])),
+        )
+
+    def rebuild(self, objects: Iterable[dict]) -> None:
+        """Reconstruit l'index (ex: objet transmute en poussiere)."""
+        self.aabbs = []
+        self._buckets = {}
+        for obj in objects:
+            aabb = object_aabb(obj)
+            if aabb is None:
+                continue
+            index = len(self.aabbs)
+            self.aabbs.append(aabb)
+            x1, y1, x2, y2 = aabb
+            min_cx, min_cy = self._cell(x1, y1)
+            max_cx, max_cy = self._cell(x2, y2)
+            for cx in range(min_cx, max_cx + 1):
+                for cy in range(min_cy, max_cy + 1):
+                    self._buckets.setdefault((cx, cy), []).append(index)
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x * self._inv_cell), math.floor(y * self._inv_cell)
+
+    def collides(self, x: float, y: float, size: float) -> bool:
+        """Collision AABB entre une boite carree centree en (x, y) et les objets."""
+        half = size / 2
+        return self.collides_box(x - half, y - half, x + half, y + half)
+
+    def collides_box(self, box_x1: float, box_y1: float, box_x2: float, box_y2: float) -> bool:
+        """Collision entre une boite quelconque (ex: balayee par un deplacement) et les objets."""
+        min_cx, min_cy = self._cell(box_x1, box_y1)
+        max_cx, max_cy = self._cell(box_x2, box_y2)
+        buckets = self._buckets
+        aabbs = self.aabbs
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = buckets.get((cx, cy))
+                if not bucket:
+                    continue
+                for index in bucket:
+                    obj_x1, obj_y1, obj_x2, obj_y2 = aabbs[index]
+                    if (box_x1 < obj_x2 and box_x2 > obj_x1 and
+                            box_y1 < obj_y2 and box_y2 > obj_y1):
+                        return True
+        return False
@@ -10,6 +10,35 @@ HOST = CONFIG.get("server", {}).get("host", "0.0.0.0")
 PORT = CONFIG.get("server", {}).get("port", 9000)
 TICK_RATE = CONFIG.get("server", {}).get("tick_rate", 60)
 TICK_INTERVAL = 1.0 / TICK_RATE
+# Frequence d'envoi des game_update, decouplee de la simulation
+SNAPSHOT_RATE = min(TICK_RATE, CONFIG.get("server", {}).get("snapshot_rate", 30))
+SNAPSHOT_EVERY = max(1, round(TICK_RATE / SNAPSHOT_RATE))
+# Pas de simulation rattrapes au maximum apres un tick en retard
+MAX_CATCHUP_STEPS = CONFIG.get("server", {}).get("max_catchup_steps", 5)
+# Processus hebergeant les instances (0 : tout dans le processus du serveur)
+SHARD_PROCESSES = int(CONFIG.get("server", {}).get("shards", 0))
+# Instances vides gardees en sommeil (secondes, 0 : detruites) et plafond memoire
+HIBERNATE_TTL = float(CONFIG.get("server", {}).get("hibernate_ttl", 300.0))
+HIBERNATE_MAX_BYTES = int(CONFIG.get("server", {}).get("hibernate_max_mb", 64) * 1024 * 1024)
+# Rayon de la zone d'interet d'un joueur (pixels, 0 : tout envoyer a tous)
+VIEW_RADIUS = float(CONFIG.get("server", {}).get("view_radius", 1000.0))
+# Endpoint Prometheus local (GET /metrics), port 0 pour le desactiver
+METRICS_HOST = CONFIG.get("server", {}).get("metrics_host", "127.0.0.1")
+METRICS_PORT = int(CONFIG.get("server", {}).get("metrics_port", 9100))
+# Journal de rejeu des instances (repertoire, "" : desactive) et empreinte d'etat tous les N pas
+RECORD_DIR = CONFIG.get("server", {}).get("record_dir", "") or ""
+RECORD_HASH_EVERY = int(CONFIG.get("server", {}).get("record_hash_every", 1))
 PLAYER_SPEED = CONFIG.get("server", {}).get("player_speed", 300)
 
 MENU_FONT_SIZE = CONFIG.get("menu_font_size", 36)
+
+# Sauvegardes : backend ("sqlite" ou "yaml"), fichier et periode d'ecriture differee
+SAVE_BACKEND = CONFIG.get("save", {}).get("backend", "sqlite")
+SAVE_PATH = CONFIG.get("save", {}).get("path", "save.db")
+SAVE_FLUSH_INTERVAL = float(CONFIG.get("save", {}).get("flush_interval", 0.5))
+# Journal des modifications ("" pour le desactiver), checkpoint et autosave des joueurs en jeu
+SAVE_JOURNAL_PATH = CONFIG.get("save", {}).get("journal_path", "save.journal")
+SAVE_CHECKPOINT_INTERVAL = float(CONFIG.get("save", {}).get("checkpoint_interval", 30.0))
+SAVE_AUTOSAVE_INTERVAL = float(CONFIG.get("save", {}).get("autosave_interval", 1.0))
+# Ancienne sauvegarde importee au premier demarrage sur SQLite
+SAVE_LEGACY_YAML = "save.yml"
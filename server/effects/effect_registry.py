@@ -6,7 +6,6 @@ Chaque effet a 3 callbacks : apply (debut), tick (par intervalle), remove (fin).
 """
 from __future__ import annotations
 
-import time
 import logging
 from dataclasses import dataclass, field
 from typing import Any, Callable, Optional
@@ -89,7 +88,7 @@ def _remove_freeze(instance: Any, effect: ActiveEffect) -> None:
 def _apply_create_terrain(instance: Any, effect: ActiveEffect) -> None:
     """Cree un objet de terrain temporaire."""
     terrain = {
-        "id": f"terrain_{effect.owner_id}_{int(time.time()*1000)}",
+        "id": f"terrain_{effect.owner_id}_{int(instance.clock()*1000)}",
         "type": effect.params.get("terrain_type", "wall"),
         "x": effect.params.get("x", 0.0),
         "y": effect.params.get("y", 0.0),
@@ -129,6 +128,8 @@ def _apply_transmute(instance: Any, effect: ActiveEffect) -> None:
     to_material = effect.params.get("to_material", "dust")
 
     objects = instance.map_data.get("objects", [])
+    changed = False
+    transmuted = False
     for obj in objects:
         points = obj.get("points", [])
         if len(points) < 2:
@@ -139,11 +140,18 @@ def _apply_transmute(instance: Any, effect: ActiveEffect) -> None:
         dist = ((cx - target_x) ** 2 + (cy - target_y) ** 2) ** 0.5
         if dist < radius:
             obj["material"] = to_material
+            changed = True
             if to_material == "dust":
                 obj["_original_points"] = list(obj["points"])
                 obj["points"] = []  # rend l'objet non-collidable
+                transmuted = True
             logging.debug(f"Transmuted object at ({cx:.0f}, {cy:.0f}) to {to_material}")
 
+    if transmuted:
+        instance.collision_index.rebuild(objects)
+    if changed:
+        instance.notify_map_changed()
+
 
 def _apply_push(instance: Any, effect: ActiveEffect) -> None:
     """Pousse les entites dans la zone."""
@@ -154,15 +162,16 @@ def _apply_push(instance: Any, effect: ActiveEffect) -> None:
     push_y = effect.params.get("push_y", 0.0)
     push_force = effect.params.get("push_force", 200.0)
 
-    for enemy in instance.enemies.values():
-        if not enemy.get("alive", True):
-            continue
+    for enemy_id, enemy in instance.enemies_in_radius(cx, cy, radius):
         dx = enemy["x"] - cx
         dy = enemy["y"] - cy
         dist = (dx * dx + dy * dy) ** 0.5
         if dist < radius:
-            enemy["x"] += push_x * push_force * 0.05
-            enemy["y"] += push_y * push_force * 0.05
+            instance.move_enemy(
+                enemy_id,
+                enemy["x"] + push_x * push_force * 0.05,
+                enemy["y"] + push_y * push_force * 0.05,
+            )
 
 
 # ---------------------------------------------------------------------------
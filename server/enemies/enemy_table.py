@@ -0,0 +1,211 @@
+"""
+enemy_table.py -- Stockage struct-of-arrays des ennemis d'une instance.
+
+Chaque champ numerique est un tableau NumPy indexe par ligne ; un id
+d'ennemi garde la meme ligne pendant toute la vie de l'instance.  La table
+se comporte comme un `Mapping[str, EnemyRow]` pour que le code existant
+(`instance.enemies.get(id)`, `enemy["x"]`, `apply_enemy_damage(enemy, ...)`)
+continue de fonctionner, tandis que `GameInstance._update_enemies` travaille
+directement sur les tableaux.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Iterator
+
+import numpy as np
+
+_INITIAL_CAPACITY = 32
+
+# champ -> (dtype, valeur par defaut)
+_FIELDS: dict[str, tuple[Any, Any]] = {
+    "x": (np.float64, 0.0),
+    "y": (np.float64, 0.0),
+    "vx": (np.float64, 0.0),
+    "vy": (np.float64, 0.0),
+    "direction": (np.int8, 1),
+    "health": (np.float64, 100.0),
+    "max_health": (np.float64, 100.0),
+    "alive": (np.bool_, True),
+    "speed_multiplier": (np.float64, 1.0),
+    "frozen": (np.bool_, False),
+    "attack_seq": (np.int64, 0),
+    "last_attack_at": (np.float64, 0.0),
+    "last_update": (np.float64, 0.0),
+}
+
+
+class EnemyRow:
+    """Vue dict-like sur une ligne de la table (les champs hors table vont dans `extras`)."""
+
+    __slots__ = ("_table", "_row", "_id", "extras")
+
+    def __init__(self, table: "EnemyTable", row: int, enemy_id: str):
+        self._table = table
+        self._row = row
+        self._id = enemy_id
+        self.extras: dict[str, Any] = {}
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "id":
+            return self._id
+        column = self._table.columns.get(key)
+        if column is not None:
+            return column[self._row].item()
+        return self.extras[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        column = self._table.columns.get(key)
+        if column is not None:
+            column[self._row] = value
+        elif key != "id":
+            self.extras[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key == "id" or key in self._table.columns or key in self.extras
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self._table.columns or key == "id":
+            raise KeyError(f"Cannot pop table field {key!r}")
+        return self.extras.pop(key, *default)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = {"id": self._id}
+        for name in self._table.columns:
+            data[name] = self[name]
+        data.update(self.extras)
+        return data
+
+
+class EnemyTable(Mapping):
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        self._capacity = max(1, int(capacity))
+        self.count = 0
+        self.ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._views: list[EnemyRow] = []
+        self.columns: dict[str, np.ndarray] = {
+            name: np.full(self._capacity, default, dtype=dtype)
+            for name, (dtype, default) in _FIELDS.items()
+        }
+
+    # --- Acces par colonne (tranches sur les lignes utilisees) ---
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name][:self.count]
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.columns["x"][:self.count]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.columns["y"][:self.count]
+
+    @property
+    def vx(self) -> np.ndarray:
+        return self.columns["vx"][:self.count]
+
+    @property
+    def vy(self) -> np.ndarray:
+        return self.columns["vy"][:self.count]
+
+    @property
+    def alive(self) -> np.ndarray:
+        return self.columns["alive"][:self.count]
+
+    # --- Mapping[str, EnemyRow] ---
+
+    def __getitem__(self, enemy_id: str) -> EnemyRow:
+        return self._views[self._rows[enemy_id]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, enemy_id: object) -> bool:
+        return enemy_id in self._rows
+
+    def row_of(self, enemy_id: str) -> int:
+        return self._rows[enemy_id]
+
+    def view(self, row: int) -> EnemyRow:
+        return self._views[row]
+
+    # --- Mutation ---
+
+    def add(self, enemy_id: str, **fields: Any) -> EnemyRow:
+        """Ajoute un ennemi (ou reinitialise le sien) et renvoie sa vue."""
+        row = self._rows.get(enemy_id)
+        if row is None:
+            if self.count >= self._capacity:
+                self._grow()
+            row = self.count
+            self.count += 1
+            self._rows[enemy_id] = row
+            self.ids.append(enemy_id)
+            self._views.append(EnemyRow(self, row, enemy_id))
+
+        view = self._views[row]
+        view.extras.clear()
+        for name, (_, default) in _FIELDS.items():
+            view[name] = fields.pop(name, default)
+        view.extras.update(fields)
+        return view
+
+    def _grow(self) -> None:
+        new_capacity = self._capacity * 2
+        for name, (dtype, default) in _FIELDS.items():
+            column = np.full(new_capacity, default, dtype=dtype)
+            column[:self._capacity] = self.columns[name]
+            self.columns[name] = column
+        self._capacity = new_capacity
+
+    def shrink_to_fit(self) -> None:
+        """Ramene la capacite au nombre de lignes utilisees (instance en hibernation)."""
+        capacity = max(1, self.count)
+        if capacity == self._capacity:
+            return
+        for name in _FIELDS:
+            self.columns[name] = self.columns[name][:capacity].copy()
+        self._capacity = capacity
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    # --- Etat reseau ---
+
+    def public_states(self) -> dict[str, dict]:
+        """Etat public de tous les ennemis, en types Python natifs."""
+        n = self.count
+        columns = self.columns
+        xs = columns["x"][:n].tolist()
+        ys = columns["y"][:n].tolist()
+        healths = columns["health"][:n].tolist()
+        alives = columns["alive"][:n].tolist()
+        directions = columns["direction"][:n].tolist()
+        attack_seqs = columns["attack_seq"][:n].tolist()
+        return {
+            enemy_id: {
+                "x": xs[row],
+                "y": ys[row],
+                "health": healths[row],
+                "alive": alives[row],
+                "direction": directions[row],
+                "attack_seq": attack_seqs[row],
+            }
+            for row, enemy_id in enumerate(self.ids)
+        }
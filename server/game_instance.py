@@ -3,27 +3,87 @@ import time
 import logging
 import math
 from collections import deque
-from typing import Any, Callable
-
-
-from server.config import TICK_INTERVAL, PLAYER_SPEED
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from server.collision_index import StaticCollisionIndex
+from server.config import (
+    MAX_CATCHUP_STEPS,
+    PLAYER_SPEED,
+    RECORD_DIR,
+    RECORD_HASH_EVERY,
+    SAVE_AUTOSAVE_INTERVAL,
+    SNAPSHOT_EVERY,
+    TICK_INTERVAL,
+    VIEW_RADIUS,
+)
+from server.enemies.enemy_table import EnemyRow, EnemyTable
+from server.interest import InterestChange, InterestManager, VisibleSet
+from server.metrics import InstanceMetrics
 from server.players.player import Player
+from server.replay import ReplayRecorder
 from server.save.error import PlayerNotFound
 from server.save.save import get_save
+from server.sim_clock import TickClock
+from server.snapshot_codec import SNAPSHOT_FORMAT, SnapshotEncoder, WorldSnapshot
+from server.spatial_grid import SpatialHashGrid, cell_size_for_map
+from server.spells.active_spell import ActiveSpell
 from server.spells.default_spells import build_default_spell_registry
 
 
+MAX_INPUTS_PER_TICK = 60  # limite pour éviter de surcharger le serveur
+
+# Touches du masque d'input (client/entities/player.py)
+IN_UP, IN_DOWN, IN_LEFT, IN_RIGHT = 1, 2, 4, 8
+# Seuls les bits de deplacement comptent cote serveur (tableau / trace : 32, 64)
+IN_MOVE_MASK = IN_UP | IN_DOWN | IN_LEFT | IN_RIGHT
+
+# Estimation de la memoire d'une instance hibernee : socle (registre de
+# sorts, index, attributs), surcout Python par ennemi, par sort/effet/terrain
+_INSTANCE_BASE_BYTES = 16 * 1024
+_ENEMY_OVERHEAD_BYTES = 512
+_WORLD_ITEM_BYTES = 1024
+
+
+def _spell_extent(spell: dict) -> float:
+    return max(spell["r"], spell.get("rx", 0.0), spell.get("ry", 0.0))
+
+
 class GameInstance:
-    def __init__(self, map_id: str, map_data: dict, broadcast_callback: Callable):
+    def __init__(
+        self,
+        map_id: str,
+        map_data: dict,
+        broadcast_callback: Callable,
+        collision_index: Optional[StaticCollisionIndex] = None,
+        send_raw_callback: Optional[Callable] = None,
+        clock: Optional[TickClock] = None,
+        record_dir: str = RECORD_DIR,
+        map_changed_callback: Optional[Callable[[str, list], None]] = None,
+    ):
         self.map_id = map_id
         self.map_data = map_data
+        # Objets de map modifies en jeu -> MapLoader (message map_data et hash des joins)
+        self.map_changed_callback = map_changed_callback
+        # Horloge de simulation (avance d'un pas par tick, jamais l'heure murale)
+        self.clock = clock if clock is not None else TickClock(time.time())
+        # Objets de map statiques : index precalcule par le MapLoader
+        self.collision_index = collision_index or StaticCollisionIndex.from_map_data(map_data)
         self.players: dict[str, Player] = {}
-        self.pending_inputs: dict[str, deque[dict]] = {}
+        # Inputs en attente par client, en runs [masque, nombre, premier seq, dernier seq]
+        self.pending_inputs: dict[str, deque[list[int]]] = {}
         self.players_previous_state: dict[str, dict] = {}
-        self.enemies: dict[str, dict] = {}
+        self.enemies = EnemyTable()
         self.enemies_previous_state = {}
         self.running = True
+        self._loop_task: Optional[asyncio.Task] = None
+        # Date de mise en hibernation (None : instance active)
+        self.hibernated_at: Optional[float] = None
         self.broadcast_callback = broadcast_callback
+        # Clients ayant negocie les snapshots binaires (format "bin1")
+        self.send_raw_callback = send_raw_callback
+        self.snapshot_encoders: dict[str, SnapshotEncoder] = {}
         self.enemy_speed = 180.0
         self.player_collision_size = 26.0
         self.enemy_collision_size = 24.0
@@ -37,10 +97,13 @@ class GameInstance:
         )
         self.enemy_attack_damage = 12
         self.enemy_attack_cooldown = 1.1
-        self.active_spells: list[dict] = []
+        self.active_spells: list[ActiveSpell] = []
         self.active_effects: list = []       # list[ActiveEffect]
         self.active_terrain: list[dict] = [] # terrain temporaire cree par sorts
         self.pending_triggers: list[dict] = []  # triggers temporels s2
+        # Dernier etat journalise par joueur (autosave depuis la boucle de tick)
+        self._autosaved_state: dict[str, tuple] = {}
+        self._last_autosave = time.time()
         self._had_spells_last_tick: bool = False
         self.fire_rune_tick_damage = 12
         self.fire_rune_tick_interval = 0.20
@@ -50,15 +113,30 @@ class GameInstance:
         self.fire_rune_max_cast_distance = 520.0
         self.spell_registry = build_default_spell_registry()
 
-        # Stats monitoring
+        # Index spatiaux (ennemis / joueurs vivants), mis a jour a chaque deplacement
+        grid_cell_size = cell_size_for_map(map_data.get("size", [1280, 720]))
+        self.enemy_grid = SpatialHashGrid(grid_cell_size)
+        self.player_grid = SpatialHashGrid(grid_cell_size)
+        # Zone d'interet par client (view_radius de config.yaml, 0 : tout envoyer)
+        self.interest = InterestManager(VIEW_RADIUS)
+
+        # Stats monitoring : phases du tick en tampons circulaires (endpoint metrics),
+        # compteurs de fenetre remis a zero a chaque log
+        self.metrics = InstanceMetrics()
         self.tick_count = 0
-        self.dt_samples: list[float] = []
+        self.tick_overruns = 0
+        self.inputs_total = 0
         self.last_stats_log = time.time()
+        self._dt_logged = 0
         self.inputs_processed = 0
         self.messages_sent = 0
 
         logging.info(f"Created game instance for map '{map_id}' - {map_data.get('name', 'Unnamed')}")
         self._spawn_map_enemies()
+        # Journal de rejeu (server.record_dir de config.yaml)
+        self.recorder: Optional[ReplayRecorder] = None
+        if record_dir:
+            self.recorder = ReplayRecorder.for_instance(record_dir, self, RECORD_HASH_EVERY)
 
     def create_player(self, client_id: str, x=100, y=100) -> Player:
         """Crée un nouveau joueur, restaure position et état depuis la save"""
@@ -87,6 +165,11 @@ class GameInstance:
         except PlayerNotFound:
             pass
 
+        return self.add_player(client_id, x, y, health, max_health, alive)
+
+    def add_player(self, client_id: str, x: float, y: float, health: float = 100.0,
+                   max_health: float = 100.0, alive: bool = True) -> Player:
+        """Ajoute un joueur dans l'etat donne (sans passer par la save)"""
         player = Player(
             id=client_id,
             x=float(x),
@@ -97,9 +180,46 @@ class GameInstance:
         )
 
         self.players[client_id] = player
+        if player.is_alive():
+            self.player_grid.move(client_id, player.x, player.y)
+        if self.recorder is not None:
+            self.recorder.join(self.tick_count, player)
         self.running = True
         return player
 
+    def admit_player(self, client_id: str, snapshot_formats=()) -> Player:
+        """Cree le joueur, lui envoie l'etat initial et previent les autres joueurs"""
+        player = self.create_player(client_id)
+
+        players_state = self.get_players_state()
+        enemies_state = self.get_enemies_state()
+        if self.interest.enabled:
+            # Etat initial limite a la vue du joueur
+            visible, _ = self._update_interest(client_id, player, self._dead_players())
+            players_state = {pid: players_state[pid] for pid in visible.players if pid in players_state}
+            enemies_state = {eid: enemies_state[eid] for eid in visible.enemies if eid in enemies_state}
+
+        # on laisse le player qui se connect pour lui indiquer sont emplacement
+        game_state = {
+            "t": "game_state",
+            "your_id": client_id,
+            "your_player": player.to_full_state(),
+            "players": players_state,
+            "enemies": enemies_state
+        }
+        # Snapshots binaires si le client les supporte
+        if SNAPSHOT_FORMAT in snapshot_formats and self.enable_binary_snapshots(client_id):
+            game_state["snapshot_format"] = SNAPSHOT_FORMAT
+        self.broadcast_callback(game_state, [client_id])
+
+        # Notifier les autres joueurs de cette instance
+        self.interest.reveal_player(client_id)
+        self.broadcast_to_players({
+            "t": "player_joined",
+            "player": player.to_full_state()
+        })
+        return player
+
     def save_player(self, client_id: str) -> None:
         """Sauvegarde position et état d'un joueur"""
         player = self.players.get(client_id)
@@ -113,23 +233,62 @@ class GameInstance:
             "alive": player.alive,
         })
 
+    def autosave_players(self) -> None:
+        """Journalise les joueurs dont l'etat a change depuis le dernier autosave (non bloquant)."""
+        for client_id, player in self.players.items():
+            state = (player.x, player.y, player.health, player.max_health, player.alive)
+            if self._autosaved_state.get(client_id) != state:
+                self._autosaved_state[client_id] = state
+                self.save_player(client_id)
+
     def save_all_players(self) -> None:
         """Sauvegarde tous les joueurs de cette instance"""
         for client_id in self.players:
             self.save_player(client_id)
 
-    def remove_player(self, client_id: str):
+    def remove_player(self, client_id: str, save: bool = True):
         """Sauvegarde puis supprime un joueur de cette instance"""
-        self.save_player(client_id)
+        if save:
+            self.save_player(client_id)
         if client_id in self.players:
             del self.players[client_id]
+            if self.recorder is not None:
+                self.recorder.leave(self.tick_count, client_id)
+        self.player_grid.remove(client_id)
+        self.snapshot_encoders.pop(client_id, None)
+        self.interest.forget(client_id)
+        self._autosaved_state.pop(client_id, None)
         if client_id in self.pending_inputs:
             del self.pending_inputs[client_id]
 
-    def add_input(self, client_id: str, input_data: dict):
-        """Ajoute un input en attente pour un joueur"""
-        if client_id in self.players:
-            self.pending_inputs.setdefault(client_id, deque()).append(input_data)
+    def add_input(self, client_id: str, k: int, seq: int):
+        """Ajoute un input en attente ; un masque identique au precedent allonge son run"""
+        if client_id not in self.players:
+            return
+        k &= IN_MOVE_MASK
+        runs = self.pending_inputs.get(client_id)
+        if runs is None:
+            runs = self.pending_inputs[client_id] = deque()
+        if runs and runs[-1][0] == k:
+            run = runs[-1]
+            run[1] += 1
+            run[3] = max(run[3], seq)
+        else:
+            runs.append([k, 1, seq, seq])
+        if self.recorder is not None:
+            self.recorder.input(self.tick_count, client_id, k, seq)
+
+    def enable_binary_snapshots(self, client_id: str) -> bool:
+        """Passe un client en snapshots binaires delta (False si pas de canal brut)."""
+        if self.send_raw_callback is None:
+            return False
+        self.snapshot_encoders[client_id] = SnapshotEncoder()
+        return True
+
+    def ack_snapshot(self, client_id: str, seq: int) -> None:
+        encoder = self.snapshot_encoders.get(client_id)
+        if encoder is not None:
+            encoder.ack(seq)
 
     def get_players_state(self) -> dict[str, dict]:
         return {
@@ -148,6 +307,8 @@ class GameInstance:
         player = self.players.get(client_id)
         if player is None or not player.is_alive():
             return
+        if self.recorder is not None:
+            self.recorder.cast(self.tick_count, client_id, "add_spell_cast_from_intent", msg)
 
         execute_spell_intent(self, client_id, msg)
 
@@ -159,6 +320,8 @@ class GameInstance:
         player = self.players.get(client_id)
         if player is None or not player.can_cast_a_spell():
             return
+        if self.recorder is not None:
+            self.recorder.cast(self.tick_count, client_id, "add_spell_cast_from_spec", msg)
 
         spec = spec_from_network(msg)
         cast_parametric_spell(self, client_id, spec)
@@ -170,6 +333,8 @@ class GameInstance:
         player = self.players[client_id]
         if not player.is_alive():
             return
+        if self.recorder is not None:
+            self.recorder.cast(self.tick_count, client_id, "add_spell_cast", spell_data)
 
         spell_id, payload, modifiers = self._decode_spell_cast_message(spell_data)
         if spell_id is None:
@@ -310,24 +475,25 @@ class GameInstance:
         spawn_points = self.map_data.get("enemy_spawn_points", [])
         for index, spawn in enumerate(spawn_points):
             enemy_id = str(spawn.get("id", f"e{index + 1}"))
-            self.enemies[enemy_id] = {
-                "id": enemy_id,
-                "x": float(spawn.get("x", 100.0)),
-                "y": float(spawn.get("y", 100.0)),
-                "vx": 0.0,
-                "vy": 0.0,
-                "direction": 1,
-                "health": 100,
-                "max_health": 100,
-                "alive": True,
-                "attack_seq": 0,
-                "last_attack_at": 0.0,
-                "last_update": time.time(),
-            }
+            enemy = self.enemies.add(
+                enemy_id,
+                x=float(spawn.get("x", 100.0)),
+                y=float(spawn.get("y", 100.0)),
+                vx=0.0,
+                vy=0.0,
+                direction=1,
+                health=100,
+                max_health=100,
+                alive=True,
+                attack_seq=0,
+                last_attack_at=0.0,
+                last_update=self.clock(),
+            )
+            self.enemy_grid.move(enemy_id, enemy["x"], enemy["y"])
         if spawn_points:
             logging.info(f"[{self.map_id}] Spawned {len(spawn_points)} enemies")
 
-    def _enemy_public_state(self, enemy_data: dict) -> dict:
+    def _enemy_public_state(self, enemy_data: EnemyRow) -> dict:
         return {
             "x": enemy_data["x"],
             "y": enemy_data["y"],
@@ -337,113 +503,123 @@ class GameInstance:
             "attack_seq": enemy_data["attack_seq"],
         }
 
-    def get_enemies_state(self) -> dict:
-        return {
-            enemy_id: self._enemy_public_state(enemy_data)
-            for enemy_id, enemy_data in self.enemies.items()
-        }
+    def enemies_in_radius(self, x: float, y: float, radius: float) -> list[tuple[str, EnemyRow]]:
+        """Ennemis vivants dont le centre est a distance <= radius, dans l'ordre de spawn."""
+        enemies = self.enemies
+        found = []
+        for enemy_id in self.enemy_grid.query_radius(x, y, radius):
+            enemy = enemies.get(enemy_id)
+            if enemy is not None and enemy.get("alive", True):
+                found.append((enemy_id, enemy))
+        return found
+
+    def move_enemy(self, enemy_id: str, x: float, y: float) -> None:
+        """Deplace un ennemi et met a jour l'index spatial."""
+        enemy = self.enemies[enemy_id]
+        enemy["x"] = x
+        enemy["y"] = y
+        self.enemy_grid.move(enemy_id, x, y)
 
-    @staticmethod
-    def _aabb_overlap(
-        x1: float,
-        y1: float,
-        w1: float,
-        h1: float,
-        x2: float,
-        y2: float,
-        w2: float,
-        h2: float
-    ) -> bool:
-        left1 = x1 - w1 / 2
-        right1 = x1 + w1 / 2
-        top1 = y1 - h1 / 2
-        bottom1 = y1 + h1 / 2
-
-        left2 = x2 - w2 / 2
-        right2 = x2 + w2 / 2
-        top2 = y2 - h2 / 2
-        bottom2 = y2 + h2 / 2
-
-        return left1 < right2 and right1 > left2 and top1 < bottom2 and bottom1 > top2
+    def get_enemies_state(self) -> dict:
+        return self.enemies.public_states()
 
     def _update_enemies(self):
+        """Pas de poursuite vectorise sur toutes les lignes de la table d'ennemis."""
+        table = self.enemies
+        if not table.count:
+            return
+
         alive_players = [p for p in self.players.values() if p.is_alive()]
         if not alive_players:
-            for enemy in self.enemies.values():
-                enemy["vx"] = 0.0
-                enemy["vy"] = 0.0
+            table.vx[:] = 0.0
+            table.vy[:] = 0.0
             return
 
         map_width, map_height = self.map_data.get("size", [1280, 720])
-        now = time.time()
-
-        for enemy in self.enemies.values():
-            if not enemy.get("alive", True):
-                continue
-
-            # Gele : ne bouge pas
-            speed_mult = float(enemy.get("speed_multiplier", 1.0))
-            if enemy.get("frozen", False) or speed_mult < 0.01:
-                enemy["vx"] = 0.0
-                enemy["vy"] = 0.0
-                continue
-
-            target = min(
-                alive_players,
-                key=lambda player: player.distance_sq_to(enemy["x"], enemy["y"]),
-            )
+        now = self.clock()
+
+        # Gele : ne bouge pas (et n'attaque pas)
+        alive = table.alive
+        speed_mult = table.column("speed_multiplier")
+        frozen = table.column("frozen") | (speed_mult < 0.01)
+        table.vx[alive & frozen] = 0.0
+        table.vy[alive & frozen] = 0.0
+        rows = np.flatnonzero(alive & ~frozen)
+        if rows.size == 0:
+            return
 
-            dx = target.x - enemy["x"]
-            dy = target.y - enemy["y"]
-            distance = math.hypot(dx, dy)
-
-            effective_speed = self.enemy_speed * speed_mult
-            vx = 0.0
-            vy = 0.0
-            if distance > self.enemy_stop_distance:
-                vx = (dx / distance) * effective_speed
-                vy = (dy / distance) * effective_speed
-
-            new_x = enemy["x"] + vx * TICK_INTERVAL
-            new_y = enemy["y"] + vy * TICK_INTERVAL
-
-            new_x = max(self.enemy_collision_size / 2, min(new_x, map_width - self.enemy_collision_size / 2))
-            new_y = max(self.enemy_collision_size / 2, min(new_y, map_height - self.enemy_collision_size / 2))
-
-            if not self._check_collision_with_objects(new_x, new_y, self.enemy_collision_size):
-                enemy["x"] = new_x
-                enemy["y"] = new_y
-            else:
-                vx = 0.0
-                vy = 0.0
-
-            enemy["vx"] = vx
-            enemy["vy"] = vy
-            if dx < 0:
-                enemy["direction"] = -1
-            elif dx > 0:
-                enemy["direction"] = 1
-
-            has_attack_overlap = self._aabb_overlap(
-                enemy["x"],
-                enemy["y"],
-                self.enemy_attack_hitbox_w,
-                self.enemy_attack_hitbox_h,
-                target.x,
-                target.y,
-                self.player_attack_hurtbox_w,
-                self.player_attack_hurtbox_h,
-            )
-            if has_attack_overlap and (now - enemy["last_attack_at"] >= self.enemy_attack_cooldown):
-                self._apply_enemy_attack(enemy, target, now)
+        enemy_x = table.x[rows]
+        enemy_y = table.y[rows]
+
+        # Cible : joueur vivant le plus proche (egalite : premier joueur)
+        player_x = np.array([p.x for p in alive_players])
+        player_y = np.array([p.y for p in alive_players])
+        offset_x = enemy_x[:, None] - player_x[None, :]
+        offset_y = enemy_y[:, None] - player_y[None, :]
+        targets = np.argmin(offset_x * offset_x + offset_y * offset_y, axis=1)
+
+        dx = player_x[targets] - enemy_x
+        dy = player_y[targets] - enemy_y
+        distance = np.hypot(dx, dy)
+
+        effective_speed = self.enemy_speed * speed_mult[rows]
+        chasing = distance > self.enemy_stop_distance
+        safe_distance = np.where(chasing, distance, 1.0)
+        vx = np.where(chasing, (dx / safe_distance) * effective_speed, 0.0)
+        vy = np.where(chasing, (dy / safe_distance) * effective_speed, 0.0)
+
+        half_size = self.enemy_collision_size / 2
+        new_x = np.maximum(half_size, np.minimum(enemy_x + vx * TICK_INTERVAL, map_width - half_size))
+        new_y = np.maximum(half_size, np.minimum(enemy_y + vy * TICK_INTERVAL, map_height - half_size))
+
+        blocked = np.fromiter(
+            (
+                self._check_collision_with_objects(cx, cy, self.enemy_collision_size)
+                for cx, cy in zip(new_x.tolist(), new_y.tolist())
+            ),
+            dtype=bool,
+            count=rows.size,
+        )
+        enemy_x = np.where(blocked, enemy_x, new_x)
+        enemy_y = np.where(blocked, enemy_y, new_y)
+        table.x[rows] = enemy_x
+        table.y[rows] = enemy_y
+        table.vx[rows] = np.where(blocked, 0.0, vx)
+        table.vy[rows] = np.where(blocked, 0.0, vy)
+
+        direction = table.column("direction")
+        direction[rows[dx < 0]] = -1
+        direction[rows[dx > 0]] = 1
+
+        ids = table.ids
+        for row, cx, cy in zip(rows[~blocked].tolist(), new_x[~blocked].tolist(), new_y[~blocked].tolist()):
+            self.enemy_grid.move(ids[row], cx, cy)
+
+        # Attaque : chevauchement hitbox ennemi / hurtbox de la cible
+        half_hit_w = self.enemy_attack_hitbox_w / 2
+        half_hit_h = self.enemy_attack_hitbox_h / 2
+        half_hurt_w = self.player_attack_hurtbox_w / 2
+        half_hurt_h = self.player_attack_hurtbox_h / 2
+        target_x = player_x[targets]
+        target_y = player_y[targets]
+        overlap = (
+            (enemy_x - half_hit_w < target_x + half_hurt_w)
+            & (enemy_x + half_hit_w > target_x - half_hurt_w)
+            & (enemy_y - half_hit_h < target_y + half_hurt_h)
+            & (enemy_y + half_hit_h > target_y - half_hurt_h)
+        )
+        ready = now - table.column("last_attack_at")[rows] >= self.enemy_attack_cooldown
+        for index in np.flatnonzero(overlap & ready).tolist():
+            self._apply_enemy_attack(table.view(rows[index]), alive_players[targets[index]], now)
 
-            enemy["last_update"] = time.time()
+        table.column("last_update")[rows] = now
 
-    def _apply_enemy_attack(self, enemy: dict, target_player: Player, now: float):
+    def _apply_enemy_attack(self, enemy: EnemyRow, target_player: Player, now: float):
         if not target_player.is_alive():
             return
 
-        target_player.take_damage(self.enemy_attack_damage)
+        if target_player.take_damage(self.enemy_attack_damage):
+            self.player_grid.remove(target_player.id)
 
         enemy["last_attack_at"] = now
         enemy["attack_seq"] += 1
@@ -452,67 +628,48 @@ class GameInstance:
         if not self.active_spells:
             return
 
-        next_spells: list[dict] = []
-        expired_s2: list[dict] = []
+        next_spells: list[ActiveSpell] = []
+        expired_s2: list[ActiveSpell] = []
         map_width, map_height = self.map_data.get("size", [1280, 720])
         for spell in self.active_spells:
-            spell["remaining"] -= TICK_INTERVAL
-            if spell["remaining"] <= 0.0:
+            spell.remaining -= TICK_INTERVAL
+            if spell.remaining <= 0.0:
                 # Sort s2 expire : verifier les triggers on_expire
-                if spell.get("_s2_phases") is not None:
+                if spell.s2_phases is not None:
                     expired_s2.append(spell)
                 # Split à l'expiration : fragmente le sort si demandé et
                 # pas déjà déclenché (split_on_impact=False ou absent)
                 if (
-                    spell.get("split_count", 0) > 0
-                    and not spell.get("split_on_impact", False)
-                    and not spell.get("split_triggered", False)
-                    and not spell.get("split_fragment", False)
+                    spell.split_count > 0
+                    and not spell.split_on_impact
+                    and not spell.split_triggered
+                    and not spell.split_fragment
                 ):
                     from server.spells.parametric_spell import _spawn_split_projectiles
-                    spell["split_triggered"] = True
+                    spell.split_triggered = True
                     _spawn_split_projectiles(self, spell)
                 continue
 
-            velocity_x = float(spell.get("velocity_x", 0.0))
-            velocity_y = float(spell.get("velocity_y", 0.0))
-            if abs(velocity_x) > 1e-6 or abs(velocity_y) > 1e-6:
-                x = float(spell.get("x", 0.0)) + velocity_x * TICK_INTERVAL
-                y = float(spell.get("y", 0.0)) + velocity_y * TICK_INTERVAL
-                radius_x = max(
-                    1.0,
-                    float(
-                        spell.get(
-                            "hitbox_radius_x",
-                            spell.get("hitbox_radius", self.fire_rune_min_radius),
-                        )
-                    ),
-                )
-                radius_y = max(
-                    1.0,
-                    float(
-                        spell.get(
-                            "hitbox_radius_y",
-                            spell.get("hitbox_radius", self.fire_rune_min_radius),
-                        )
-                    ),
-                )
-                spell["x"] = self._clamp(x, radius_x, max(radius_x, map_width - radius_x))
-                spell["y"] = self._clamp(y, radius_y, max(radius_y, map_height - radius_y))
-
-            tick_interval = max(0.05, float(spell.get("tick_interval", self.fire_rune_tick_interval)))
-            spell_id = str(spell.get("spell_id", spell.get("spell", "")))
-            tick_handler = self.spell_registry.get_tick_handler(spell_id)
-            pre_tick_remaining = spell["remaining"]
-            while now >= spell["next_tick_at"] and spell["remaining"] > 0.0:
+            if spell.is_moving:
+                x = spell.x + spell.velocity_x * TICK_INTERVAL
+                y = spell.y + spell.velocity_y * TICK_INTERVAL
+                radius_x = max(1.0, spell.hitbox_radius_x)
+                radius_y = max(1.0, spell.hitbox_radius_y)
+                spell.x = self._clamp(x, radius_x, max(radius_x, map_width - radius_x))
+                spell.y = self._clamp(y, radius_y, max(radius_y, map_height - radius_y))
+
+            tick_interval = spell.tick_interval
+            tick_handler = self.spell_registry.get_tick_handler(spell.spell_id)
+            pre_tick_remaining = spell.remaining
+            while now >= spell.next_tick_at and spell.remaining > 0.0:
                 if tick_handler is not None:
                     tick_handler(self, spell)
-                spell["next_tick_at"] += tick_interval
+                spell.next_tick_at += tick_interval
             # Sort s2 tue par impact (remaining passe a 0 pendant le tick)
-            if spell["remaining"] <= 0.0 and pre_tick_remaining > 0.0 and spell.get("_s2_phases") is not None:
+            if spell.remaining <= 0.0 and pre_tick_remaining > 0.0 and spell.s2_phases is not None:
                 expired_s2.append(spell)  # on_impact triggers aussi via on_expire path
                 # Marquer comme impact pour distinguer on_impact vs on_expire
-                spell["_s2_impact_kill"] = True
+                spell.s2_impact_kill = True
                 continue
             next_spells.append(spell)
 
@@ -522,7 +679,7 @@ class GameInstance:
         if expired_s2:
             from server.magic.phase_executor import handle_spell_trigger_on_expire, handle_spell_trigger_on_impact
             for spell in expired_s2:
-                if spell.get("_s2_impact_kill"):
+                if spell.s2_impact_kill:
                     handle_spell_trigger_on_impact(self, spell)
                 else:
                     handle_spell_trigger_on_expire(self, spell)
@@ -573,66 +730,36 @@ class GameInstance:
 
     def _check_collision_with_objects(self, x: float, y: float, player_size: float = 32) -> bool:
         """Vérifie les collisions avec les objets de la map"""
-        objects = self.map_data.get('objects', [])
-
-        for obj in objects:
-            points = obj.get('points', [])
-            if len(points) >= 4:
-                # Rectangle simple : prendre min/max x et y
-                x_coords = [p[0] for p in points]
-                y_coords = [p[1] for p in points]
-
-                obj_x1, obj_x2 = min(x_coords), max(x_coords)
-                obj_y1, obj_y2 = min(y_coords), max(y_coords)
-
-                # Collision AABB simple
-                player_x1 = x - player_size / 2
-                player_x2 = x + player_size / 2
-                player_y1 = y - player_size / 2
-                player_y2 = y + player_size / 2
-
-                if (player_x1 < obj_x2 and player_x2 > obj_x1 and
-                        player_y1 < obj_y2 and player_y2 > obj_y1):
-                    return True
-
-        # Terrain temporaire (sorts) — ne bloque que le non-traversable
+        half = player_size / 2
+        return self._check_collision_box(x - half, y - half, x + half, y + half)
+
+    def _check_collision_box(self, x1: float, y1: float, x2: float, y2: float) -> bool:
+        """Collision d'une boite avec les objets de la map puis le terrain temporaire"""
+        if self.collision_index.collides_box(x1, y1, x2, y2):
+            return True
+        # Couche dynamique : terrain temporaire (sorts), ne bloque que le non-traversable
         for terrain in self.active_terrain:
             if terrain.get("traversable", False):
                 continue
             tx, ty = terrain["x"], terrain["y"]
             tw, th = terrain["w"], terrain["h"]
-            player_x1 = x - player_size / 2
-            player_x2 = x + player_size / 2
-            player_y1 = y - player_size / 2
-            player_y2 = y + player_size / 2
-            if (player_x1 < tx + tw / 2 and player_x2 > tx - tw / 2 and
-                    player_y1 < ty + th / 2 and player_y2 > ty - th / 2):
+            if (x1 < tx + tw / 2 and x2 > tx - tw / 2 and
+                    y1 < ty + th / 2 and y2 > ty - th / 2):
                 return True
 
         return False
 
-    def process_input(self, player: Player, input_data: dict):
-        """Traite l'input d'un joueur"""
-        if not player.can_receive_input():
-            return
-
-        # ===== ENREGISTRER LE SEQ TRAITÉ =====
-        seq = input_data.get("seq", -1)
-        player.record_input_seq(seq)
-
-        k = input_data.get("k", 0)
+    @staticmethod
+    def _input_velocity(k: int) -> tuple[float, float]:
         speed = PLAYER_SPEED
-
-        in_up, in_down, in_left, in_right = 1, 2, 4, 8
-
         vx = vy = 0.0
-        if k & in_up:
+        if k & IN_UP:
             vy -= speed
-        if k & in_down:
+        if k & IN_DOWN:
             vy += speed
-        if k & in_left:
+        if k & IN_LEFT:
             vx -= speed
-        if k & in_right:
+        if k & IN_RIGHT:
             vx += speed
 
         # Normaliser la vitesse en diagonale
@@ -640,173 +767,407 @@ class GameInstance:
             diag = 0.70710678
             vx *= diag
             vy *= diag
+        return vx, vy
 
-        if vx != 0.0 or vy != 0.0:
-            player.set_facing_from_vector(vx, vy)
+    def process_input(self, player: Player, k: int, seq: Optional[int], steps: int = 1):
+        """Applique `steps` inputs consecutifs de masque `k` (un pas de TICK_INTERVAL chacun).
 
-        # Calculer la nouvelle position
-        new_x = player.x + vx * TICK_INTERVAL
-        new_y = player.y + vy * TICK_INTERVAL
+        Les positions sont cumulees pas a pas, mais un seul test de collision
+        couvre la boite balayee du premier au dernier pas ; ce n'est que si
+        elle touche un obstacle que chaque pas est teste, comme un input isole.
+        `seq` est celui du dernier input applique (None : ne pas l'enregistrer).
+        """
+        if not player.can_receive_input():
+            return
 
-        # Vérifier les limites de la map
-        MAP_WIDTH, MAP_HEIGHT = self.map_data.get("size", [1280, 720])
-        PLAYER_SIZE = self.player_collision_size
+        # ===== ENREGISTRER LE SEQ TRAITÉ =====
+        if seq is not None:
+            player.record_input_seq(seq)
 
-        new_x = max(PLAYER_SIZE / 2, min(new_x, MAP_WIDTH - PLAYER_SIZE / 2))
-        new_y = max(PLAYER_SIZE / 2, min(new_y, MAP_HEIGHT - PLAYER_SIZE / 2))
+        vx, vy = self._input_velocity(k)
+        if vx != 0.0 or vy != 0.0:
+            player.set_facing_from_vector(vx, vy)
 
-        # Vérifier les collisions avec les objets
-        if not self._check_collision_with_objects(new_x, new_y, PLAYER_SIZE):
-            player.set_motion(x=new_x, y=new_y, vx=vx, vy=vy)
-        else:
+        # Limites de la map
+        map_width, map_height = self.map_data.get("size", [1280, 720])
+        half = self.player_collision_size / 2
+        max_x = map_width - half
+        max_y = map_height - half
+        step_x = vx * TICK_INTERVAL
+        step_y = vy * TICK_INTERVAL
+
+        x, y = player.x, player.y
+        first_x = last_x = max(half, min(x + step_x, max_x))
+        first_y = last_y = max(half, min(y + step_y, max_y))
+        for _ in range(steps - 1):
+            last_x = max(half, min(last_x + step_x, max_x))
+            last_y = max(half, min(last_y + step_y, max_y))
+
+        # Boite balayee (le bornage rend chaque axe monotone)
+        if not self._check_collision_box(
+            min(first_x, last_x) - half, min(first_y, last_y) - half,
+            max(first_x, last_x) + half, max(first_y, last_y) + half,
+        ):
+            player.set_motion(x=last_x, y=last_y, vx=vx, vy=vy)
+            self.player_grid.move(player.id, last_x, last_y)
+            return
+
+        # Obstacle sur le trajet : avancer pas a pas jusqu'au premier pas bloque
+        moved = blocked = False
+        for _ in range(steps):
+            new_x = max(half, min(x + step_x, max_x))
+            new_y = max(half, min(y + step_y, max_y))
+            if self._check_collision_box(new_x - half, new_y - half, new_x + half, new_y + half):
+                blocked = True
+                break
+            x, y = new_x, new_y
+            moved = True
+        if moved:
+            player.set_motion(x=x, y=y, vx=vx, vy=vy)
+            self.player_grid.move(player.id, x, y)
+        if blocked:
             # Arrêter le mouvement en cas de collision
             player.stop()
 
-    async def broadcast_to_players(self, message: dict):
+    def _process_pending_inputs(self) -> int:
+        """Applique les runs en attente, au plus MAX_INPUTS_PER_TICK inputs par client ; renvoie leur nombre"""
+        processed = 0
+        for client_id, runs in self.pending_inputs.items():
+            player = self.players.get(client_id)
+            if player is None:
+                continue
+            budget = MAX_INPUTS_PER_TICK
+            while runs and budget:
+                run = runs[0]
+                k, count, first_seq, seq = run
+                if count <= budget:
+                    runs.popleft()
+                    steps = count
+                else:
+                    # Run coupe : seq du dernier input consomme, en supposant
+                    # des seq consecutifs dans le run (borne par son dernier seq)
+                    steps = budget
+                    seq = min(first_seq + steps - 1, seq)
+                    run[1] -= steps
+                    run[2] = first_seq + steps
+                self.process_input(player, k, seq, steps)
+                budget -= steps
+                processed += steps
+        return processed
+
+    def broadcast_to_players(self, message: dict):
         """Diffuse un message à tous les joueurs de cette instance"""
         if self.broadcast_callback:
             player_ids = list(self.players.keys())
-            await self.broadcast_callback(message, player_ids)
+            self.broadcast_callback(message, player_ids)
             self.messages_sent += 1
 
+    def _build_world_snapshot(self, now: float) -> WorldSnapshot:
+        """Etat complet du tick, construit une fois pour tous les clients."""
+        return WorldSnapshot(
+            timestamp=now,
+            players={
+                player_id: player.to_update_state()
+                for player_id, player in self.players.items()
+            },
+            enemies=self.get_enemies_state(),
+            # Sorts actifs : envoyés à chaque tick quand ils existent
+            spells=[s.to_network_state() for s in self.active_spells],
+            # Terrain temporaire
+            terrain=[
+                {
+                    "id": t["id"],
+                    "type": t["type"],
+                    "x": round(t["x"], 1),
+                    "y": round(t["y"], 1),
+                    "w": round(t["w"], 1),
+                    "h": round(t["h"], 1),
+                    "traversable": t.get("traversable", False),
+                }
+                for t in self.active_terrain
+            ],
+            # Effets actifs (frozen enemies etc.)
+            effects=[
+                {
+                    "eid": e.effect_id,
+                    "target": e.target_id,
+                    "remaining": round(e.remaining, 1),
+                }
+                for e in self.active_effects
+            ],
+        )
+
+    def _send_json_update(self, world: WorldSnapshot, player_ids: list[str]) -> None:
+        """Chemin JSON : n'envoie que les entites modifiees depuis le tick precedent."""
+        players_state = {
+            player_id: data
+            for player_id, data in world.players.items()
+            if self.players_previous_state.get(player_id) != data
+        }
+        enemies_state = {
+            enemy_id: data
+            for enemy_id, data in world.enemies.items()
+            if self.enemies_previous_state.get(enemy_id) != data
+        }
+        spells_state = world.spells
+
+        # Sorts : une dernière liste vide pour signaler la fin
+        has_extras = bool(world.terrain or world.effects)
+        if players_state or enemies_state or spells_state or self._had_spells_last_tick or has_extras:
+            message = {
+                "t": "game_update",
+                "timestamp": world.timestamp,
+            }
+            if players_state:
+                message["players"] = players_state
+            if enemies_state:
+                message["enemies"] = enemies_state
+            if spells_state or self._had_spells_last_tick:
+                message["spells"] = spells_state
+            if world.terrain:
+                message["terrain"] = world.terrain
+            if world.effects:
+                message["effects"] = world.effects
+            if player_ids:
+                self.broadcast_callback(message, player_ids)
+                self.messages_sent += 1
+
+        self._had_spells_last_tick = bool(spells_state)
+
+    def _send_binary_updates(self, world: WorldSnapshot) -> None:
+        """Chemin binaire : une trame delta par client, contre sa derniere baseline acquittee."""
+        for client_id, encoder in list(self.snapshot_encoders.items()):
+            frame = encoder.encode(world)
+            if frame is not None:
+                self.send_raw_callback(client_id, frame)
+                self.messages_sent += 1
+
+    def _dead_players(self) -> list[tuple[str, float, float]]:
+        """Joueurs hors de la grille (morts), vus par position ; une fois par snapshot."""
+        return [
+            (pid, other.x, other.y)
+            for pid, other in self.players.items()
+            if pid not in self.player_grid
+        ]
+
+    def _update_interest(
+        self,
+        client_id: str,
+        player: Player,
+        dead_players: list[tuple[str, float, float]],
+    ) -> tuple[VisibleSet, InterestChange]:
+        return self.interest.update(
+            client_id, player.x, player.y, self.player_grid, self.enemy_grid, dead_players
+        )
+
+    def _interest_view(self, world: WorldSnapshot, visible: VisibleSet, player: Player) -> WorldSnapshot:
+        """Snapshot du monde restreint a la vue d'un client."""
+        interest = self.interest
+        x, y = player.x, player.y
+        return WorldSnapshot(
+            timestamp=world.timestamp,
+            players={pid: world.players[pid] for pid in visible.players if pid in world.players},
+            enemies={eid: world.enemies[eid] for eid in visible.enemies if eid in world.enemies},
+            spells=[
+                spell for spell in world.spells
+                if interest.sees_point(x, y, spell["x"], spell["y"], _spell_extent(spell))
+            ],
+            terrain=[
+                t for t in world.terrain
+                if interest.sees_point(x, y, t["x"], t["y"], t["w"] + t["h"])
+            ],
+            effects=[
+                e for e in world.effects
+                if e["target"] in visible.enemies or e["target"] in visible.players
+            ],
+        )
+
+    def _send_interest_updates(self, world: WorldSnapshot) -> None:
+        """Un snapshot par client, limite a sa zone d'interet (entrees / sorties de vue)."""
+        changed_players = {
+            player_id: data
+            for player_id, data in world.players.items()
+            if self.players_previous_state.get(player_id) != data
+        }
+        changed_enemies = {
+            enemy_id: data
+            for enemy_id, data in world.enemies.items()
+            if self.enemies_previous_state.get(enemy_id) != data
+        }
+        dead_players = self._dead_players()
+        for client_id, player in self.players.items():
+            visible, change = self._update_interest(client_id, player, dead_players)
+            view = self._interest_view(world, visible, player)
+
+            encoder = self.snapshot_encoders.get(client_id)
+            if encoder is not None and self.send_raw_callback:
+                # L'encodeur signale lui-meme entrees (etat complet) et sorties
+                frame = encoder.encode(view)
+                if frame is not None:
+                    self.send_raw_callback(client_id, frame)
+                    self.messages_sent += 1
+                if change.unannounced_players and self.broadcast_callback:
+                    self.broadcast_callback({
+                        "t": "game_update",
+                        "timestamp": world.timestamp,
+                        "left": {"players": change.unannounced_players},
+                    }, [client_id])
+                continue
+            if not self.broadcast_callback:
+                continue
+
+            players_state = {pid: changed_players[pid] for pid in visible.players if pid in changed_players}
+            for pid in change.entered_players:
+                if pid in view.players:
+                    players_state[pid] = view.players[pid]
+            enemies_state = {eid: changed_enemies[eid] for eid in visible.enemies if eid in changed_enemies}
+            for eid in change.entered_enemies:
+                if eid in view.enemies:
+                    enemies_state[eid] = view.enemies[eid]
+            left = change.left_message()
+            send_spells = bool(view.spells) or visible.had_spells
+            visible.had_spells = bool(view.spells)
+
+            if not (players_state or enemies_state or left or send_spells or view.terrain or view.effects):
+                continue
+            message = {
+                "t": "game_update",
+                "timestamp": world.timestamp,
+            }
+            if players_state:
+                message["players"] = players_state
+            if enemies_state:
+                message["enemies"] = enemies_state
+            if left:
+                message["left"] = left
+            if send_spells:
+                message["spells"] = view.spells
+            if view.terrain:
+                message["terrain"] = view.terrain
+            if view.effects:
+                message["effects"] = view.effects
+            self.broadcast_callback(message, [client_id])
+            self.messages_sent += 1
+
+    def _simulation_step(self) -> None:
+        """Un pas de simulation de TICK_INTERVAL secondes (avance l'horloge de simulation)."""
+        self.tick_count += 1
+        now = self.clock.advance()
+        clock = time.perf_counter
+        record = self.metrics.record
+        started = clock()
+
+        # ===== TRAITER LES INPUTS =====
+        processed = self._process_pending_inputs()
+        self.inputs_processed += processed
+        self.inputs_total += processed
+        inputs_done = clock()
+        record("inputs", inputs_done - started)
+
+        self._update_enemies()
+        enemies_done = clock()
+        record("enemies", enemies_done - inputs_done)
+
+        self._update_active_spells(now)
+        record("spells", clock() - enemies_done)
+
+        if self.recorder is not None:
+            self.recorder.end_tick(self)
+
+    def _send_snapshot(self, now: float) -> None:
+        """Envoie l'état courant aux clients (JSON diff et/ou trames binaires)."""
+        if not self.players:
+            return
+        clock = time.perf_counter
+        started = clock()
+        world = self._build_world_snapshot(now)
+        built = clock()
+        self.metrics.record("snapshot_build", built - started)
+
+        if self.interest.enabled:
+            self._send_interest_updates(world)
+        else:
+            json_ids = [pid for pid in self.players if pid not in self.snapshot_encoders]
+            if self.broadcast_callback:
+                self._send_json_update(world, json_ids)
+            if self.snapshot_encoders and self.send_raw_callback:
+                self._send_binary_updates(world)
+        self.metrics.record("broadcast", clock() - built)
+
+        # Mettre à jour l'état précédent pour comparer au prochain envoi
+        self.players_previous_state = world.players
+        self.enemies_previous_state = world.enemies
+
     async def game_loop(self):
+        """Boucle a pas fixe sur horloge monotone.
+
+        Chaque pas a une echeance absolue (`next_tick`) : le retard d'un tick
+        est rattrape par les suivants au lieu de s'accumuler.  Au-dela de
+        MAX_CATCHUP_STEPS pas en retard, les pas manquants sont abandonnes et
+        comptes dans `tick_overruns`.  L'etat n'est envoye qu'un pas sur
+        SNAPSHOT_EVERY (snapshot_rate de config.yaml).
+        """
         logging.info(f"Starting game loop for instance {self.map_id}")
-        last_time = time.time()
-
-        MAX_INPUTS_PER_TICK = 60  # limite pour éviter de surcharger le serveur
+        next_tick = time.monotonic()
+        last_wakeup = next_tick
+        steps_since_snapshot = SNAPSHOT_EVERY
 
         try:
             while self.running:
-                current_time = time.time()
-                dt = current_time - last_time
-                last_time = current_time
-
-                self.dt_samples.append(dt)
-                self.tick_count += 1
-
-                # ===== TRAITER LES INPUTS =====
-                for client_id, input_list in list(self.pending_inputs.items()):
-                    if client_id in self.players and input_list:
-                        # Traiter jusqu'à MAX_INPUTS_PER_TICK
-                        for _ in range(min(MAX_INPUTS_PER_TICK, len(input_list))):
-                            input_dict = input_list.popleft()
-                            self.process_input(self.players[client_id], input_dict)
-                            self.inputs_processed += 1
-                self._update_enemies()
-                self._update_active_spells(current_time)
+                # ===== PAS DE SIMULATION =====
+                mono_now = time.monotonic()
+                wall_now = time.time()
+                self.metrics.dt.add(mono_now - last_wakeup)
+                last_wakeup = mono_now
+                steps = 0
+                while mono_now >= next_tick and steps < MAX_CATCHUP_STEPS:
+                    self._simulation_step()
+                    next_tick += TICK_INTERVAL
+                    steps += 1
+                    steps_since_snapshot += 1
+
+                if mono_now >= next_tick:
+                    # Trop en retard : abandonner les pas restants
+                    skipped = int((mono_now - next_tick) / TICK_INTERVAL) + 1
+                    self.tick_overruns += skipped
+                    next_tick += skipped * TICK_INTERVAL
 
                 # ===== ENVOYER L'ÉTAT AUX CLIENTS =====
-                if self.players:
-                    players_state = {}
-                    enemies_state = {}
-                    for player_id, player_data in self.players.items():
-                        current_data = player_data.to_update_state()
-
-                        # n'envoyer que si différent de l'état précédent
-                        if self.players_previous_state.get(player_id) != current_data:
-                            players_state[player_id] = current_data
-
-                    for enemy_id, enemy_data in self.enemies.items():
-                        current_data = self._enemy_public_state(enemy_data)
-                        if self.enemies_previous_state.get(enemy_id) != current_data:
-                            enemies_state[enemy_id] = current_data
-
-                    # Sorts actifs : envoyés à chaque tick quand ils existent,
-                    # ou une dernière fois vide pour signaler la fin.
-                    spells_state = []
-                    for s in self.active_spells:
-                        rx = s.get("hitbox_radius_x", s.get("hitbox_radius", 12.0))
-                        ry = s.get("hitbox_radius_y", s.get("hitbox_radius", 12.0))
-                        entry = {
-                            "x":  round(s["x"], 1),
-                            "y":  round(s["y"], 1),
-                            "r":  round(s.get("hitbox_radius", 12.0), 1),
-                            "e":  s.get("element", "neutral"),
-                            "vx": round(s.get("velocity_x", 0.0), 1),
-                            "vy": round(s.get("velocity_y", 0.0), 1),
-                            "bh": s.get("spell_id", "parametric"),
-                        }
-                        # Forme elliptique (mur) : envoyer rx/ry/angle
-                        if abs(rx - ry) > 2.0:
-                            entry["rx"] = round(rx, 1)
-                            entry["ry"] = round(ry, 1)
-                            ea = s.get("ellipse_angle", 0.0)
-                            entry["ea"] = round(math.degrees(ea))
-                        spells_state.append(entry)
-
-                    # Terrain temporaire
-                    terrain_state = [
-                        {
-                            "id": t["id"],
-                            "type": t["type"],
-                            "x": round(t["x"], 1),
-                            "y": round(t["y"], 1),
-                            "w": round(t["w"], 1),
-                            "h": round(t["h"], 1),
-                            "traversable": t.get("traversable", False),
-                        }
-                        for t in self.active_terrain
-                    ]
-
-                    # Effets actifs (frozen enemies etc.)
-                    effects_state = [
-                        {
-                            "eid": e.effect_id,
-                            "target": e.target_id,
-                            "remaining": round(e.remaining, 1),
-                        }
-                        for e in self.active_effects
-                    ]
-
-                    has_extras = bool(terrain_state or effects_state)
-                    if players_state or enemies_state or spells_state or self._had_spells_last_tick or has_extras:
-                        message = {
-                            "t": "game_update",
-                            "timestamp": current_time,
-                        }
-                        if players_state:
-                            message["players"] = players_state
-                        if enemies_state:
-                            message["enemies"] = enemies_state
-                        if spells_state or self._had_spells_last_tick:
-                            message["spells"] = spells_state
-                        if terrain_state:
-                            message["terrain"] = terrain_state
-                        if effects_state:
-                            message["effects"] = effects_state
-                        await self.broadcast_to_players(message)
-
-                    self._had_spells_last_tick = bool(spells_state)
-
-                    # Mettre à jour l'état précédent pour comparer au prochain tick
-                    self.players_previous_state = {
-                        player_id: player_data.to_update_state()
-                        for player_id, player_data in self.players.items()
-                    }
-                    self.enemies_previous_state = {
-                        enemy_id: self._enemy_public_state(enemy_data)
-                        for enemy_id, enemy_data in self.enemies.items()
-                    }
+                if steps and steps_since_snapshot >= SNAPSHOT_EVERY:
+                    steps_since_snapshot = 0
+                    self._send_snapshot(wall_now)
+
+                # ===== AUTOSAVE =====
+                if wall_now - self._last_autosave >= SAVE_AUTOSAVE_INTERVAL:
+                    self._last_autosave = wall_now
+                    self.autosave_players()
+
+                self.metrics.tick.add(time.monotonic() - mono_now)
 
                 # ===== LOG STATISTIQUES =====
-                if time.time() - self.last_stats_log >= 5:
-                    if self.dt_samples:
-                        avg_dt = sum(self.dt_samples) / len(self.dt_samples)
-                        max_dt = max(self.dt_samples)
+                if wall_now - self.last_stats_log >= 5:
+                    dt_window = self.metrics.dt.recent(self.metrics.dt.count - self._dt_logged)
+                    self._dt_logged = self.metrics.dt.count
+                    if dt_window.size:
+                        # Phase la plus lente (p95) pour savoir qui accuser en cas d'overrun
+                        slowest, slowest_q = max(
+                            ((name, ring.quantiles((0.95,))[0]) for name, ring in self.metrics.phases.items()),
+                            key=lambda item: item[1],
+                        )
                         logging.info(
                             f"[Instance {self.map_id}] ticks={self.tick_count}, "
-                            f"avg_dt={avg_dt * 1000:.2f}ms, max_dt={max_dt * 1000:.2f}ms, "
-                            f"inputs={self.inputs_processed}, msgs={self.messages_sent}"
+                            f"avg_dt={dt_window.mean() * 1000:.2f}ms, max_dt={dt_window.max() * 1000:.2f}ms, "
+                            f"overruns={self.tick_overruns}, "
+                            f"inputs={self.inputs_processed}, msgs={self.messages_sent}, "
+                            f"slowest_phase={slowest} p95={slowest_q * 1000:.2f}ms"
                         )
 
-                    self.dt_samples.clear()
                     self.inputs_processed = 0
                     self.messages_sent = 0
-                    self.last_stats_log = time.time()
+                    self.last_stats_log = wall_now
 
                 # ===== ATTENTE TICK =====
-                sleep_time = max(0, TICK_INTERVAL - (time.time() - current_time))
-                await asyncio.sleep(sleep_time)
+                await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
 
         except asyncio.CancelledError:
             raise
@@ -816,6 +1177,77 @@ class GameInstance:
         finally:
             logging.info(f"Game loop stopped for instance {self.map_id}")
 
+    def notify_map_changed(self) -> None:
+        """Signale que `map_data["objects"]` a change (ex: objet transmute)."""
+        if self.map_changed_callback is not None:
+            self.map_changed_callback(self.map_id, self.map_data.get("objects", []))
+
+    def start(self) -> asyncio.Task:
+        """Lance la boucle de jeu, sauf si elle tourne encore"""
+        self.running = True
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self.game_loop())
+        return self._loop_task
+
+    def hibernate(self) -> None:
+        """Arrete la boucle d'une instance vide en gardant son monde (ennemis, terrain, effets).
+
+        Les caches par client et par envoi sont vides et la table des ennemis
+        ramenee a sa taille utile ; `wake` reprend la simulation.
+        """
+        self.running = False
+        self.hibernated_at = time.time()
+        self.pending_inputs.clear()
+        if self.recorder is not None:
+            self.recorder.hibernate(self.tick_count)
+            self.recorder.flush()
+        self.snapshot_encoders.clear()
+        self.interest.clear()
+        self._autosaved_state.clear()
+        self.players_previous_state = {}
+        self.enemies_previous_state = {}
+        self.enemies.shrink_to_fit()
+
+    def wake(self) -> bool:
+        """Reprend une instance hibernee (sa boucle repart avec le premier joueur)"""
+        if self.hibernated_at is not None:
+            logging.info(
+                f"Waking instance {self.map_id} after {time.time() - self.hibernated_at:.1f}s of hibernation"
+            )
+            self.hibernated_at = None
+        now = time.time()
+        self._last_autosave = now
+        self.last_stats_log = now
+        self.start()
+        return True
+
+    def metrics_snapshot(self) -> dict:
+        """Mesures de l'instance pour l'endpoint Prometheus (picklable)."""
+        return self.metrics.snapshot(
+            ticks=self.tick_count,
+            tick_overruns=self.tick_overruns,
+            inputs=self.inputs_total,
+            players=len(self.players),
+            enemies=len(self.enemies),
+            spells=len(self.active_spells),
+        )
+
+    def memory_estimate(self) -> int:
+        """Estimation grossiere de la memoire gardee par une instance hibernee (octets)"""
+        world_items = (
+            len(self.active_spells) + len(self.active_effects)
+            + len(self.active_terrain) + len(self.pending_triggers)
+        )
+        return (
+            _INSTANCE_BASE_BYTES
+            + self.enemies.nbytes
+            + len(self.enemies) * _ENEMY_OVERHEAD_BYTES
+            + world_items * _WORLD_ITEM_BYTES
+        )
+
     def stop(self):
         """Arrête cette instance de jeu"""
         self.running = False
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
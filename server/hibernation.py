@@ -0,0 +1,102 @@
+"""
+hibernation.py -- Instances vides gardees en sommeil pour le prochain join.
+
+Quand le dernier joueur quitte une map, son instance n'est pas detruite :
+`hibernate()` arrete sa boucle et compacte son etat, puis elle attend ici.
+Un join sur la meme map dans les `ttl` secondes la reveille (`wake()`) au
+lieu de reconstruire instance, registre de sorts et ennemis.  Au-dela du
+TTL, ou si la memoire estimee des instances en sommeil depasse `max_bytes`,
+les plus anciennes sont arretees pour de bon.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Periode de verification des TTL
+SWEEP_INTERVAL = 5.0
+
+
+class HibernationPool:
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        # map_id -> (instance, date de mise en sommeil), plus ancienne en tete
+        self._entries: "OrderedDict[str, tuple[object, float]]" = OrderedDict()
+        self.woken = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __contains__(self, map_id: object) -> bool:
+        return map_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(instance.memory_estimate() for instance, _ in self._entries.values())
+
+    def hibernate(self, instance) -> bool:
+        """Met une instance vide en sommeil ; False si l'hibernation est desactivee."""
+        if self.ttl <= 0 or self.max_bytes <= 0 or not instance.running:
+            return False
+        previous = self._entries.pop(instance.map_id, None)
+        if previous is not None:
+            previous[0].stop()
+        instance.hibernate()
+        self._entries[instance.map_id] = (instance, time.monotonic())
+        logging.info(f"Hibernated empty instance {instance.map_id}")
+        self.enforce()
+        return True
+
+    def wake(self, map_id: str):
+        """Instance en sommeil pour cette map, relancee ; None s'il n'y en a pas."""
+        entry = self._entries.pop(map_id, None)
+        if entry is None:
+            return None
+        instance, since = entry
+        if time.monotonic() - since > self.ttl:
+            self.expired += 1
+            self._drop(instance, "expired")
+            return None
+        if not instance.wake():
+            self._drop(instance, "lost")
+            return None
+        self.woken += 1
+        return instance
+
+    def enforce(self, now: Optional[float] = None) -> None:
+        """Arrete les instances expirees, puis les plus anciennes au-dela du plafond memoire."""
+        now = time.monotonic() if now is None else now
+        for map_id, (instance, since) in list(self._entries.items()):
+            if now - since > self.ttl:
+                del self._entries[map_id]
+                self.expired += 1
+                self._drop(instance, "expired")
+        total = self.total_bytes
+        while self._entries and total > self.max_bytes:
+            _, (instance, _) = self._entries.popitem(last=False)
+            total -= instance.memory_estimate()
+            self.evicted += 1
+            self._drop(instance, "evicted (memory cap)")
+
+    def _drop(self, instance, reason: str) -> None:
+        instance.stop()
+        logging.info(f"Hibernated instance {instance.map_id} {reason}")
+
+    def clear(self) -> None:
+        """Arrete toutes les instances en sommeil (arret du serveur)."""
+        while self._entries:
+            _, (instance, _) = self._entries.popitem(last=False)
+            instance.stop()
+
+    async def run(self, interval: float = SWEEP_INTERVAL) -> None:
+        """Verifie periodiquement TTL et plafond memoire."""
+        while True:
+            await asyncio.sleep(interval)
+            if self._entries:
+                self.enforce()
@@ -0,0 +1,150 @@
+"""
+interest.py -- Zone d'interet : ce que chaque client voit d'une instance.
+
+Chaque client a un ensemble d'entites visibles (joueurs, ennemis) autour de
+son joueur.  Une entite entre dans la vue a moins de `view_radius` et n'en
+sort qu'au-dela de `view_radius * VIEW_HYSTERESIS`, pour ne pas osciller en
+bordure.  Les requetes passent par les grilles spatiales de l'instance :
+le cout par client depend de la densite locale, pas de la population.
+
+Les snapshots par client ne contiennent que les entites visibles ; une
+entree envoie l'etat complet, une sortie est signalee (`left` en JSON,
+record `FIELD_REMOVED` en binaire).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from server.spatial_grid import SpatialHashGrid
+
+# Rayon de sortie / rayon d'entree
+VIEW_HYSTERESIS = 1.2
+
+
+@dataclass(slots=True)
+class VisibleSet:
+    players: set[str] = field(default_factory=set)
+    enemies: set[str] = field(default_factory=set)
+    # Le dernier snapshot contenait des sorts (envoyer une liste vide a la fin)
+    had_spells: bool = False
+    # Joueurs annonces par player_joined, pas encore passes par un snapshot
+    revealed: set[str] = field(default_factory=set)
+
+
+@dataclass(slots=True)
+class InterestChange:
+    entered_players: list[str] = field(default_factory=list)
+    left_players: list[str] = field(default_factory=list)
+    entered_enemies: list[str] = field(default_factory=list)
+    left_enemies: list[str] = field(default_factory=list)
+    # Sortis avant tout snapshot : inconnus de l'encodeur binaire du client
+    unannounced_players: list[str] = field(default_factory=list)
+
+    def left_message(self) -> dict[str, list[str]]:
+        """Champ `left` d'un game_update JSON (vide si rien n'est sorti)."""
+        left = {}
+        if self.left_players:
+            left["players"] = self.left_players
+        if self.left_enemies:
+            left["enemies"] = self.left_enemies
+        return left
+
+
+class InterestManager:
+    def __init__(self, view_radius: float, hysteresis: float = VIEW_HYSTERESIS):
+        self.view_radius = max(0.0, float(view_radius))
+        self.leave_radius = self.view_radius * max(1.0, float(hysteresis))
+        self.visible: dict[str, VisibleSet] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.view_radius > 0.0
+
+    def update(
+        self,
+        client_id: str,
+        x: float,
+        y: float,
+        player_grid: SpatialHashGrid,
+        enemy_grid: SpatialHashGrid,
+        extra_players: Iterable[tuple[str, float, float]] = (),
+    ) -> tuple[VisibleSet, InterestChange]:
+        """Recalcule la vue d'un client centre en (x, y).
+
+        `extra_players` : joueurs absents de la grille (morts), en (id, x, y).
+        Le joueur du client fait toujours partie de sa vue.
+        """
+        visible = self.visible.get(client_id)
+        if visible is None:
+            visible = self.visible[client_id] = VisibleSet()
+        change = InterestChange()
+
+        players = self._refresh(visible.players, player_grid, x, y, change.entered_players, change.left_players)
+        leave2 = self.leave_radius * self.leave_radius
+        view2 = self.view_radius * self.view_radius
+        for player_id, px, py in extra_players:
+            d2 = (px - x) ** 2 + (py - y) ** 2
+            if d2 <= view2 or (player_id in visible.players and d2 <= leave2):
+                if player_id not in visible.players:
+                    change.entered_players.append(player_id)
+                players.add(player_id)
+                if player_id in change.left_players:
+                    change.left_players.remove(player_id)
+        if client_id not in players:
+            if client_id not in visible.players:
+                change.entered_players.append(client_id)
+            elif client_id in change.left_players:
+                change.left_players.remove(client_id)
+            players.add(client_id)
+        visible.players = players
+        if visible.revealed:
+            change.unannounced_players = [pid for pid in change.left_players if pid in visible.revealed]
+            visible.revealed.clear()
+        visible.enemies = self._refresh(
+            visible.enemies, enemy_grid, x, y, change.entered_enemies, change.left_enemies
+        )
+        return visible, change
+
+    def _refresh(
+        self,
+        previous: set[str],
+        grid: SpatialHashGrid,
+        x: float,
+        y: float,
+        entered: list[str],
+        left: list[str],
+    ) -> set[str]:
+        view2 = self.view_radius * self.view_radius
+        current = set()
+        for key in grid.query_radius(x, y, self.leave_radius):
+            if key in previous:
+                current.add(key)
+                continue
+            px, py = grid.position(key)
+            if (px - x) ** 2 + (py - y) ** 2 <= view2:
+                current.add(key)
+                entered.append(key)
+        left.extend(previous - current)
+        return current
+
+    def reveal_player(self, player_id: str) -> None:
+        """Un joueur annonce a tous (player_joined) est vu de tous jusqu'a la prochaine mise a jour."""
+        for visible in self.visible.values():
+            if player_id not in visible.players:
+                visible.players.add(player_id)
+                visible.revealed.add(player_id)
+
+    def forget(self, client_id: str) -> None:
+        """Client parti : plus de vue, et plus visible des autres (player_left suffit)."""
+        self.visible.pop(client_id, None)
+        for visible in self.visible.values():
+            visible.players.discard(client_id)
+
+    def clear(self) -> None:
+        self.visible.clear()
+
+    def sees_point(self, x: float, y: float, px: float, py: float, extent: float = 0.0) -> bool:
+        """Objet ponctuel (sort, terrain) d'etendue `extent` dans la vue centree en (x, y)."""
+        return math.hypot(px - x, py - y) <= self.leave_radius + extent
@@ -9,11 +9,11 @@ Recoit un SpellIntent deserialise et :
 from __future__ import annotations
 
 import math
-import time
 import logging
 from typing import Any
 
 from server.effects.effect_registry import EFFECT_REGISTRY, ActiveEffect
+from server.spells.active_spell import ActiveSpell
 
 
 # --- Constantes ---
@@ -141,38 +141,10 @@ def _execute_phase(
 
         tick_interval = _BASE_TICK_INTERVAL * emod["tick_rate"]
 
-        spell_entry = {
-            "spell_id":         "parametric",
-            "owner_id":         client_id,
-            "element":          element,
-            "x":                x,
-            "y":                y,
-            "velocity_x":       dir_x * speed,
-            "velocity_y":       dir_y * speed,
-            "hitbox_radius":    radius,
-            "hitbox_radius_x":  radius,
-            "hitbox_radius_y":  radius,
-            "ellipse_angle":    0.0,
-            "remaining":        duration,
-            "initial_duration": duration,
-            "tick_interval":    tick_interval,
-            "tick_damage":      tick_damage,
-            "impact_damage":    impact_damage,
-            "next_tick_at":     time.time(),
-            "cone_half_angle":  cone_half_angle,
-            "spell_dir_x":     dir_x,
-            "spell_dir_y":     dir_y,
-            "pierce":           speed > 0 and tick_damage > 0.1,
-            "hit_targets":      [],
-            "compression":      0.0,
-            "fade_rate":        0.0,
-            # Metadata pour triggers
-            "_s2_phases":       phases,
-            "_s2_phase_idx":    phase_idx,
-            "_s2_global_power": global_power,
-        }
-
         # Wall form : hitbox elliptique
+        radius_x = radius
+        radius_y = radius
+        ellipse_angle = 0.0
         if form_type == "wall":
             ax_raw = phase.get("ax")
             if isinstance(ax_raw, (list, tuple)) and len(ax_raw) == 2:
@@ -180,11 +152,36 @@ def _execute_phase(
                 axis_len = math.hypot(ax, ay)
                 if axis_len > 1e-6:
                     elongation = _clamp(axis_len * 0.6, 1.2, 5.0)
-                    spell_entry["hitbox_radius_x"] = radius * elongation
-                    spell_entry["hitbox_radius_y"] = radius / max(elongation, 1.0)
-                    spell_entry["ellipse_angle"] = math.atan2(ay, ax)
+                    radius_x = radius * elongation
+                    radius_y = radius / max(elongation, 1.0)
+                    ellipse_angle = math.atan2(ay, ax)
 
-        instance.active_spells.append(spell_entry)
+        instance.active_spells.append(ActiveSpell(
+            spell_id="parametric",
+            owner_id=client_id,
+            element=element,
+            x=x,
+            y=y,
+            velocity_x=dir_x * speed,
+            velocity_y=dir_y * speed,
+            hitbox_radius=radius,
+            hitbox_radius_x=radius_x,
+            hitbox_radius_y=radius_y,
+            ellipse_angle=ellipse_angle,
+            remaining=duration,
+            tick_interval=tick_interval,
+            tick_damage=tick_damage,
+            impact_damage=impact_damage,
+            next_tick_at=instance.clock(),
+            cone_half_angle=cone_half_angle,
+            spell_dir_x=dir_x,
+            spell_dir_y=dir_y,
+            pierce=speed > 0 and tick_damage > 0.1,
+            # Metadata pour triggers
+            s2_phases=phases,
+            s2_phase_idx=phase_idx,
+            s2_global_power=global_power,
+        ))
 
     # Trigger handler info
     trigger = phase.get("trigger")
@@ -215,9 +212,7 @@ def _apply_substance_effect(
 
     if sub_type == "freeze":
         # Geler les ennemis dans le rayon
-        for enemy_id, enemy in instance.enemies.items():
-            if not enemy.get("alive", True):
-                continue
+        for enemy_id, enemy in instance.enemies_in_radius(x, y, radius):
             dist = math.hypot(enemy["x"] - x, enemy["y"] - y)
             if dist < radius:
                 freeze_dur = float(extra.get("freeze_duration", 3.0 + power * 4.0))
@@ -228,7 +223,7 @@ def _apply_substance_effect(
                     owner_id=client_id,
                     remaining=freeze_dur,
                     tick_interval=0.0,
-                    next_tick_at=time.time() + freeze_dur,
+                    next_tick_at=instance.clock() + freeze_dur,
                     params={"element": element},
                 )
                 EFFECT_REGISTRY.apply_effect(instance, effect)
@@ -243,7 +238,7 @@ def _apply_substance_effect(
             owner_id=client_id,
             remaining=create_dur,
             tick_interval=1.0,
-            next_tick_at=time.time() + 1.0,
+            next_tick_at=instance.clock() + 1.0,
             params={
                 "x": x, "y": y,
                 "terrain_type": extra.get("terrain_type", "wall"),
@@ -263,7 +258,7 @@ def _apply_substance_effect(
             owner_id=client_id,
             remaining=0.1,  # instantane
             tick_interval=0.0,
-            next_tick_at=time.time() + 1.0,
+            next_tick_at=instance.clock() + 1.0,
             params={
                 "x": x, "y": y,
                 "radius": radius,
@@ -281,7 +276,7 @@ def _apply_substance_effect(
             owner_id=client_id,
             remaining=0.1,  # instantane
             tick_interval=0.0,
-            next_tick_at=time.time() + 1.0,
+            next_tick_at=instance.clock() + 1.0,
             params={
                 "x": x, "y": y,
                 "radius": radius,
@@ -307,7 +302,7 @@ def _schedule_trigger(
     """Programme un trigger temporel (after_delay)."""
     scheduled = {
         "type": "spell_trigger",
-        "fire_at": time.time() + delay,
+        "fire_at": instance.clock() + delay,
         "client_id": client_id,
         "phases": phases,
         "trigger": trigger,
@@ -320,14 +315,14 @@ def _schedule_trigger(
 
 def handle_spell_trigger_on_expire(
     instance: Any,
-    spell: dict,
+    spell: ActiveSpell,
 ) -> None:
     """Appele quand un spell s2 expire. Verifie les triggers on_expire."""
-    phases = spell.get("_s2_phases")
+    phases = spell.s2_phases
     if phases is None:
         return
 
-    phase_idx = spell.get("_s2_phase_idx", 0)
+    phase_idx = spell.s2_phase_idx
     if phase_idx >= len(phases):
         return
 
@@ -341,14 +336,14 @@ def handle_spell_trigger_on_expire(
 
 def handle_spell_trigger_on_impact(
     instance: Any,
-    spell: dict,
+    spell: ActiveSpell,
 ) -> None:
     """Appele quand un spell s2 touche une cible. Verifie les triggers on_impact."""
-    phases = spell.get("_s2_phases")
+    phases = spell.s2_phases
     if phases is None:
         return
 
-    phase_idx = spell.get("_s2_phase_idx", 0)
+    phase_idx = spell.s2_phase_idx
     if phase_idx >= len(phases):
         return
 
@@ -362,7 +357,7 @@ def handle_spell_trigger_on_impact(
 
 def _fire_trigger(
     instance: Any,
-    spell: dict,
+    spell: ActiveSpell,
     phases: list[dict],
     trigger: dict,
 ) -> None:
@@ -372,12 +367,12 @@ def _fire_trigger(
         return
 
     count = max(1, int(trigger.get("count", 1)))
-    global_power = spell.get("_s2_global_power", 0.5)
+    global_power = spell.s2_global_power
 
     for i in range(count):
         # Direction avec spread pour les splits
-        dir_x = float(spell.get("spell_dir_x", 1.0))
-        dir_y = float(spell.get("spell_dir_y", 0.0))
+        dir_x = spell.spell_dir_x
+        dir_y = spell.spell_dir_y
         if count > 1:
             angle_offset = (i - (count - 1) / 2.0) * (math.pi / 6.0)
             cos_a = math.cos(angle_offset)
@@ -388,12 +383,12 @@ def _fire_trigger(
 
         _execute_phase(
             instance,
-            spell.get("owner_id", ""),
+            spell.owner_id,
             phases,
             next_idx,
             global_power,
-            float(spell["x"]),
-            float(spell["y"]),
+            spell.x,
+            spell.y,
             dir_x,
             dir_y,
         )
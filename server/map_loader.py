@@ -1,49 +1,209 @@
 # server/map_loader.py
+import asyncio
+import hashlib
+import json
 import logging
+import time
 import yaml
 import importlib.resources as resources
 
-from typing import Dict, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from server.collision_index import StaticCollisionIndex
+
+# Maps gardees en cache au-dela de celles qui ont une instance active
+MAX_CACHED_MAPS = 8
+
+
+@dataclass(slots=True)
+class LoadedMap:
+    """Map parsee et pretraitee, prete a servir une instance et des joins."""
+
+    map_id: str
+    data: dict
+    collision_index: StaticCollisionIndex
+    # Message map_data complet, deja serialise, et empreinte de son contenu
+    payload: bytes
+    content_hash: str
+    last_used: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.data.get("name", "Unnamed")
+
+    def map_data_message(self, client_hash: Optional[str] = None) -> tuple[dict, bytes]:
+        """Message map_data (dict d'en-tete, octets a envoyer).
+
+        Sans les objets si le client annonce deja avoir cette version.
+        """
+        if client_hash == self.content_hash:
+            message = {"t": "map_data", "map_id": self.map_id, "hash": self.content_hash, "cached": True}
+            return message, (json.dumps(message) + "\n").encode("utf-8")
+        return {"t": "map_data", "hash": self.content_hash}, self.payload
+
+    def refresh(self) -> None:
+        """Reserialise le message et son empreinte apres une modification des objets."""
+        self.payload, self.content_hash = _serialize_map(self.map_id, self.data)
+
+
+def _serialize_map(map_id: str, map_data: dict) -> tuple[bytes, str]:
+    map_json = json.dumps({
+        "id": map_id,
+        "name": map_data.get("name", "Unnamed"),
+        "size": map_data.get("size", [1280, 720]),
+        "objects": map_data.get("objects", [])
+    }, sort_keys=True, separators=(",", ":"))
+    content_hash = hashlib.sha256(map_json.encode("utf-8")).hexdigest()[:16]
+    payload = f'{{"t":"map_data","hash":"{content_hash}","map":{map_json}}}\n'.encode("utf-8")
+    return payload, content_hash
+
+
+def _build_loaded_map(map_id: str, map_data: dict) -> LoadedMap:
+    payload, content_hash = _serialize_map(map_id, map_data)
+    return LoadedMap(
+        map_id=map_id,
+        data=map_data,
+        collision_index=StaticCollisionIndex.from_map_data(map_data),
+        payload=payload,
+        content_hash=content_hash,
+    )
 
 
 class MapLoader:
-    def __init__(self, package: str = "server.maps"):
+    """Catalogue des maps du package, chargees a la demande dans un thread.
+
+    Seuls les noms de fichiers sont lus au demarrage.  Une map est parsee et
+    pretraitee au premier `load`, puis gardee dans un cache LRU ; les maps
+    sans instance active (`in_use`) sont evincees au-dela de `max_cached`.
+    """
+
+    def __init__(
+        self,
+        package: str = "server.maps",
+        max_cached: int = MAX_CACHED_MAPS,
+        in_use: Optional[Callable[[str], bool]] = None,
+    ):
         self.package = package
-        self.loaded_maps = {}
-        self._load_all_maps()
+        self.max_cached = max(1, int(max_cached))
+        self.in_use = in_use or (lambda map_id: False)
+        self._catalog: Dict[str, object] = {}
+        self._names: Dict[str, str] = {}
+        self._cache: "OrderedDict[str, LoadedMap]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._scan_catalog()
 
-    def _load_all_maps(self):
-        """Charge toutes les maps contenues dans le package donné"""
+    def _scan_catalog(self):
+        """Liste les fichiers de maps du package, sans les parser"""
         maps_package = resources.files(self.package)
+        for map_file in sorted(maps_package.iterdir(), key=lambda f: f.name):
+            if map_file.name.endswith(".yaml"):
+                self._catalog[map_file.name[:-len(".yaml")]] = map_file
+
+    def _read_name(self, map_id: str) -> str:
+        """Lit seulement la cle `name:` en tete de fichier"""
+        name = self._names.get(map_id)
+        if name is not None:
+            return name
+        name = "Unnamed"
+        try:
+            with self._catalog[map_id].open("r", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("name:"):
+                        name = str(yaml.safe_load(line).get("name") or name)
+                        break
+        except Exception as e:
+            logging.warning(f"Cannot read name of map {map_id}: {e}")
+        self._names[map_id] = name
+        return name
 
-        for map_file in maps_package.iterdir():
-            if not map_file.name.endswith(".yaml"):
-                continue
+    def _load_map(self, map_id: str) -> Optional[LoadedMap]:
+        """Parse et pretraite une map (execute dans un thread)"""
+        map_file = self._catalog.get(map_id)
+        if map_file is None:
+            return None
+        try:
+            started = time.perf_counter()
+            with map_file.open("r", encoding="utf-8") as f:
+                map_data = yaml.safe_load(f)
+            loaded = _build_loaded_map(map_id, map_data)
+            logging.info(
+                f"Loaded map: {map_id} - {loaded.name} "
+                f"({(time.perf_counter() - started) * 1000:.1f}ms, hash={loaded.content_hash})"
+            )
+            return loaded
+        except Exception as e:
+            logging.exception(f"Error loading map {map_file}: {e}")
+            return None
 
-            try:
-                with map_file.open("r", encoding="utf-8") as f:
-                    map_data = yaml.safe_load(f)
+    async def load(self, map_id: str) -> Optional[LoadedMap]:
+        """Map chargee (depuis le cache, ou parsee dans un thread au premier appel)"""
+        loaded = self._cache.get(map_id)
+        if loaded is not None:
+            self._cache.move_to_end(map_id)
+            loaded.last_used = time.monotonic()
+            return loaded
+        if map_id not in self._catalog:
+            return None
 
-                map_id = map_file.stem  # nom du fichier sans extension
-                self.loaded_maps[map_id] = map_data
-                logging.info(f"Loaded map: {map_id} - {map_data.get('name', 'Unnamed')}")
+        # Plusieurs joins simultanes sur la meme map : un seul chargement
+        future = self._loading.get(map_id)
+        if future is None:
+            future = asyncio.ensure_future(asyncio.to_thread(self._load_map, map_id))
+            self._loading[map_id] = future
+            future.add_done_callback(lambda done: self._on_loaded(map_id, done))
+        return await asyncio.shield(future)
 
-            except Exception as e:
-                logging.exception(f"Error loading map {map_file}: {e}")
+    def _on_loaded(self, map_id: str, future: asyncio.Future):
+        self._loading.pop(map_id, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        loaded = future.result()
+        if loaded is None:
+            return
+        loaded.last_used = time.monotonic()
+        self._names[map_id] = loaded.name
+        self._cache[map_id] = loaded
+        self._evict_idle()
+
+    def _evict_idle(self):
+        for map_id in list(self._cache):
+            if len(self._cache) <= self.max_cached:
+                break
+            if not self.in_use(map_id):
+                del self._cache[map_id]
+                logging.info(f"Evicted idle map {map_id} from cache")
+
+    def update_objects(self, map_id: str, objects: list) -> None:
+        """Objets modifies en jeu (transmutation) : les prochains joins recoivent la map a jour.
+
+        Une instance locale partage deja `data` et l'index de collision ; un
+        shard envoie sa copie des objets, qui remplace celle du cache.
+        """
+        loaded = self._cache.get(map_id)
+        if loaded is None:
+            return
+        if loaded.data.get("objects") is not objects:
+            loaded.data["objects"] = objects
+            loaded.collision_index.rebuild(objects)
+        loaded.refresh()
+        logging.info(f"Map {map_id} objects changed (hash={loaded.content_hash})")
 
     def get_map(self, map_id: str) -> Optional[dict]:
-        """Récupère une map par son ID"""
-        return self.loaded_maps.get(map_id)
+        """Récupère une map déjà chargée par son ID"""
+        loaded = self._cache.get(map_id)
+        return loaded.data if loaded is not None else None
+
+    def get_collision_index(self, map_id: str) -> Optional[StaticCollisionIndex]:
+        """Récupère l'index de collision précalculé d'une map déjà chargée"""
+        loaded = self._cache.get(map_id)
+        return loaded.collision_index if loaded is not None else None
 
     def list_maps(self) -> Dict[str, str]:
         """Retourne la liste des maps disponibles avec leurs noms"""
-        return {
-            map_id: map_data.get('name', 'Unnamed')
-            for map_id, map_data in self.loaded_maps.items()
-        }
-
-    def get_default_map(self) -> Optional[dict]:
-        """Retourne la première map disponible comme map par défaut"""
-        if self.loaded_maps:
-            return next(iter(self.loaded_maps.values()))
-        return None
+        return {map_id: self._read_name(map_id) for map_id in self._catalog}
+
+    def default_map_id(self) -> Optional[str]:
+        """Retourne l'ID de la première map disponible, map par défaut"""
+        return next(iter(self._catalog), None)
@@ -0,0 +1,222 @@
+"""
+metrics.py -- Mesures du serveur et endpoint Prometheus.
+
+Chaque instance chronometre les phases de son tick (inputs, ennemis,
+sorts, construction du snapshot, envoi) dans des tampons circulaires de
+taille fixe : les quantiles portent sur les `RING_SIZE` derniers
+echantillons, `_sum` / `_count` sur toute la vie de l'instance.  Les
+octets mis en file par type de message et par map sont comptes a l'envoi.
+
+`serve_metrics` expose le tout en format texte Prometheus sur un port HTTP
+local (`server.metrics_port`, GET /metrics).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Iterable
+
+import numpy as np
+
+# Echantillons gardes par serie (un par tick : ~17 s a 60 Hz)
+RING_SIZE = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Phases du tick, dans l'ordre d'execution
+TICK_PHASES = ("inputs", "enemies", "spells", "snapshot_build", "broadcast")
+
+# (map_id, type de message) -> octets / messages mis en file
+OUTBOUND_BYTES: defaultdict[tuple[str, str], int] = defaultdict(int)
+OUTBOUND_MESSAGES: defaultdict[tuple[str, str], int] = defaultdict(int)
+
+
+def record_outbound(map_id: str, msg_type: str, nbytes: int) -> None:
+    key = (map_id, msg_type)
+    OUTBOUND_BYTES[key] += nbytes
+    OUTBOUND_MESSAGES[key] += 1
+
+
+class RingBuffer:
+    """Derniers `size` echantillons (secondes), plus somme et nombre cumules."""
+
+    __slots__ = ("_values", "_next", "_filled", "total", "count")
+
+    def __init__(self, size: int = RING_SIZE):
+        self._values = np.zeros(size, dtype=np.float64)
+        self._next = 0
+        self._filled = 0
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._values)
+        if self._filled < len(self._values):
+            self._filled += 1
+        self.total += value
+        self.count += 1
+
+    def values(self) -> np.ndarray:
+        return self._values[:self._filled]
+
+    def recent(self, n: int) -> np.ndarray:
+        """Les `n` derniers echantillons (au plus la taille du tampon)."""
+        n = min(n, self._filled)
+        if n <= 0:
+            return self._values[:0]
+        start = self._next - n
+        if start >= 0:
+            return self._values[start:self._next]
+        return np.concatenate((self._values[start:], self._values[:self._next]))
+
+    def quantiles(self, qs: Iterable[float] = QUANTILES) -> list[float]:
+        values = self.values()
+        if not values.size:
+            return [0.0 for _ in qs]
+        return np.quantile(values, list(qs)).tolist()
+
+
+class InstanceMetrics:
+    """Chronometres de phases et compteurs d'une instance."""
+
+    def __init__(self):
+        self.phases: dict[str, RingBuffer] = {name: RingBuffer() for name in TICK_PHASES}
+        # Duree d'un tour de boucle complet et intervalle entre deux reveils
+        self.tick = RingBuffer()
+        self.dt = RingBuffer()
+
+    def record(self, phase: str, seconds: float) -> None:
+        ring = self.phases.get(phase)
+        if ring is None:
+            ring = self.phases[phase] = RingBuffer()
+        ring.add(seconds)
+
+    def snapshot(self, **gauges) -> dict:
+        """Etat serialisable (et picklable) pour l'exposition."""
+        def summary(ring: RingBuffer) -> dict:
+            return {"q": ring.quantiles(), "sum": ring.total, "count": ring.count}
+
+        return {
+            "phases": {name: summary(ring) for name, ring in self.phases.items()},
+            "tick": summary(self.tick),
+            "dt": summary(self.dt),
+            **gauges,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Exposition Prometheus
+# ---------------------------------------------------------------------------
+
+def _labels(**labels) -> str:
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _summary(lines: list[str], name: str, data: dict, **labels) -> None:
+    for q, value in zip(QUANTILES, data["q"]):
+        lines.append(f"{name}{_labels(**labels, quantile=q)} {value:.9g}")
+    lines.append(f"{name}_sum{_labels(**labels)} {data['sum']:.9g}")
+    lines.append(f"{name}_count{_labels(**labels)} {data['count']}")
+
+
+# Compteurs / jauges d'instance : cle du snapshot -> (nom, type, aide)
+_INSTANCE_SERIES = (
+    ("ticks", "game_ticks_total", "counter", "Simulation steps run"),
+    ("tick_overruns", "game_tick_overruns_total", "counter", "Simulation steps dropped because the loop was late"),
+    ("inputs", "game_inputs_processed_total", "counter", "Client inputs applied"),
+    ("players", "game_players", "gauge", "Players in the instance"),
+    ("enemies", "game_enemies", "gauge", "Enemies in the instance"),
+    ("spells", "game_active_spells", "gauge", "Active spells in the instance"),
+)
+
+
+def render_prometheus(instances: dict[str, dict], global_gauges: dict[str, float]) -> str:
+    """Texte Prometheus pour des snapshots d'instances (`InstanceMetrics.snapshot`)."""
+    lines: list[str] = []
+
+    lines.append("# HELP game_tick_phase_seconds Time spent in each phase of a simulation tick")
+    lines.append("# TYPE game_tick_phase_seconds summary")
+    for map_id, snap in instances.items():
+        for phase, data in snap["phases"].items():
+            _summary(lines, "game_tick_phase_seconds", data, map=map_id, phase=phase)
+
+    lines.append("# HELP game_tick_seconds Time spent in one game loop iteration (steps, snapshot, autosave)")
+    lines.append("# TYPE game_tick_seconds summary")
+    for map_id, snap in instances.items():
+        _summary(lines, "game_tick_seconds", snap["tick"], map=map_id)
+
+    lines.append("# HELP game_tick_interval_seconds Interval between two game loop wakeups")
+    lines.append("# TYPE game_tick_interval_seconds summary")
+    for map_id, snap in instances.items():
+        _summary(lines, "game_tick_interval_seconds", snap["dt"], map=map_id)
+
+    for key, name, kind, help_text in _INSTANCE_SERIES:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for map_id, snap in instances.items():
+            if key in snap:
+                lines.append(f"{name}{_labels(map=map_id)} {snap[key]}")
+
+    lines.append("# HELP game_outbound_bytes_total Bytes queued to clients, by map and message type")
+    lines.append("# TYPE game_outbound_bytes_total counter")
+    for (map_id, msg_type), value in sorted(OUTBOUND_BYTES.items()):
+        lines.append(f"game_outbound_bytes_total{_labels(map=map_id, type=msg_type)} {value}")
+    lines.append("# HELP game_outbound_messages_total Messages queued to clients, by map and message type")
+    lines.append("# TYPE game_outbound_messages_total counter")
+    for (map_id, msg_type), value in sorted(OUTBOUND_MESSAGES.items()):
+        lines.append(f"game_outbound_messages_total{_labels(map=map_id, type=msg_type)} {value}")
+
+    for name, value in global_gauges.items():
+        lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(
+    host: str,
+    port: int,
+    collect: Callable[[], str],
+) -> asyncio.AbstractServer | None:
+    """Endpoint HTTP minimal : GET /metrics renvoie `collect()`."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5.0)
+            # Ignorer les en-tetes
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 5.0)
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/", "/metrics"):
+                body = collect().encode("utf-8")
+                status = "200 OK"
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                body = b"not found\n"
+                status = "404 Not Found"
+                content_type = "text/plain"
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logging.warning(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+    try:
+        server = await asyncio.start_server(handle, host, port)
+    except OSError as e:
+        logging.warning(f"Metrics endpoint disabled, cannot listen on {host}:{port}: {e}")
+        return None
+    logging.info(f"Metrics endpoint on http://{host}:{port}/metrics")
+    return server
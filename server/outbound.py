@@ -0,0 +1,229 @@
+"""
+outbound.py -- Ecriture serveur -> client sans bloquer la boucle de jeu.
+
+Chaque connexion possede une file d'emission videe par sa propre tache
+d'ecriture ; envoyer un message ne fait que l'y deposer.  Un message
+diffuse est serialise une seule fois pour tous les destinataires.
+
+Tant qu'un `game_update` n'est pas parti, le suivant le complete au lieu
+de s'ajouter a la file ; une trame binaire non envoyee est remplacee par la
+plus recente.  Dans les deux cas l'emplacement passe en queue de file : un
+etat du monde ne part jamais avant un message fiable (`player_joined`,
+`player_left`, `map_data`...) mis en file avant lui.  Les autres messages (`map_data`, `player_joined`, `chat`...)
+ne sont jamais abandonnes : un client dont l'arriere depasse
+`OUTBOUND_MAX_BACKLOG`, ou bloque depuis `OUTBOUND_STALL_TIMEOUT`, est
+deconnecte.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+# Arriere maximal d'un client (file + buffer du transport)
+OUTBOUND_MAX_BACKLOG = 1024 * 1024
+# Duree maximale d'un drain avant de considerer le client comme bloque
+OUTBOUND_STALL_TIMEOUT = 5.0
+
+# Messages d'etat : un plus recent remplace (ou complete) un plus ancien
+COALESCABLE_TYPES = frozenset({"game_update"})
+
+OUTBOUND_STATS = {
+    "coalesced_updates": 0,
+    "replaced_frames": 0,
+    "evicted_clients": 0,
+}
+
+# Emplacements dans la file du game_update / de la trame binaire en attente
+_UPDATE = object()
+_FRAME = object()
+
+
+def encode_message(obj: dict) -> bytes:
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+
+def buffered_bytes(writer: asyncio.StreamWriter) -> int:
+    """Octets en attente dans le transport du writer (0 si inconnu)."""
+    try:
+        return writer.transport.get_write_buffer_size()
+    except Exception:
+        return 0
+
+
+def merge_game_updates(older: dict, newer: dict) -> dict:
+    """Fusionne deux `game_update` en un seul equivalent a les appliquer dans l'ordre.
+
+    Joueurs / ennemis : les champs du plus recent completent ceux du plus
+    ancien ; une sortie de vue (`left`) efface l'entite, une entree dans le
+    plus recent annule une sortie du plus ancien.  Sorts / terrain / effets :
+    la liste la plus recente l'emporte (une liste de sorts vide est
+    conservee pour signaler la fin).
+    """
+    merged = {"t": newer.get("t", "game_update"), "timestamp": newer.get("timestamp")}
+    older_left = older.get("left", {})
+    newer_left = newer.get("left", {})
+    left = {}
+    for key in ("players", "enemies"):
+        entities = {eid: dict(data) for eid, data in older.get(key, {}).items()}
+        gone = set(older_left.get(key, ()))
+        for eid in newer_left.get(key, ()):
+            entities.pop(eid, None)
+            gone.add(eid)
+        for eid, data in newer.get(key, {}).items():
+            entities.setdefault(eid, {}).update(data)
+            gone.discard(eid)
+        if entities:
+            merged[key] = entities
+        if gone:
+            left[key] = list(gone)
+    if left:
+        merged["left"] = left
+    if "spells" in newer:
+        merged["spells"] = newer["spells"]
+    elif "spells" in older:
+        merged["spells"] = []
+    for key in ("terrain", "effects"):
+        if key in newer:
+            merged[key] = newer[key]
+    return merged
+
+
+class ClientConnection:
+    """Connexion d'un client : reader, writer et file d'emission."""
+
+    def __init__(self, client_id: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.client_id = client_id
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+        self._queue: deque = deque()
+        self._queued_bytes = 0
+        self._update: Optional[dict] = None
+        self._update_data: Optional[bytes] = None
+        self._frame: Optional[bytes] = None
+        self._wakeup = asyncio.Event()
+        self._stalled_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._write_loop())
+
+    @property
+    def backlog_bytes(self) -> int:
+        pending = len(self._update_data or b"") + len(self._frame or b"")
+        return self._queued_bytes + pending + buffered_bytes(self.writer)
+
+    def send(self, obj: dict, data: Optional[bytes] = None) -> None:
+        """Met un message JSON en file (`data` : version deja encodee)."""
+        if self.closed:
+            return
+        if obj.get("t") in COALESCABLE_TYPES:
+            if self._update is None:
+                self._update = obj
+                self._update_data = data
+                self._queue.append(_UPDATE)
+            else:
+                self._update = merge_game_updates(self._update, obj)
+                self._update_data = None
+                self._move_to_tail(_UPDATE)
+                OUTBOUND_STATS["coalesced_updates"] += 1
+        else:
+            if data is None:
+                data = encode_message(obj)
+            self._queue.append(data)
+            self._queued_bytes += len(data)
+        self._after_enqueue()
+
+    def send_frame(self, data: bytes) -> None:
+        """Met une trame binaire en file ; elle remplace celle pas encore envoyee."""
+        if self.closed:
+            return
+        if self._frame is None:
+            self._queue.append(_FRAME)
+        else:
+            self._move_to_tail(_FRAME)
+            OUTBOUND_STATS["replaced_frames"] += 1
+        self._frame = data
+        self._after_enqueue()
+
+    def _move_to_tail(self, slot: object) -> None:
+        """Replace l'emplacement d'un etat complete/remplace apres les messages mis en file depuis."""
+        if self._queue[-1] is not slot:
+            self._queue.remove(slot)
+            self._queue.append(slot)
+
+    def _after_enqueue(self) -> None:
+        stalled = (
+            self._stalled_since is not None
+            and time.monotonic() - self._stalled_since > OUTBOUND_STALL_TIMEOUT
+        )
+        if stalled or self.backlog_bytes > OUTBOUND_MAX_BACKLOG:
+            OUTBOUND_STATS["evicted_clients"] += 1
+            logging.warning(
+                f"Evicting slow client {self.client_id} "
+                f"(backlog={self.backlog_bytes} bytes, stalled={stalled})"
+            )
+            self.close()
+            return
+        self._wakeup.set()
+
+    def _pop(self) -> bytes:
+        item = self._queue.popleft()
+        if item is _UPDATE:
+            data = self._update_data or encode_message(self._update)
+            self._update = None
+            self._update_data = None
+        elif item is _FRAME:
+            data = self._frame
+            self._frame = None
+        else:
+            data = item
+            self._queued_bytes -= len(data)
+        return data
+
+    async def _write_loop(self) -> None:
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                # Tout ce qui est en file part avant un seul drain
+                while self._queue:
+                    self.writer.write(self._pop())
+                self._stalled_since = time.monotonic()
+                await self.writer.drain()
+                self._stalled_since = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f"Failed to send data to {self.client_id}: {e}")
+            self.close()
+
+    def close(self) -> None:
+        """Coupe la connexion ; la boucle de lecture du client verra EOF et nettoiera."""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._wakeup.set()
+        try:
+            self.writer.transport.abort()
+        except Exception:
+            pass
+
+    async def wait_closed(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
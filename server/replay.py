@@ -0,0 +1,379 @@
+"""
+replay.py -- Enregistrement et rejeu deterministe d'une instance.
+
+Avec `server.record_dir`, chaque instance ecrit un journal binaire de tout
+ce qui entre dans sa simulation : arrivees (etat initial du joueur), departs,
+inputs acceptes et sorts, chacun avec le numero du tick qui le suit, plus
+une empreinte de l'etat tous les `record_hash_every` pas.  L'en-tete porte
+la map complete et le depart de l'horloge de simulation : le journal se
+suffit a lui-meme.
+
+Le rejeu reconstruit l'instance sans reseau ni sauvegarde, rejoue les
+evenements entre les memes pas, aussi vite que possible, et compare les
+empreintes :
+
+    python -m server.replay records/forest-20261018-031500.replay
+    python -m server.replay records/*.replay --no-verify
+
+Format (little-endian) : en-tete `MAGIC`, puis des records
+`kind u8, tick u32` suivis d'un corps propre a chaque type.  Les ids de
+clients sont remplaces par un index de 16 bits declare par `REC_CLIENT`.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+MAGIC = b"GRPL"
+VERSION = 1
+
+REC_CLIENT = 1
+REC_JOIN = 2
+REC_LEAVE = 3
+REC_INPUT = 4
+REC_CAST = 5
+REC_HIBERNATE = 6
+REC_HASH = 7
+
+# Type de sort d'un REC_CAST -> methode de GameInstance
+CAST_METHODS = ("add_spell_cast", "add_spell_cast_from_spec", "add_spell_cast_from_intent")
+
+_HEADER = struct.Struct("<4sBddH")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_RECORD = struct.Struct("<BI")
+_JOIN = struct.Struct("<HddddB")
+_INPUT = struct.Struct("<HHi")
+_CAST = struct.Struct("<HBI")
+_TICK = struct.Struct("<I")
+_PLAYER = struct.Struct("<ddddBdd")
+_SPELL = struct.Struct("<dddd")
+_COUNTS = struct.Struct("<III")
+
+# Colonnes de la table d'ennemis entrant dans l'empreinte (pas last_update)
+_HASHED_ENEMY_FIELDS = (
+    "x", "y", "vx", "vy", "direction", "health", "alive",
+    "speed_multiplier", "frozen", "attack_seq", "last_attack_at",
+)
+
+# Taille de tampon / delai au-dela desquels le tampon part au thread d'ecriture
+_FLUSH_BYTES = 64 * 1024
+_FLUSH_INTERVAL = 1.0
+
+
+def state_hash(instance) -> bytes:
+    """Empreinte (8 octets) de l'etat simule d'une instance."""
+    digest = hashlib.blake2b(_TICK.pack(instance.tick_count), digest_size=8)
+    for player_id in sorted(instance.players):
+        player = instance.players[player_id]
+        digest.update(player_id.encode("utf-8"))
+        digest.update(_PLAYER.pack(
+            player.x, player.y, player.health, player.max_health, player.alive,
+            player.facing_x, player.facing_y,
+        ))
+    enemies = instance.enemies
+    for name in _HASHED_ENEMY_FIELDS:
+        digest.update(enemies.column(name).tobytes())
+    for spell in instance.active_spells:
+        digest.update(spell.spell_id.encode("utf-8"))
+        digest.update(spell.owner_id.encode("utf-8"))
+        digest.update(_SPELL.pack(spell.x, spell.y, spell.remaining, spell.next_tick_at))
+    digest.update(_COUNTS.pack(
+        len(instance.active_effects), len(instance.active_terrain), len(instance.pending_triggers)
+    ))
+    return digest.digest()
+
+
+# ---------------------------------------------------------------------------
+# Enregistrement
+# ---------------------------------------------------------------------------
+
+class ReplayRecorder:
+    """Journal d'une instance ; les appels depuis le tick ne touchent pas le disque."""
+
+    def __init__(self, path: str | Path, map_id: str, map_data: dict, clock_start: float,
+                 tick_interval: float, hash_every: int = 1):
+        self.path = Path(path)
+        self.hash_every = max(0, int(hash_every))
+        self._clients: dict[str, int] = {}
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.bytes_written = 0
+
+        map_id_bytes = map_id.encode("utf-8")
+        map_blob = zlib.compress(json.dumps(map_data, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        self._buffer += _HEADER.pack(MAGIC, VERSION, tick_interval, clock_start, self.hash_every)
+        self._buffer += _U16.pack(len(map_id_bytes)) + map_id_bytes
+        self._buffer += _U32.pack(len(map_blob)) + map_blob
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name=f"replay-{map_id}", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def for_instance(cls, directory: str | Path, instance, hash_every: int = 1) -> "ReplayRecorder":
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = Path(directory) / f"{instance.map_id}-{stamp}-{os.getpid()}.replay"
+        logging.info(f"Recording instance {instance.map_id} to {path}")
+        return cls(path, instance.map_id, instance.map_data, instance.clock.start,
+                   instance.clock.tick_interval, hash_every)
+
+    # --- Records ---
+
+    def _client(self, tick: int, client_id: str) -> int:
+        index = self._clients.get(client_id)
+        if index is None:
+            index = self._clients[client_id] = len(self._clients)
+            name = client_id.encode("utf-8")[:255]
+            self._buffer += _RECORD.pack(REC_CLIENT, tick) + _U16.pack(index)
+            self._buffer += bytes((len(name),)) + name
+        return index
+
+    def join(self, tick: int, player) -> None:
+        index = self._client(tick, player.id)
+        self._buffer += _RECORD.pack(REC_JOIN, tick) + _JOIN.pack(
+            index, player.x, player.y, player.health, player.max_health, player.alive
+        )
+
+    def leave(self, tick: int, client_id: str) -> None:
+        self._buffer += _RECORD.pack(REC_LEAVE, tick) + _U16.pack(self._client(tick, client_id))
+
+    def input(self, tick: int, client_id: str, k: int, seq: int) -> None:
+        k &= 0xFFFF
+        seq = max(-2**31, min(2**31 - 1, seq))
+        self._buffer += _RECORD.pack(REC_INPUT, tick) + _INPUT.pack(self._client(tick, client_id), k, seq)
+
+    def cast(self, tick: int, client_id: str, method: str, msg: dict) -> None:
+        body = json.dumps(msg, separators=(",", ":")).encode("utf-8")
+        self._buffer += _RECORD.pack(REC_CAST, tick) + _CAST.pack(
+            self._client(tick, client_id), CAST_METHODS.index(method), len(body)
+        ) + body
+
+    def hibernate(self, tick: int) -> None:
+        self._buffer += _RECORD.pack(REC_HIBERNATE, tick)
+
+    def end_tick(self, instance) -> None:
+        """Fin d'un pas : empreinte eventuelle, puis envoi du tampon au thread d'ecriture."""
+        tick = instance.tick_count
+        if self.hash_every and tick % self.hash_every == 0:
+            self._buffer += _RECORD.pack(REC_HASH, tick) + state_hash(instance)
+        now = time.monotonic()
+        if len(self._buffer) >= _FLUSH_BYTES or now - self._last_flush >= _FLUSH_INTERVAL:
+            self.flush()
+            self._last_flush = now
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _write_loop(self) -> None:
+        with open(self.path, "wb") as stream:
+            while True:
+                chunk = self._queue.get()
+                if chunk is None:
+                    break
+                stream.write(chunk)
+                stream.flush()
+                self.bytes_written += len(chunk)
+
+
+# ---------------------------------------------------------------------------
+# Lecture
+# ---------------------------------------------------------------------------
+
+@dataclass(slots=True)
+class ReplayHeader:
+    map_id: str
+    map_data: dict
+    clock_start: float
+    tick_interval: float
+    hash_every: int
+
+
+def read_replay(path: str | Path) -> tuple[ReplayHeader, Iterator[tuple]]:
+    """En-tete et records `(kind, tick, *corps)` d'un journal (arret net si tronque)."""
+    data = Path(path).read_bytes()
+    magic, version, tick_interval, clock_start, hash_every = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a replay log (version {VERSION})")
+    offset = _HEADER.size
+    (size,) = _U16.unpack_from(data, offset)
+    map_id = data[offset + 2:offset + 2 + size].decode("utf-8")
+    offset += 2 + size
+    (size,) = _U32.unpack_from(data, offset)
+    map_data = json.loads(zlib.decompress(data[offset + 4:offset + 4 + size]))
+    offset += 4 + size
+    header = ReplayHeader(map_id, map_data, clock_start, tick_interval, hash_every)
+    return header, _records(data, offset)
+
+
+def _records(data: bytes, offset: int) -> Iterator[tuple]:
+    clients: dict[int, str] = {}
+    end = len(data)
+    try:
+        while offset < end:
+            kind, tick = _RECORD.unpack_from(data, offset)
+            offset += _RECORD.size
+            if kind == REC_CLIENT:
+                (index,) = _U16.unpack_from(data, offset)
+                size = data[offset + 2]
+                clients[index] = data[offset + 3:offset + 3 + size].decode("utf-8")
+                offset += 3 + size
+                continue
+            if kind == REC_JOIN:
+                index, x, y, health, max_health, alive = _JOIN.unpack_from(data, offset)
+                offset += _JOIN.size
+                yield kind, tick, clients[index], x, y, health, max_health, bool(alive)
+            elif kind == REC_LEAVE:
+                (index,) = _U16.unpack_from(data, offset)
+                offset += _U16.size
+                yield kind, tick, clients[index]
+            elif kind == REC_INPUT:
+                index, k, seq = _INPUT.unpack_from(data, offset)
+                offset += _INPUT.size
+                yield kind, tick, clients[index], k, seq
+            elif kind == REC_CAST:
+                index, method, size = _CAST.unpack_from(data, offset)
+                offset += _CAST.size
+                if offset + size > end:
+                    return
+                msg = json.loads(data[offset:offset + size])
+                offset += size
+                yield kind, tick, clients[index], CAST_METHODS[method], msg
+            elif kind == REC_HIBERNATE:
+                yield kind, tick
+            elif kind == REC_HASH:
+                if offset + 8 > end:
+                    return
+                yield kind, tick, data[offset:offset + 8]
+                offset += 8
+            else:
+                raise ValueError(f"unknown replay record {kind} at offset {offset - _RECORD.size}")
+    except struct.error:
+        # Dernier record tronque (arret brutal du serveur)
+        return
+
+
+# ---------------------------------------------------------------------------
+# Rejeu
+# ---------------------------------------------------------------------------
+
+@dataclass(slots=True)
+class ReplayResult:
+    map_id: str
+    ticks: int = 0
+    events: int = 0
+    hashes_checked: int = 0
+    mismatches: int = 0
+    first_mismatch_tick: Optional[int] = None
+    seconds: float = 0.0
+    # Duree simulee par pas (perf_counter), pour comparer les performances
+    step_seconds: list[float] = field(default_factory=list)
+
+    @property
+    def ticks_per_second(self) -> float:
+        return self.ticks / self.seconds if self.seconds > 0 else 0.0
+
+
+def replay(path: str | Path, verify: bool = True, stop_at_mismatch: bool = False) -> ReplayResult:
+    """Re-simule un journal sans reseau ni sauvegarde et compare les empreintes."""
+    from server.game_instance import GameInstance
+    from server.sim_clock import TickClock
+
+    header, records = read_replay(path)
+    instance = GameInstance(
+        header.map_id,
+        header.map_data,
+        lambda message, client_ids: None,
+        clock=TickClock(header.clock_start, header.tick_interval),
+        record_dir="",
+    )
+    instance.running = False
+    result = ReplayResult(header.map_id)
+    clock = time.perf_counter
+    started = clock()
+
+    def step_to(tick: int) -> None:
+        while instance.tick_count < tick:
+            step_started = clock()
+            instance._simulation_step()
+            result.step_seconds.append(clock() - step_started)
+
+    for record in records:
+        kind, tick = record[0], record[1]
+        step_to(tick)
+        if kind == REC_HASH:
+            if not verify:
+                continue
+            result.hashes_checked += 1
+            if state_hash(instance) != record[2]:
+                result.mismatches += 1
+                if result.first_mismatch_tick is None:
+                    result.first_mismatch_tick = tick
+                    logging.warning(f"[{header.map_id}] state hash mismatch at tick {tick}")
+                if stop_at_mismatch:
+                    break
+            continue
+        result.events += 1
+        if kind == REC_INPUT:
+            instance.add_input(record[2], record[3], record[4])
+        elif kind == REC_CAST:
+            getattr(instance, record[3])(record[2], record[4])
+        elif kind == REC_JOIN:
+            _, _, client_id, x, y, health, max_health, alive = record
+            instance.add_player(client_id, x, y, health, max_health, alive)
+        elif kind == REC_LEAVE:
+            instance.remove_player(record[2], save=False)
+        elif kind == REC_HIBERNATE:
+            instance.pending_inputs.clear()
+
+    result.seconds = clock() - started
+    result.ticks = instance.tick_count
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--no-verify", action="store_true", help="ne pas comparer les empreintes (benchmark pur)")
+    parser.add_argument("--stop", action="store_true", help="s'arreter a la premiere divergence")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+
+    failed = False
+    for path in args.paths:
+        result = replay(path, verify=not args.no_verify, stop_at_mismatch=args.stop)
+        steps_ms = [s * 1000.0 for s in sorted(result.step_seconds)]
+        p50 = steps_ms[len(steps_ms) // 2] if steps_ms else 0.0
+        p99 = steps_ms[min(len(steps_ms) - 1, int(len(steps_ms) * 0.99))] if steps_ms else 0.0
+        status = "skipped" if args.no_verify else ("OK" if not result.mismatches else
+                                                   f"DIVERGED at tick {result.first_mismatch_tick}")
+        print(
+            f"{path}: map={result.map_id} ticks={result.ticks} events={result.events} "
+            f"{result.ticks_per_second:.0f} ticks/s (step p50={p50:.3f}ms p99={p99:.3f}ms) "
+            f"hashes={result.hashes_checked} mismatches={result.mismatches} {status}"
+        )
+        failed |= bool(result.mismatches)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
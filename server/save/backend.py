@@ -0,0 +1,155 @@
+"""
+backend.py -- Stockage des sauvegardes.
+
+Un backend charge l'etat complet au demarrage (`load`) puis recoit des lots
+de modifications (`commit`) depuis le thread d'ecriture de `Save`.  Le
+format en memoire est celui de l'ancien save.yml :
+
+    {"players": {player_id: {...}}, "maps": {map_id: {"players": {player_id: [x, y]}}}}
+"""
+from __future__ import annotations
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import yaml
+
+# (player_id -> etat) et ((map_id, player_id) -> position)
+PlayerStates = dict[str, dict]
+PlayerPositions = dict[tuple[str, str], list[float]]
+
+
+def empty_save_data() -> dict:
+    return {"maps": {}, "players": {}}
+
+
+def flatten_save_data(data: dict) -> tuple[PlayerStates, PlayerPositions]:
+    """Etat complet -> lot de modifications (import / export entre backends)."""
+    players = {player_id: dict(state or {}) for player_id, state in (data.get("players") or {}).items()}
+    positions = {
+        (map_id, player_id): list(pos)
+        for map_id, map_entry in (data.get("maps") or {}).items()
+        for player_id, pos in ((map_entry or {}).get("players") or {}).items()
+    }
+    return players, positions
+
+
+class SaveBackend:
+    def load(self) -> dict:
+        raise NotImplementedError
+
+    def commit(self, players: PlayerStates, positions: PlayerPositions) -> None:
+        """Ecrit un lot de modifications en une seule operation."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteBackend(SaveBackend):
+    """Backend par defaut : une ligne par joueur et par position, un commit par lot."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS players (id TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS positions ("
+                " map TEXT NOT NULL, player_id TEXT NOT NULL, x REAL NOT NULL, y REAL NOT NULL,"
+                " PRIMARY KEY (map, player_id))"
+            )
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM players) + (SELECT COUNT(*) FROM positions)"
+            ).fetchone()
+        return row[0] == 0
+
+    def load(self) -> dict:
+        data = empty_save_data()
+        with self._lock:
+            for player_id, state in self._conn.execute("SELECT id, state FROM players"):
+                data["players"][player_id] = json.loads(state)
+            for map_id, player_id, x, y in self._conn.execute(
+                "SELECT map, player_id, x, y FROM positions"
+            ):
+                map_entry = data["maps"].setdefault(map_id, {"players": {}})
+                map_entry["players"][player_id] = [x, y]
+        return data
+
+    def commit(self, players: PlayerStates, positions: PlayerPositions) -> None:
+        if not players and not positions:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO players (id, state) VALUES (?, ?)",
+                [(player_id, json.dumps(state)) for player_id, state in players.items()],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO positions (map, player_id, x, y) VALUES (?, ?, ?, ?)",
+                [
+                    (map_id, player_id, float(pos[0]), float(pos[1]))
+                    for (map_id, player_id), pos in positions.items()
+                ],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class YamlBackend(SaveBackend):
+    """Ancien format save.yml : chaque commit reecrit le fichier (ecriture atomique)."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._data = self._read()
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return empty_save_data()
+        with open(self.path, "r") as stream:
+            data = yaml.safe_load(stream) or {}
+        data.setdefault("maps", {})
+        data.setdefault("players", {})
+        return data
+
+    def load(self) -> dict:
+        return copy.deepcopy(self._data)
+
+    def commit(self, players: PlayerStates, positions: PlayerPositions) -> None:
+        for player_id, state in players.items():
+            self._data["players"][player_id] = dict(state)
+        for (map_id, player_id), pos in positions.items():
+            map_entry = self._data["maps"].setdefault(map_id, {"players": {}})
+            map_entry.setdefault("players", {})[player_id] = list(pos)
+        write_yaml_atomic(self.path, self._data)
+
+
+def write_yaml_atomic(path: Path, data: dict) -> None:
+    """Ecrit dans un fichier temporaire puis le renomme : jamais de fichier tronque."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as stream:
+        yaml.dump(data, stream)
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(tmp, path)
+
+
+def open_backend(kind: str, path: str | Path) -> SaveBackend:
+    if kind == "sqlite":
+        return SqliteBackend(path)
+    if kind == "yaml":
+        return YamlBackend(path)
+    raise ValueError(f"Unknown save backend {kind!r}")
@@ -0,0 +1,32 @@
+"""
+Exporte une sauvegarde vers le format save.yml (lecture, debug, retour arriere).
+
+    python -m server.save.export_yaml [save.db] [save.yml]
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from server.config import SAVE_BACKEND, SAVE_PATH
+from server.save.backend import open_backend, write_yaml_atomic
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", default=SAVE_PATH)
+    parser.add_argument("output", nargs="?", default="save.yml")
+    parser.add_argument("--backend", default=SAVE_BACKEND, choices=("sqlite", "yaml"))
+    args = parser.parse_args()
+
+    backend = open_backend(args.backend, args.source)
+    try:
+        data = backend.load()
+    finally:
+        backend.close()
+    write_yaml_atomic(Path(args.output), data)
+    print(f"Exported {len(data['players'])} players to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
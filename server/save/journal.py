@@ -0,0 +1,98 @@
+"""
+journal.py -- Journal append-only des modifications de sauvegarde.
+
+Chaque mutation de `Save` y est deposee (file non bloquante) puis ecrite en
+JSON lines par le thread d'ecriture.  Un checkpoint fait tourner le journal
+(`rotate`), commite l'etat en memoire dans le backend, puis supprime le
+segment tourne : au redemarrage, `replay` rejoue les segments restants sur
+la derniere sauvegarde.  Les entrees sont idempotentes (derniere valeur),
+rejouer une entree deja commitee est sans effet.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+from pathlib import Path
+from typing import Iterator
+
+
+class Journal:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.rotated_path = self.path.with_name(self.path.name + ".1")
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._stream = None
+        self.entries_written = 0
+
+    def append(self, entry: dict) -> None:
+        """Non bloquant : l'entree sera ecrite par `write_pending`."""
+        self._queue.put(entry)
+
+    def write_pending(self) -> int:
+        """Ecrit (et fsync) les entrees en attente ; renvoie leur nombre."""
+        lines = []
+        while True:
+            try:
+                lines.append(json.dumps(self._queue.get_nowait(), separators=(",", ":")))
+            except queue.Empty:
+                break
+        if not lines:
+            return 0
+        if self._stream is None:
+            self._stream = open(self.path, "a", encoding="utf-8")
+        self._stream.write("\n".join(lines) + "\n")
+        self._stream.flush()
+        os.fsync(self._stream.fileno())
+        self.entries_written += len(lines)
+        return len(lines)
+
+    def rotate(self) -> Path | None:
+        """Ferme le segment courant et le renomme ; None s'il est vide."""
+        self.write_pending()
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return self.rotated_path if self.rotated_path.exists() else None
+        if self.rotated_path.exists():
+            # Checkpoint precedent echoue : garder ses entrees, dans l'ordre
+            with open(self.rotated_path, "ab") as dst, open(self.path, "rb") as src:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            self.path.unlink()
+        else:
+            os.replace(self.path, self.rotated_path)
+        return self.rotated_path
+
+    def segments(self) -> list[Path]:
+        """Segments a rejouer, du plus ancien au plus recent."""
+        return [p for p in (self.rotated_path, self.path) if p.exists()]
+
+    def replay(self) -> Iterator[dict]:
+        for segment in self.segments():
+            with open(segment, "r", encoding="utf-8") as stream:
+                for line_no, line in enumerate(stream, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Derniere ligne tronquee par un crash
+                        logging.warning(f"Ignoring corrupt journal line {segment}:{line_no}")
+
+    def discard(self, *paths: Path) -> None:
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        self.write_pending()
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
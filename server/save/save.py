@@ -1,13 +1,26 @@
+import atexit
+import logging
+import threading
+import time
 from pathlib import Path
 
-import yaml
-
+from server.config import (
+    SAVE_BACKEND,
+    SAVE_CHECKPOINT_INTERVAL,
+    SAVE_FLUSH_INTERVAL,
+    SAVE_JOURNAL_PATH,
+    SAVE_LEGACY_YAML,
+    SAVE_PATH,
+)
+from server.save.backend import (
+    SaveBackend,
+    SqliteBackend,
+    YamlBackend,
+    flatten_save_data,
+    open_backend,
+)
 from server.save.error import PlayerNotFound
-
-BASE_SAVE_DICT = {
-    "maps": {},
-    "players": {},
-}
+from server.save.journal import Journal
 
 _instance: "Save | None" = None
 
@@ -15,19 +28,74 @@ _instance: "Save | None" = None
 def get_save() -> "Save":
     global _instance
     if _instance is None:
-        _instance = Save()
+        journal = Journal(SAVE_JOURNAL_PATH) if SAVE_JOURNAL_PATH else None
+        _instance = Save(_open_default_backend(), journal=journal)
+        atexit.register(_instance.close)
     return _instance
 
 
+def set_save(save) -> None:
+    """Remplace la sauvegarde du processus (shard : relais vers le processus frontal)."""
+    global _instance
+    _instance = save
+
+
+def _open_default_backend() -> SaveBackend:
+    backend = open_backend(SAVE_BACKEND, SAVE_PATH)
+    legacy = Path(SAVE_LEGACY_YAML)
+    if isinstance(backend, SqliteBackend) and legacy.exists() and backend.is_empty():
+        # Premier demarrage sur SQLite : reprendre l'ancien save.yml
+        players, positions = flatten_save_data(YamlBackend(legacy).load())
+        backend.commit(players, positions)
+        logging.info(f"Imported {len(players)} players from {legacy} into {backend.path}")
+    return backend
+
+
 class Save:
-    def __init__(self) -> None:
-        self.file = Path("save.yml")
-        if self.file.exists():
-            with open(self.file, "r") as stream:
-                self.yaml_data = yaml.safe_load(stream) or {}
-        else:
-            self.yaml_data = dict(BASE_SAVE_DICT)
-            self._flush()
+    """Sauvegarde en memoire, ecrite en differe par un thread dedie.
+
+    Les mutations ne font que marquer des entrees sales (et les deposer dans
+    le journal s'il y en a un).  Le thread d'ecriture ecrit le journal toutes
+    les `flush_interval` secondes et fait un checkpoint (un lot commite dans
+    le backend, journal vide) toutes les `checkpoint_interval` secondes.
+    Sans journal, chaque `flush_interval` est un checkpoint.  `flush()`
+    force un checkpoint immediat.
+    """
+
+    def __init__(
+        self,
+        backend: SaveBackend,
+        flush_interval: float = SAVE_FLUSH_INTERVAL,
+        journal: Journal | None = None,
+        checkpoint_interval: float = SAVE_CHECKPOINT_INTERVAL,
+    ) -> None:
+        self.backend = backend
+        self.journal = journal
+        self.flush_interval = max(0.05, float(flush_interval))
+        self.checkpoint_interval = max(self.flush_interval, float(checkpoint_interval))
+        self.yaml_data = backend.load()
+        self._lock = threading.Lock()
+        self._commit_lock = threading.RLock()
+        self._dirty_players: set[str] = set()
+        self._dirty_positions: set[tuple[str, str]] = set()
+        self._stop = threading.Event()
+        self._closed = False
+        self.commits = 0
+        if journal is not None:
+            self._replay_journal()
+        self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+        self._thread.start()
+
+    def _replay_journal(self) -> None:
+        """Rejoue les modifications non commitees d'une execution precedente."""
+        replayed = 0
+        with self._lock:
+            for entry in self.journal.replay():
+                self._apply(entry)
+                replayed += 1
+        if replayed:
+            logging.info(f"Replayed {replayed} save journal entries")
+        self.flush()
 
     def get_player_state(self, player_id: str) -> dict | None:
         players = self.yaml_data.get("players", {})
@@ -37,23 +105,40 @@ class Save:
         return state
 
     def create_player(self, player_id: str) -> None:
-        players = self.yaml_data.setdefault("players", {})
-        if player_id not in players:
-            players[player_id] = {}
-            self._flush()
+        if player_id not in self.yaml_data.get("players", {}):
+            self._record({"op": "create", "p": player_id})
 
     def update_player_state(self, player_id: str, state: dict) -> None:
-        players = self.yaml_data.setdefault("players", {})
-        existing = players.get(player_id, {})
-        existing.update(state)
-        players[player_id] = existing
-        self._flush()
+        self._record({"op": "state", "p": player_id, "s": dict(state)})
 
     def update_pos_player_map(self, map_name: str, player_id: str, position: tuple[float, float]) -> None:
-        maps = self.yaml_data.setdefault("maps", {})
-        map_entry = maps.setdefault(map_name, {"players": {}})
-        map_entry.setdefault("players", {})[player_id] = list(position)
-        self._flush()
+        self._record({"op": "pos", "m": map_name, "p": player_id, "xy": [float(position[0]), float(position[1])]})
+
+    def _record(self, entry: dict) -> None:
+        with self._lock:
+            self._apply(entry)
+        if self.journal is not None:
+            self.journal.append(entry)
+
+    def _apply(self, entry: dict) -> None:
+        """Applique une entree de journal a l'etat en memoire (appele sous `_lock`)."""
+        op = entry.get("op")
+        player_id = entry.get("p")
+        if op == "create":
+            self.yaml_data.setdefault("players", {}).setdefault(player_id, {})
+            self._dirty_players.add(player_id)
+        elif op == "state":
+            players = self.yaml_data.setdefault("players", {})
+            existing = players.get(player_id, {})
+            existing.update(entry.get("s", {}))
+            players[player_id] = existing
+            self._dirty_players.add(player_id)
+        elif op == "pos":
+            map_name = entry["m"]
+            maps = self.yaml_data.setdefault("maps", {})
+            map_entry = maps.setdefault(map_name, {"players": {}})
+            map_entry.setdefault("players", {})[player_id] = list(entry["xy"])
+            self._dirty_positions.add((map_name, player_id))
 
     def get_player_pos_on_a_map(self, map_name: str, player_id: str) -> tuple[float, float]:
         maps = self.yaml_data.get("maps", {})
@@ -64,6 +149,64 @@ class Save:
             raise PlayerNotFound(f"Player {player_id} not found on map {map_name}")
         return (pos[0], pos[1])
 
-    def _flush(self) -> None:
-        with open(self.file, "w") as stream:
-            yaml.dump(self.yaml_data, stream)
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty_players or self._dirty_positions)
+
+    def flush(self) -> None:
+        """Checkpoint : commite toutes les modifications en attente (un seul lot) et vide le journal."""
+        with self._commit_lock:
+            rotated = self.journal.rotate() if self.journal is not None else None
+            if self._commit() and rotated is not None:
+                self.journal.discard(rotated)
+
+    def _commit(self) -> bool:
+        with self._commit_lock:
+            with self._lock:
+                players = {pid: dict(self.yaml_data["players"][pid]) for pid in self._dirty_players}
+                positions = {
+                    (map_name, pid): list(self.yaml_data["maps"][map_name]["players"][pid])
+                    for map_name, pid in self._dirty_positions
+                }
+                self._dirty_players.clear()
+                self._dirty_positions.clear()
+            if not players and not positions:
+                return True
+            try:
+                self.backend.commit(players, positions)
+                self.commits += 1
+                return True
+            except Exception as e:
+                logging.exception(f"Save commit failed: {e}")
+                # Reessayer au prochain lot (le journal tourne est conserve)
+                with self._lock:
+                    self._dirty_players.update(players)
+                    self._dirty_positions.update(positions)
+                return False
+
+    def _run(self) -> None:
+        last_checkpoint = time.monotonic()
+        while not self._stop.wait(self.flush_interval):
+            try:
+                if self.journal is not None:
+                    with self._commit_lock:
+                        self.journal.write_pending()
+                now = time.monotonic()
+                if self.journal is None or now - last_checkpoint >= self.checkpoint_interval:
+                    last_checkpoint = now
+                    if self.dirty:
+                        self.flush()
+            except Exception as e:
+                logging.exception(f"Save writer error: {e}")
+
+    def close(self) -> None:
+        """Arrete le thread d'ecriture apres un dernier lot."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+        self.backend.close()
@@ -4,73 +4,108 @@ import logging
 import signal
 import socket
 import sys
-import time
-from typing import Optional, List
-
-from server.config import HOST, PORT
+from typing import Awaitable, Callable, List, Optional
+
+from server.config import (
+    HIBERNATE_MAX_BYTES,
+    HIBERNATE_TTL,
+    HOST,
+    METRICS_HOST,
+    METRICS_PORT,
+    PORT,
+    SHARD_PROCESSES,
+)
 from server.game_instance import GameInstance
+from server.hibernation import HibernationPool
 from server.map_loader import MapLoader
-from server.state import CLIENTS, INSTANCES, CLIENT_SEQ
+from server.metrics import record_outbound, render_prometheus, serve_metrics
+from server.outbound import OUTBOUND_STATS, ClientConnection, encode_message
+from server.save.save import get_save
+from server.sharding import ShardSupervisor
+from server.state import CLIENTS, CLIENT_INSTANCES, INSTANCES, CLIENT_SEQ
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s %(levelname)s %(message)s",
 )
 
-map_loader = MapLoader("server.maps")
+# Instances vides en sommeil, reveillees par le prochain join sur leur map
+hibernated = HibernationPool(HIBERNATE_TTL, HIBERNATE_MAX_BYTES)
+map_loader = MapLoader(
+    "server.maps",
+    in_use=lambda map_id: map_id in INSTANCES or map_id in hibernated,
+)
+# Superviseur des processus shard (None : instances dans ce processus)
+shards: Optional[ShardSupervisor] = None
 
 
-async def send_json(writer: asyncio.StreamWriter, obj: dict):
-    try:
-        raw = json.dumps(obj) + "\n"
-        data = raw.encode("utf-8")
-        writer.write(data)
-        await writer.drain()
-        logging.debug(f"-> Sent {len(data)} bytes to {peername(writer)}")
-    except Exception as e:
-        logging.warning(f"Failed to send data: {e}")
+def get_client_connection(client_id: str) -> Optional[ClientConnection]:
+    return CLIENTS.get(client_id)
 
 
-def get_client_writer(client_id: str) -> Optional[asyncio.StreamWriter]:
-    client_entry = CLIENTS.get(client_id)
-    if client_entry is None:
-        return None
-    _, writer = client_entry
-    return writer
+def metrics_map_label(client_id: str) -> str:
+    """Map du client pour les compteurs d'envoi ("lobby" hors instance)"""
+    instance = CLIENT_INSTANCES.get(client_id)
+    return instance.map_id if instance is not None else "lobby"
 
 
-async def send_json_to_client(client_id: str, obj: dict) -> bool:
-    writer = get_client_writer(client_id)
-    if writer is None:
+def send_json_to_client(client_id: str, obj: dict, data: Optional[bytes] = None) -> bool:
+    """Met un message en file pour un client (jamais bloquant, `data` : déjà encodé)"""
+    connection = get_client_connection(client_id)
+    if connection is None:
         return False
-    await send_json(writer, obj)
+    if data is None:
+        data = encode_message(obj)
+    record_outbound(metrics_map_label(client_id), obj.get("t", "?"), len(data))
+    connection.send(obj, data)
     return True
 
 
-async def broadcast_json_to_players(obj: dict, player_ids: List[str], exclude_client: Optional[str] = None):
-    """Diffuse un message JSON aux joueurs spécifiés"""
-    disconnected_clients = []
+def send_raw_to_client(client_id: str, data: bytes) -> bool:
+    """Met en file une trame deja encodee (snapshot binaire) pour un client"""
+    connection = get_client_connection(client_id)
+    if connection is None:
+        return False
+    record_outbound(metrics_map_label(client_id), "snapshot_bin", len(data))
+    connection.send_frame(data)
+    return True
 
+
+def broadcast_json_to_players(obj: dict, player_ids: List[str], exclude_client: Optional[str] = None):
+    """Diffuse un message JSON aux joueurs spécifiés"""
+    # Une seule serialisation pour tous les destinataires
+    data = encode_message(obj)
+    msg_type = obj.get("t", "?")
     for client_id in player_ids:
-        if client_id == exclude_client or client_id not in CLIENTS:
+        if client_id == exclude_client:
             continue
-
-        try:
-            _, writer = CLIENTS[client_id]
-            await send_json(writer, obj)
-        except Exception as e:
-            logging.warning(f"Failed to broadcast to {client_id}: {e}")
-            disconnected_clients.append(client_id)
-
-    # Nettoyer les clients déconnectés
-    for client_id in disconnected_clients:
-        await cleanup_client(client_id)
+        connection = CLIENTS.get(client_id)
+        if connection is not None:
+            record_outbound(metrics_map_label(client_id), msg_type, len(data))
+            connection.send(obj, data)
 
 
-async def broadcast_json(obj: dict, exclude_client: Optional[str] = None):
+def broadcast_json(obj: dict, exclude_client: Optional[str] = None):
     """Diffuse un message JSON à tous les clients connectés"""
     player_ids = list(CLIENTS.keys())
-    await broadcast_json_to_players(obj, player_ids, exclude_client)
+    broadcast_json_to_players(obj, player_ids, exclude_client)
+
+
+def create_instance(map_id: str, loaded_map) -> GameInstance:
+    """Cree une instance et lance sa boucle, ici ou dans un processus shard"""
+    if shards is not None:
+        return shards.spawn_instance(map_id, loaded_map.data)
+    # Callback pour le broadcast spécifique à cette instance
+    instance = GameInstance(
+        map_id,
+        loaded_map.data,
+        broadcast_json_to_players,
+        collision_index=loaded_map.collision_index,
+        send_raw_callback=send_raw_to_client,
+        map_changed_callback=map_loader.update_objects,
+    )
+    instance.start()
+    return instance
 
 
 def next_client_id() -> str:
@@ -88,10 +123,7 @@ def peername(writer: asyncio.StreamWriter) -> str:
 
 def find_player_instance(client_id: str) -> Optional[GameInstance]:
     """Trouve l'instance dans laquelle se trouve un joueur"""
-    for instance in INSTANCES.values():
-        if client_id in instance.players:
-            return instance
-    return None
+    return CLIENT_INSTANCES.get(client_id)
 
 
 async def handle_input_message(client_id: str, msg: dict):
@@ -101,14 +133,22 @@ async def handle_input_message(client_id: str, msg: dict):
         logging.warning(f"Input from player {client_id} not in any instance")
         return
 
+    # Valeurs validees ici, une fois ; un message malforme est ignore
+    try:
+        k = int(msg.get("k") or 0)
+        seq = int(msg.get("seq") or 0)
+        # Ack de snapshot binaire piggybacke sur l'input
+        ack = max(0, int(msg["ack"])) if "ack" in msg else None
+    except (TypeError, ValueError):
+        logging.debug(f"Malformed input from {client_id}: {msg!r}")
+        return
+    if ack is not None:
+        instance.ack_snapshot(client_id, ack)
+
     # Ajouter l'input à l'instance appropriée
-    instance.add_input(client_id, {
-        "k": msg.get("k", 0),
-        "timestamp": time.time(),
-        "seq": msg.get("seq", 0)
-    })
+    instance.add_input(client_id, k, seq)
 
-    logging.debug(f"Input from {client_id}: {msg.get('k', 0)}")
+    logging.debug(f"Input from {client_id}: {k}")
 
 
 async def handle_join_message(client_id: str, msg: dict) -> str:
@@ -120,12 +160,15 @@ async def handle_join_message(client_id: str, msg: dict) -> str:
     if uid and isinstance(uid, str) and uid != client_id:
         if uid in CLIENTS:
             # UUID déjà connecté, refuser
-            await send_json_to_client(client_id, {
+            send_json_to_client(client_id, {
                 "t": "_error",
                 "message": "UUID already connected"
             })
             return client_id
         CLIENTS[uid] = CLIENTS.pop(client_id)
+        CLIENTS[uid].client_id = uid
+        if client_id in CLIENT_INSTANCES:
+            CLIENT_INSTANCES[uid] = CLIENT_INSTANCES.pop(client_id)
         client_id = uid
 
     # Vérifier si le joueur est déjà dans une instance
@@ -134,62 +177,37 @@ async def handle_join_message(client_id: str, msg: dict) -> str:
         logging.warning(f"Player {client_id} already in instance {current_instance.map_id}")
         return client_id
 
-    # Charger les données de la map
-    map_data = map_loader.get_map(map_id)
-    if not map_data:
+    # Charger les données de la map (parsée dans un thread au premier join)
+    loaded_map = await map_loader.load(map_id)
+    if loaded_map is None:
         # Utiliser la map par défaut si la map demandée n'existe pas
-        map_data = map_loader.get_default_map()
-        if not map_data:
-            await send_json_to_client(client_id, {
+        default_id = map_loader.default_map_id()
+        loaded_map = await map_loader.load(default_id) if default_id else None
+        if loaded_map is None:
+            send_json_to_client(client_id, {
                 "t": "_error",
                 "message": "No maps available"
             })
             return client_id
         map_id = "default"
 
+    # Le client a pu se déconnecter pendant le chargement
+    if client_id not in CLIENTS:
+        return client_id
+
     # Créer ou récupérer l'instance de jeu
     if map_id not in INSTANCES:
-        # Callback pour le broadcast spécifique à cette instance
-        async def instance_broadcast(message, player_ids):
-            await broadcast_json_to_players(message, player_ids)
-
-        INSTANCES[map_id] = GameInstance(map_id, map_data, instance_broadcast)
-        asyncio.create_task(INSTANCES[map_id].game_loop())
+        # Reveiller l'instance en sommeil de cette map avant d'en construire une
+        INSTANCES[map_id] = hibernated.wake(map_id) or create_instance(map_id, loaded_map)
 
     instance = INSTANCES[map_id]
-    if not instance.running:
-        # Instance connue mais loop arrêtée (ex: plus aucun joueur)
-        instance.running = True
-        asyncio.create_task(instance.game_loop())
-
-    # send the map to the client
-    await send_json_to_client(client_id, {
-        "t": "map_data",
-        "map": {
-            "id": map_id,
-            "name": map_data.get("name", "Unnamed"),
-            "size": map_data.get("size", [1280, 720]),
-            "objects": map_data.get("objects", [])
-        }
-    })
+    CLIENT_INSTANCES[client_id] = instance
 
-    # Créer le joueur dans l'instance
-    player = instance.create_player(client_id)
-
-    # on laisse le player qui se connect pour lui indiquer sont emplacement
-    await send_json_to_client(client_id, {
-        "t": "game_state",
-        "your_id": client_id,
-        "your_player": player.to_full_state(),
-        "players": instance.get_players_state(),
-        "enemies": instance.get_enemies_state()
-    })
+    # send the map to the client (sans les objets s'il a déjà cette version)
+    send_json_to_client(client_id, *loaded_map.map_data_message(msg.get("map_hash")))
 
-    # Notifier les autres joueurs de cette instance
-    await instance.broadcast_to_players({
-        "t": "player_joined",
-        "player": player.to_full_state()
-    })
+    # Créer le joueur dans l'instance, lui envoyer game_state, notifier les autres
+    instance.admit_player(client_id, msg.get("snap") or [])
 
     logging.info(f"Player {client_id} joined instance {map_id}")
     return client_id
@@ -199,7 +217,7 @@ async def handle_list_maps_message(client_id: str, msg: dict):
     """Envoie la liste des maps disponibles au client"""
     maps_list = map_loader.list_maps()
 
-    await send_json_to_client(client_id, {
+    send_json_to_client(client_id, {
         "t": "maps_list",
         "maps": maps_list
     })
@@ -212,27 +230,90 @@ async def handle_cast_spell_message(client_id: str, msg: dict):
     instance.add_spell_cast(client_id, msg)
 
 
+async def handle_spell_spec_message(client_id: str, msg: dict):
+    instance = find_player_instance(client_id)
+    if instance:
+        instance.add_spell_cast_from_spec(client_id, msg)
+
+
+async def handle_spell_intent_message(client_id: str, msg: dict):
+    instance = find_player_instance(client_id)
+    if instance:
+        instance.add_spell_cast_from_intent(client_id, msg)
+
+
+async def handle_ack_message(client_id: str, msg: dict):
+    """Acquittement d'un snapshot binaire"""
+    instance = find_player_instance(client_id)
+    if not instance:
+        return
+    try:
+        seq = max(0, int(msg.get("s") or 0))
+    except (TypeError, ValueError):
+        logging.debug(f"Malformed ack from {client_id}: {msg!r}")
+        return
+    instance.ack_snapshot(client_id, seq)
+
+
+async def handle_ping_message(client_id: str, msg: dict):
+    send_json_to_client(client_id, {"t": "pong"})
+
+
+async def handle_chat_message(client_id: str, msg: dict):
+    """Chat global ou par instance"""
+    chat = {
+        "t": "chat",
+        "from": client_id,
+        "message": msg.get("message", "")
+    }
+    instance = find_player_instance(client_id)
+    if instance:
+        instance.broadcast_to_players(chat)
+    else:
+        # Chat global si pas dans une instance
+        broadcast_json(chat)
+
+
+# Router des messages par type.  Un handler qui renvoie une chaine change
+# le client_id de la connexion (re-key par UUID au join).
+MESSAGE_HANDLERS: dict[str, Callable[[str, dict], Awaitable[Optional[str]]]] = {
+    "ping": handle_ping_message,
+    "join": handle_join_message,
+    "in": handle_input_message,
+    "ack": handle_ack_message,
+    "list_maps": handle_list_maps_message,
+    "cast_spell": handle_cast_spell_message,
+    "s": handle_spell_spec_message,
+    "s2": handle_spell_intent_message,
+    "chat": handle_chat_message,
+}
+
+
 async def cleanup_client(client_id: str):
     """Nettoie un client déconnecté"""
     # Supprimer de toutes les structures
-    CLIENTS.pop(client_id, None)
+    connection = CLIENTS.pop(client_id, None)
+    if connection is not None:
+        connection.close()
 
     # Supprimer de son instance de jeu
-    instance = find_player_instance(client_id)
+    instance = CLIENT_INSTANCES.pop(client_id, None)
     if instance:
         instance.remove_player(client_id)
 
         # Notifier les autres joueurs de cette instance
-        await instance.broadcast_to_players({
+        instance.broadcast_to_players({
             "t": "player_left",
             "player_id": client_id
         })
 
-        # Si l'instance est vide, on peut la fermer (optionnel)
+        # Instance vide : en sommeil jusqu'au prochain join, ou fermee
         if not instance.players:
-            instance.stop()
-            INSTANCES.pop(instance.map_id, None)
-            logging.info(f"Removed empty instance {instance.map_id}")
+            if INSTANCES.get(instance.map_id) is instance:
+                del INSTANCES[instance.map_id]
+            if not hibernated.hibernate(instance):
+                instance.stop()
+                logging.info(f"Removed empty instance {instance.map_id}")
 
         logging.info(f"Cleaned up player {client_id} from instance {instance.map_id}")
 
@@ -250,20 +331,18 @@ async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWrit
         pass
 
     client_id = next_client_id()
-    CLIENTS[client_id] = (reader, writer)
+    connection = ClientConnection(client_id, reader, writer)
+    connection.start()
+    CLIENTS[client_id] = connection
     logging.info(f"Client connected {client_id} from {peername(writer)} (total={len(CLIENTS)})")
 
     # Message de bienvenue avec liste des maps
-    try:
-        maps_list = map_loader.list_maps()
-        await send_json(writer, {
-            "t": "welcome",
-            "your_id": client_id,
-            "available_maps": maps_list
-        })
-    except Exception as e:
-        logging.warning(f"Failed to send welcome to {client_id}: {e}")
-        return
+    maps_list = map_loader.list_maps()
+    connection.send({
+        "t": "welcome",
+        "your_id": client_id,
+        "available_maps": maps_list
+    })
 
     buf_limit = 256 * 1024
 
@@ -290,51 +369,13 @@ async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWrit
             # Router les messages par type
             if isinstance(msg, dict):
                 msg_type = msg.get("t")
-
-                if msg_type == "ping":
-                    await send_json(writer, {"t": "pong"})
-
-                elif msg_type == "join":
-                    client_id = await handle_join_message(client_id, msg)
-
-                elif msg_type == "in":
-                    await handle_input_message(client_id, msg)
-
-                elif msg_type == "list_maps":
-                    await handle_list_maps_message(client_id, msg)
-
-                elif msg_type == "cast_spell":
-                    await handle_cast_spell_message(client_id, msg)
-
-                elif msg_type == "s":
-                    instance = find_player_instance(client_id)
-                    if instance:
-                        instance.add_spell_cast_from_spec(client_id, msg)
-
-                elif msg_type == "s2":
-                    instance = find_player_instance(client_id)
-                    if instance:
-                        instance.add_spell_cast_from_intent(client_id, msg)
-
-                elif msg_type == "chat":
-                    # Chat global ou par instance
-                    instance = find_player_instance(client_id)
-                    if instance:
-                        await instance.broadcast_to_players({
-                            "t": "chat",
-                            "from": client_id,
-                            "message": msg.get("message", "")
-                        })
-                    else:
-                        # Chat global si pas dans une instance
-                        await broadcast_json({
-                            "t": "chat",
-                            "from": client_id,
-                            "message": msg.get("message", "")
-                        })
-
-                else:
+                handler = MESSAGE_HANDLERS.get(msg_type)
+                if handler is None:
                     logging.warning(f"Unknown message type from {client_id}: {msg_type}")
+                    continue
+                new_client_id = await handler(client_id, msg)
+                if new_client_id:
+                    client_id = new_client_id
 
     except asyncio.CancelledError:
         pass
@@ -344,6 +385,23 @@ async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWrit
         await cleanup_client(client_id)
 
 
+def collect_metrics() -> str:
+    """Texte Prometheus : mesures par instance active et compteurs globaux"""
+    instances = {}
+    for map_id, instance in INSTANCES.items():
+        snapshot = instance.metrics_snapshot()
+        if snapshot is not None:
+            instances[map_id] = snapshot
+    gauges = {
+        "game_clients": len(CLIENTS),
+        "game_instances": len(INSTANCES),
+        "game_hibernated_instances": len(hibernated),
+    }
+    for name, value in OUTBOUND_STATS.items():
+        gauges[f"game_outbound_{name}_total"] = value
+    return render_prometheus(instances, gauges)
+
+
 async def shutdown(server: asyncio.AbstractServer):
     """Arrêt propre du serveur"""
     logging.info("Shutting down server...")
@@ -354,40 +412,56 @@ async def shutdown(server: asyncio.AbstractServer):
     for instance in INSTANCES.values():
         instance.save_all_players()
         instance.stop()
+    hibernated.clear()
+    if shards is not None:
+        # Attendre les dernieres sauvegardes relayees par les shards
+        await shards.shutdown()
+    # Un seul lot pour tous les joueurs
+    get_save().flush()
 
     logging.info("All players saved.")
 
     # Fermer les connexions actives
-    writers = [writer for _, writer in CLIENTS.values()]
-    for w in writers:
-        try:
-            w.close()
-        except Exception:
-            pass
-    for w in writers:
-        try:
-            await w.wait_closed()
-        except Exception:
-            pass
+    connections = list(CLIENTS.values())
+    for connection in connections:
+        connection.close()
+    for connection in connections:
+        await connection.wait_closed()
 
     CLIENTS.clear()
+    CLIENT_INSTANCES.clear()
     INSTANCES.clear()
     logging.info("Server shut down complete.")
 
 
-async def main():
-    host = HOST
-    port = PORT
-    if len(sys.argv) >= 2:
-        host = sys.argv[1]
-    if len(sys.argv) >= 3:
-        port = int(sys.argv[2])
+async def main(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    metrics_port: int = METRICS_PORT,
+    shard_processes: int = SHARD_PROCESSES,
+):
+    """Lance le serveur jusqu'a SIGINT / SIGTERM (host / port : argv puis config)."""
+    global shards
+    if host is None:
+        host = sys.argv[1] if len(sys.argv) >= 2 else HOST
+    if port is None:
+        port = int(sys.argv[2]) if len(sys.argv) >= 3 else PORT
 
     logging.info(f"Available maps: {map_loader.list_maps()}")
+    if shard_processes > 0:
+        shards = ShardSupervisor(
+            shard_processes, broadcast_json_to_players, send_raw_to_client, map_loader.update_objects
+        )
+        logging.info(f"Game instances run in up to {shard_processes} shard processes")
+
+    sweeper = asyncio.create_task(hibernated.run())
 
     server = await asyncio.start_server(handle_client, host, port)
     addr = ", ".join(str(sock.getsockname()) for sock in server.sockets or [])
     logging.info(f"Server listening on {addr}")
+    metrics_server = None
+    if metrics_port:
+        metrics_server = await serve_metrics(METRICS_HOST, metrics_port, collect_metrics)
 
     # Gestion des signaux
     loop = asyncio.get_running_loop()
@@ -401,6 +475,9 @@ async def main():
     try:
         await stop.wait()
     finally:
+        sweeper.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
         await shutdown(server)
 
 
@@ -0,0 +1,476 @@
+"""
+sharding.py -- Instances de jeu reparties sur plusieurs processus.
+
+Avec `server.shards: N` (config.yaml), le processus frontal garde les
+sockets, le MapLoader et la sauvegarde ; les `GameInstance` tournent dans
+au plus N processus shard, chacun avec sa propre boucle asyncio (et son
+propre GIL).  Cote frontal, une instance est un `InstanceProxy` qui relaie
+les appels de `server_run` au shard par un pipe ; le shard renvoie en lots
+les messages a envoyer aux clients et les mutations de sauvegarde.
+
+Messages frontal -> shard :
+    ("create", map_id, map_data)
+    ("admit", map_id, client_id, snapshot_formats, saved_state, saved_pos)
+    ("call", map_id, method, args)
+    ("stop", map_id)
+    ("exit",)
+Message shard -> frontal : ("batch", [item, ...]) avec item parmi
+    ("json", player_ids, message) / ("frame", client_id, data) / ("save", method, args)
+    ("hibernated", map_id, memory_estimate) / ("metrics", map_id, snapshot)
+    ("map_objects", map_id, objects)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+from typing import Callable, Optional
+
+from server.game_instance import GameInstance
+from server.save.error import PlayerNotFound
+from server.save.save import get_save, set_save
+from server.state import CLIENTS, INSTANCES
+
+# Delai laisse a un shard pour vider ses messages et se terminer
+SHARD_EXIT_TIMEOUT = 5.0
+# Periode d'envoi des mesures des instances d'un shard au frontal
+METRICS_REPORT_INTERVAL = 2.0
+
+# Methodes de GameInstance relayees telles quelles au shard
+PROXIED_METHODS = frozenset({
+    "add_input",
+    "add_spell_cast",
+    "add_spell_cast_from_spec",
+    "add_spell_cast_from_intent",
+    "ack_snapshot",
+    "broadcast_to_players",
+    "remove_player",
+    "save_all_players",
+    "hibernate",
+    "wake",
+})
+
+# Mutations de sauvegarde qu'un shard peut demander au frontal
+SAVE_METHODS = frozenset({"create_player", "update_player_state", "update_pos_player_map"})
+
+
+# ---------------------------------------------------------------------------
+# Processus frontal
+# ---------------------------------------------------------------------------
+
+class InstanceProxy:
+    """Instance hebergee par un shard, vue depuis le processus frontal."""
+
+    def __init__(self, supervisor: "ShardSupervisor", shard: "_Shard", map_id: str):
+        self.map_id = map_id
+        self.players: set[str] = set()
+        self.running = True
+        # Memoire estimee par le shard a la derniere mise en hibernation
+        self.hibernated_bytes = 0
+        # Dernieres mesures envoyees par le shard
+        self.metrics: Optional[dict] = None
+        self._supervisor = supervisor
+        self._shard = shard
+
+    def _call(self, method: str, *args) -> None:
+        if self.running:
+            self._shard.send(("call", self.map_id, method, args))
+
+    def admit_player(self, client_id: str, snapshot_formats=()) -> None:
+        # Le shard n'a pas acces a la sauvegarde : lui passer l'etat du joueur
+        save = get_save()
+        save.create_player(client_id)
+        try:
+            saved_pos = save.get_player_pos_on_a_map(self.map_id, client_id)
+        except PlayerNotFound:
+            saved_pos = None
+        saved_state = dict(save.get_player_state(client_id))
+        self.players.add(client_id)
+        self._shard.send(("admit", self.map_id, client_id, list(snapshot_formats), saved_state, saved_pos))
+
+    def remove_player(self, client_id: str) -> None:
+        self.players.discard(client_id)
+        self._call("remove_player", client_id)
+
+    def add_input(self, client_id: str, k: int, seq: int) -> None:
+        self._call("add_input", client_id, k, seq)
+
+    def add_spell_cast(self, client_id: str, spell_data: dict) -> None:
+        self._call("add_spell_cast", client_id, spell_data)
+
+    def add_spell_cast_from_spec(self, client_id: str, msg: dict) -> None:
+        self._call("add_spell_cast_from_spec", client_id, msg)
+
+    def add_spell_cast_from_intent(self, client_id: str, msg: dict) -> None:
+        self._call("add_spell_cast_from_intent", client_id, msg)
+
+    def ack_snapshot(self, client_id: str, seq: int) -> None:
+        self._call("ack_snapshot", client_id, seq)
+
+    def broadcast_to_players(self, message: dict) -> None:
+        self._call("broadcast_to_players", message)
+
+    def save_all_players(self) -> None:
+        self._call("save_all_players")
+
+    def hibernate(self) -> None:
+        self._call("hibernate")
+
+    def wake(self) -> bool:
+        if self._shard.closed.done():
+            return False
+        self.running = True
+        self._call("wake")
+        return True
+
+    def memory_estimate(self) -> int:
+        return self.hibernated_bytes
+
+    def metrics_snapshot(self) -> Optional[dict]:
+        return self.metrics
+
+    def stop(self) -> None:
+        if self.running:
+            self.running = False
+            self._supervisor.release(self)
+
+
+class _Shard:
+    """Processus shard, vu depuis le frontal."""
+
+    def __init__(self, name: str, process, conn):
+        self.name = name
+        self.process = process
+        self.conn = conn
+        self.instances: dict[str, InstanceProxy] = {}
+        self.exiting = False
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def send(self, command: tuple) -> None:
+        if self.closed.done():
+            return
+        try:
+            self.conn.send(command)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Cannot reach shard {self.name}: {e}")
+
+
+class ShardSupervisor:
+    """Demarre les shards a la demande, y place les instances et les arrete vides.
+
+    Une nouvelle instance va dans un nouveau shard tant qu'il y en a moins
+    de `max_shards`, sinon dans le shard qui heberge le moins d'instances.
+    """
+
+    def __init__(
+        self,
+        max_shards: int,
+        send_json: Callable[[dict, list], None],
+        send_raw: Callable[[str, bytes], None],
+        map_changed: Optional[Callable[[str, list], None]] = None,
+    ):
+        self.max_shards = max(1, int(max_shards))
+        self.send_json = send_json
+        self.send_raw = send_raw
+        self.map_changed = map_changed
+        self._shards: dict[str, _Shard] = {}
+        self._reaping: set[asyncio.Task] = set()
+        self._context = multiprocessing.get_context("spawn")
+
+    def spawn_instance(self, map_id: str, map_data: dict) -> InstanceProxy:
+        shard = self._pick_shard()
+        proxy = InstanceProxy(self, shard, map_id)
+        shard.instances[map_id] = proxy
+        shard.send(("create", map_id, map_data))
+        logging.info(f"Instance {map_id} placed on {shard.name}")
+        return proxy
+
+    def _pick_shard(self) -> _Shard:
+        live = [shard for shard in self._shards.values() if not shard.exiting]
+        if len(live) < self.max_shards:
+            return self._start_shard()
+        return min(live, key=lambda shard: len(shard.instances))
+
+    def _start_shard(self) -> _Shard:
+        # Noms reutilises : shard0, shard1, ... (un par emplacement libre)
+        index = next(i for i in range(len(self._shards) + 1) if f"shard{i}" not in self._shards)
+        name = f"shard{index}"
+        parent_conn, child_conn = self._context.Pipe(duplex=True)
+        process = self._context.Process(target=run_shard, args=(name, child_conn), name=name, daemon=True)
+        process.start()
+        child_conn.close()
+        shard = _Shard(name, process, parent_conn)
+        self._shards[name] = shard
+        asyncio.get_running_loop().add_reader(parent_conn.fileno(), self._on_readable, shard)
+        logging.info(f"Started {name} (pid={process.pid})")
+        return shard
+
+    def release(self, proxy: InstanceProxy) -> None:
+        """Arrete une instance ; le shard s'arrete s'il n'heberge plus rien."""
+        shard = proxy._shard
+        if shard.instances.get(proxy.map_id) is proxy:
+            del shard.instances[proxy.map_id]
+        shard.send(("stop", proxy.map_id))
+        if not shard.instances and not shard.exiting:
+            self._reap(shard)
+
+    def _reap(self, shard: _Shard) -> None:
+        shard.exiting = True
+        shard.send(("exit",))
+        task = asyncio.create_task(self._wait_exit(shard))
+        self._reaping.add(task)
+        task.add_done_callback(self._reaping.discard)
+
+    async def _wait_exit(self, shard: _Shard) -> None:
+        # Le shard ferme son pipe apres avoir tout envoye : attendre EOF
+        try:
+            await asyncio.wait_for(asyncio.shield(shard.closed), SHARD_EXIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.warning(f"{shard.name} did not exit in time, terminating")
+            shard.process.terminate()
+            self._close_shard(shard)
+        await asyncio.to_thread(shard.process.join, SHARD_EXIT_TIMEOUT)
+        if self._shards.get(shard.name) is shard:
+            del self._shards[shard.name]
+        logging.info(f"Reaped {shard.name} (exitcode={shard.process.exitcode})")
+
+    def _on_readable(self, shard: _Shard) -> None:
+        try:
+            while shard.conn.poll():
+                kind, items = shard.conn.recv()
+                if kind == "batch":
+                    self._dispatch(shard, items)
+        except (EOFError, OSError):
+            self._close_shard(shard)
+            if not shard.exiting:
+                self._on_shard_lost(shard)
+
+    def _dispatch(self, shard: _Shard, items: list) -> None:
+        save = None
+        for item in items:
+            kind = item[0]
+            if kind == "json":
+                self.send_json(item[2], item[1])
+            elif kind == "frame":
+                self.send_raw(item[1], item[2])
+            elif kind == "save" and item[1] in SAVE_METHODS:
+                save = save or get_save()
+                getattr(save, item[1])(*item[2])
+            elif kind == "hibernated":
+                proxy = shard.instances.get(item[1])
+                if proxy is not None:
+                    proxy.hibernated_bytes = item[2]
+            elif kind == "metrics":
+                proxy = shard.instances.get(item[1])
+                if proxy is not None:
+                    proxy.metrics = item[2]
+            elif kind == "map_objects" and self.map_changed is not None:
+                self.map_changed(item[1], item[2])
+
+    def _close_shard(self, shard: _Shard) -> None:
+        if shard.closed.done():
+            return
+        shard.closed.set_result(None)
+        try:
+            asyncio.get_running_loop().remove_reader(shard.conn.fileno())
+        except (OSError, ValueError):
+            pass
+        shard.conn.close()
+
+    def _on_shard_lost(self, shard: _Shard) -> None:
+        """Shard mort : ses instances disparaissent, leurs clients sont deconnectes."""
+        logging.error(f"{shard.name} exited unexpectedly (exitcode={shard.process.exitcode})")
+        shard.exiting = True
+        for proxy in list(shard.instances.values()):
+            proxy.running = False
+            if INSTANCES.get(proxy.map_id) is proxy:
+                del INSTANCES[proxy.map_id]
+            for client_id in list(proxy.players):
+                connection = CLIENTS.get(client_id)
+                if connection is not None:
+                    connection.close()
+        shard.instances.clear()
+        self._reap(shard)
+
+    async def shutdown(self) -> None:
+        """Arrete tous les shards apres avoir recu leurs derniers messages."""
+        for shard in list(self._shards.values()):
+            if not shard.exiting:
+                self._reap(shard)
+        if self._reaping:
+            await asyncio.gather(*self._reaping, return_exceptions=True)
+
+
+# ---------------------------------------------------------------------------
+# Processus shard
+# ---------------------------------------------------------------------------
+
+class RemoteSave:
+    """Sauvegarde d'un shard : lecture de l'etat passe a l'admission, ecritures relayees au frontal."""
+
+    def __init__(self, post: Callable[[tuple], None]):
+        self._post = post
+        self._states: dict[str, dict] = {}
+        self._positions: dict[tuple[str, str], tuple[float, float]] = {}
+
+    def seed(self, map_name: str, player_id: str, state: dict, pos) -> None:
+        self._states[player_id] = dict(state)
+        if pos is not None:
+            self._positions[(map_name, player_id)] = (pos[0], pos[1])
+        else:
+            self._positions.pop((map_name, player_id), None)
+
+    def get_player_state(self, player_id: str) -> dict:
+        state = self._states.get(player_id)
+        if state is None:
+            raise PlayerNotFound(f"Player {player_id} not found")
+        return state
+
+    def get_player_pos_on_a_map(self, map_name: str, player_id: str) -> tuple[float, float]:
+        pos = self._positions.get((map_name, player_id))
+        if pos is None:
+            raise PlayerNotFound(f"Player {player_id} not found on map {map_name}")
+        return pos
+
+    def create_player(self, player_id: str) -> None:
+        if player_id not in self._states:
+            self._states[player_id] = {}
+            self._post(("save", "create_player", (player_id,)))
+
+    def update_player_state(self, player_id: str, state: dict) -> None:
+        self._states.setdefault(player_id, {}).update(state)
+        self._post(("save", "update_player_state", (player_id, dict(state))))
+
+    def update_pos_player_map(self, map_name: str, player_id: str, position: tuple[float, float]) -> None:
+        position = (float(position[0]), float(position[1]))
+        self._positions[(map_name, player_id)] = position
+        self._post(("save", "update_pos_player_map", (map_name, player_id, position)))
+
+
+class ShardWorker:
+    """Boucle d'un shard : execute les commandes du frontal, renvoie ses messages en lots."""
+
+    def __init__(self, name: str, conn):
+        self.name = name
+        self.conn = conn
+        self.instances: dict = {}
+        self.save = RemoteSave(self._post)
+        self._outbox: list = []
+        self._flush_scheduled = False
+        self._done: Optional[asyncio.Future] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _post(self, item: tuple) -> None:
+        self._outbox.append(item)
+        if not self._flush_scheduled:
+            # Un seul envoi sur le pipe par tour de boucle
+            self._flush_scheduled = True
+            self._loop.call_soon(self._flush)
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        if not self._outbox:
+            return
+        items, self._outbox = self._outbox, []
+        try:
+            self.conn.send(("batch", items))
+        except (OSError, ValueError):
+            self._finish()
+
+    def _send_json(self, message: dict, player_ids) -> None:
+        self._post(("json", list(player_ids), message))
+
+    def _send_raw(self, client_id: str, data: bytes) -> None:
+        self._post(("frame", client_id, data))
+
+    def _map_changed(self, map_id: str, objects: list) -> None:
+        self._post(("map_objects", map_id, objects))
+
+    def _on_readable(self) -> None:
+        try:
+            while self.conn.poll():
+                command = self.conn.recv()
+                try:
+                    self._handle(command)
+                except Exception as e:
+                    logging.exception(f"{self.name}: error handling {command[0]!r}: {e}")
+        except (EOFError, OSError):
+            # Frontal parti : plus personne a qui envoyer quoi que ce soit
+            self._finish()
+
+    def _handle(self, command: tuple) -> None:
+        kind = command[0]
+        if kind == "call":
+            _, map_id, method, args = command
+            instance = self.instances.get(map_id)
+            if instance is not None and method in PROXIED_METHODS:
+                getattr(instance, method)(*args)
+                if method == "hibernate":
+                    self._post(("hibernated", map_id, instance.memory_estimate()))
+        elif kind == "admit":
+            _, map_id, client_id, snapshot_formats, saved_state, saved_pos = command
+            instance = self.instances.get(map_id)
+            if instance is not None:
+                self.save.seed(map_id, client_id, saved_state, saved_pos)
+                instance.admit_player(client_id, snapshot_formats)
+        elif kind == "create":
+            _, map_id, map_data = command
+            instance = GameInstance(
+                map_id,
+                map_data,
+                self._send_json,
+                send_raw_callback=self._send_raw,
+                map_changed_callback=self._map_changed,
+            )
+            self.instances[map_id] = instance
+            instance.start()
+        elif kind == "stop":
+            instance = self.instances.pop(command[1], None)
+            if instance is not None:
+                instance.save_all_players()
+                instance.stop()
+        elif kind == "exit":
+            self._finish()
+
+    def _finish(self) -> None:
+        if self._done.done():
+            return
+        self._done.set_result(None)
+        for instance in self.instances.values():
+            instance.save_all_players()
+            instance.stop()
+        self.instances.clear()
+        self._flush()
+
+    async def _report_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(METRICS_REPORT_INTERVAL)
+            for map_id, instance in self.instances.items():
+                if instance.running:
+                    self._post(("metrics", map_id, instance.metrics_snapshot()))
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._done = self._loop.create_future()
+        set_save(self.save)
+        self._loop.add_reader(self.conn.fileno(), self._on_readable)
+        reporter = asyncio.create_task(self._report_metrics())
+        try:
+            await self._done
+        finally:
+            reporter.cancel()
+            self._loop.remove_reader(self.conn.fileno())
+            self.conn.close()
+
+
+def run_shard(name: str, conn) -> None:
+    """Point d'entree d'un processus shard"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s %(levelname)s [{name}] %(message)s",
+        force=True,
+    )
+    # Ctrl+C vise le groupe de processus : c'est le frontal qui arrete les shards
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(ShardWorker(name, conn).run())
@@ -0,0 +1,30 @@
+"""
+sim_clock.py -- Horloge de simulation d'une instance.
+
+La simulation ne lit jamais l'heure murale : sorts (`next_tick_at`),
+attaques d'ennemis, effets et triggers se datent avec `instance.clock()`.
+`TickClock` avance d'exactement un pas a chaque `advance()` ; les memes
+inputs aux memes ticks redonnent donc le meme etat, en jeu comme au rejeu
+(server/replay.py).  Un pas saute (tick en retard) ou une instance
+hibernee n'avance pas l'horloge.
+"""
+from __future__ import annotations
+
+from server.config import TICK_INTERVAL
+
+
+class TickClock:
+    __slots__ = ("start", "tick_interval", "ticks")
+
+    def __init__(self, start: float, tick_interval: float = TICK_INTERVAL, ticks: int = 0):
+        self.start = float(start)
+        self.tick_interval = float(tick_interval)
+        self.ticks = int(ticks)
+
+    def __call__(self) -> float:
+        return self.start + self.ticks * self.tick_interval
+
+    def advance(self) -> float:
+        """Passe au pas suivant ; renvoie sa date."""
+        self.ticks += 1
+        return self()
@@ -0,0 +1,325 @@
+"""
+snapshot_codec.py -- Snapshots binaires delta-compresses pour `game_update`.
+
+Format "bin1", negocie au `join` (le client annonce `"snap": ["bin1"]`).  Le
+chemin JSON reste le defaut pour les clients qui ne l'annoncent pas.
+
+Trame (serveur -> client, intercalee avec les lignes JSON) :
+
+    0x00 | u32 longueur | payload
+
+Une ligne JSON ne commence jamais par 0x00, le client distingue donc les
+deux formats au premier octet.  Payload :
+
+    header   : u8 version, u8 flags, u32 seq, u32 baseline, f64 timestamp
+    names    : u16 n, n x (u16 handle, u8 len, utf-8)
+    players  : u16 n, n x entity record
+    enemies  : u16 n, n x entity record
+    spells   : si FLAG_SPELLS, u16 n, n x spell record
+    extras   : si FLAG_EXTRAS, u32 len, JSON {"terrain": [...], "effects": [...]}
+
+Chaque trame est un delta contre le dernier snapshot acquitte par le client
+(`baseline`, 0 = snapshot complet).  Les positions sont quantifiees au 1/16
+de pixel ; un record ne porte que les champs modifies (masque de bits).
+Le client acquitte via `{"t": "ack", "s": seq}` ou le champ `ack` des `in`.
+
+Les constantes sont dupliquees dans `client/network/snapshot_codec.py`.
+"""
+from __future__ import annotations
+
+import json
+import struct
+from dataclasses import dataclass, field
+from typing import Any
+
+SNAPSHOT_FORMAT = "bin1"
+SNAPSHOT_VERSION = 1
+FRAME_MARKER = b"\x00"
+
+FLAG_SPELLS = 0x01
+FLAG_EXTRAS = 0x02
+
+# Masque de champs d'un record d'entite
+FIELD_X = 0x01
+FIELD_Y = 0x02
+FIELD_HEALTH = 0x04
+FIELD_ALIVE = 0x08
+FIELD_SEQ = 0x10          # last_input_seq (joueur) / attack_seq (ennemi)
+FIELD_DELTA_POS = 0x20    # x / y en i16 relatifs a la baseline
+FIELD_DIRECTION = 0x40
+FIELD_REMOVED = 0x80
+
+POSITION_SCALE = 16.0
+SPELL_SCALE = 10.0
+STRING_INLINE = 0xFF
+
+# Codes des chaines frequentes des sorts (element, spell_id)
+STRING_CODES: tuple[str, ...] = (
+    "neutral", "fire", "lightning", "plasma", "inferno", "storm", "arcane", "ice",
+    "parametric", "fire_rune", "fire_projectile", "lightning_rune",
+)
+_STRING_INDEX = {value: index for index, value in enumerate(STRING_CODES)}
+
+_HEADER = struct.Struct("<BBIId")
+_FRAME_LEN = struct.Struct("<I")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_I8 = struct.Struct("<b")
+_I16 = struct.Struct("<h")
+_I32 = struct.Struct("<i")
+_F32 = struct.Struct("<f")
+_NAME = struct.Struct("<HB")
+_RECORD = struct.Struct("<HB")
+_SPELL = struct.Struct("<iiHhhB")
+_ELLIPSE = struct.Struct("<HHh")
+
+_MAX_UNACKED = 120
+_I16_MIN, _I16_MAX = -32768, 32767
+
+# Etat d'entite quantifie : (qx, qy, health, alive, seq, direction)
+EntityState = tuple[int, int, float, bool, int, int]
+
+
+@dataclass(slots=True)
+class WorldSnapshot:
+    """Etat complet d'une instance a un tick, commun a tous les clients."""
+
+    timestamp: float
+    players: dict[str, dict]
+    enemies: dict[str, dict]
+    spells: list[dict] = field(default_factory=list)
+    terrain: list[dict] = field(default_factory=list)
+    effects: list[dict] = field(default_factory=list)
+
+
+def _quantize(value: float) -> int:
+    return int(round(float(value) * POSITION_SCALE))
+
+
+def _player_state(data: dict) -> EntityState:
+    return (
+        _quantize(data["x"]),
+        _quantize(data["y"]),
+        float(data["health"]),
+        bool(data["alive"]),
+        int(data.get("last_input_seq", -1)),
+        0,
+    )
+
+
+def _enemy_state(data: dict) -> EntityState:
+    return (
+        _quantize(data["x"]),
+        _quantize(data["y"]),
+        float(data["health"]),
+        bool(data["alive"]),
+        int(data.get("attack_seq", 0)),
+        int(data.get("direction", 1)),
+    )
+
+
+@dataclass(slots=True)
+class _SentSnapshot:
+    players: dict[str, EntityState]
+    enemies: dict[str, EntityState]
+    names: list[int]
+
+
+class SnapshotEncoder:
+    """Encodeur par client : garde les snapshots non acquittes et la baseline."""
+
+    def __init__(self) -> None:
+        self.seq = 0
+        self.baseline_seq = 0
+        self._baseline_players: dict[str, EntityState] = {}
+        self._baseline_enemies: dict[str, EntityState] = {}
+        self._history: dict[int, _SentSnapshot] = {}
+        self._last_sent: _SentSnapshot | None = None
+        self._handles: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+        self._confirmed_handles: set[int] = set()
+        self._had_spells = False
+        self.bytes_encoded = 0
+
+    def ack(self, seq: int) -> None:
+        """Le client confirme avoir decode `seq` : il devient la baseline."""
+        sent = self._history.get(seq)
+        if sent is None or seq <= self.baseline_seq:
+            return
+        for old_seq in [s for s in self._history if s <= seq]:
+            self._confirmed_handles.update(self._history.pop(old_seq).names)
+        self.baseline_seq = seq
+        self._baseline_players = sent.players
+        self._baseline_enemies = sent.enemies
+
+    def _reset_baseline(self) -> None:
+        # Client muet trop longtemps : repartir d'un snapshot complet
+        self.baseline_seq = 0
+        self._baseline_players = {}
+        self._baseline_enemies = {}
+        self._history.clear()
+        self._last_sent = None
+        self._confirmed_handles.clear()
+
+    def _handle(self, name: str) -> int:
+        handle = self._handles.get(name)
+        if handle is None:
+            handle = len(self._handles) + 1
+            self._handles[name] = handle
+            self._names[handle] = name
+        return handle
+
+    def encode(self, world: WorldSnapshot) -> bytes | None:
+        """Trame binaire pour ce client, ou None si rien n'a change."""
+        if len(self._history) >= _MAX_UNACKED:
+            self._reset_baseline()
+
+        players = {pid: _player_state(data) for pid, data in world.players.items()}
+        enemies = {eid: _enemy_state(data) for eid, data in world.enemies.items()}
+
+        flags = 0
+        if world.spells or self._had_spells:
+            flags |= FLAG_SPELLS
+        if world.terrain or world.effects:
+            flags |= FLAG_EXTRAS
+        self._had_spells = bool(world.spells)
+
+        # Rien de neuf depuis la derniere trame envoyee : le client est a jour
+        last = self._last_sent
+        if not flags and last is not None and last.players == players and last.enemies == enemies:
+            return None
+
+        names: list[int] = []
+        player_records = self._encode_entities(players, self._baseline_players, names)
+        enemy_records = self._encode_entities(enemies, self._baseline_enemies, names)
+
+        self.seq += 1
+        self._last_sent = self._history[self.seq] = _SentSnapshot(players, enemies, names)
+
+        body = bytearray()
+
+        body += _HEADER.pack(SNAPSHOT_VERSION, flags, self.seq, self.baseline_seq, float(world.timestamp))
+        body += _U16.pack(len(names))
+        for handle in names:
+            name = self._names[handle].encode("utf-8")[:255]
+            body += _NAME.pack(handle, len(name))
+            body += name
+        for count, data in (player_records, enemy_records):
+            body += _U16.pack(count)
+            body += data
+        if flags & FLAG_SPELLS:
+            body += _encode_spells(world.spells)
+        if flags & FLAG_EXTRAS:
+            extras = json.dumps({"terrain": world.terrain, "effects": world.effects}).encode("utf-8")
+            body += _U32.pack(len(extras))
+            body += extras
+
+        frame = FRAME_MARKER + _FRAME_LEN.pack(len(body)) + bytes(body)
+        self.bytes_encoded += len(frame)
+        return frame
+
+    def _encode_entities(
+        self,
+        current: dict[str, EntityState],
+        baseline: dict[str, EntityState],
+        names: list[int],
+    ) -> tuple[int, bytes]:
+        out = bytearray()
+        count = 0
+        for name, state in current.items():
+            previous = baseline.get(name)
+            if previous == state:
+                continue
+            handle = self._handle(name)
+            if handle not in self._confirmed_handles:
+                names.append(handle)
+            out += _encode_entity(handle, state, previous)
+            count += 1
+        for name in baseline.keys() - current.keys():
+            out += _RECORD.pack(self._handle(name), FIELD_REMOVED)
+            count += 1
+        return count, bytes(out)
+
+
+def _encode_entity(handle: int, state: EntityState, previous: EntityState | None) -> bytes:
+    qx, qy, health, alive, seq, direction = state
+    mask = 0
+    payload = bytearray()
+
+    if previous is None:
+        mask |= FIELD_X | FIELD_Y | FIELD_HEALTH | FIELD_ALIVE | FIELD_SEQ | FIELD_DIRECTION
+        payload += _I32.pack(qx) + _I32.pack(qy)
+    else:
+        pqx, pqy, phealth, palive, pseq, pdirection = previous
+        if qx != pqx:
+            mask |= FIELD_X
+        if qy != pqy:
+            mask |= FIELD_Y
+        if mask & (FIELD_X | FIELD_Y):
+            dx = qx - pqx
+            dy = qy - pqy
+            if _I16_MIN <= dx <= _I16_MAX and _I16_MIN <= dy <= _I16_MAX:
+                mask |= FIELD_DELTA_POS
+                if mask & FIELD_X:
+                    payload += _I16.pack(dx)
+                if mask & FIELD_Y:
+                    payload += _I16.pack(dy)
+            else:
+                if mask & FIELD_X:
+                    payload += _I32.pack(qx)
+                if mask & FIELD_Y:
+                    payload += _I32.pack(qy)
+        if health != phealth:
+            mask |= FIELD_HEALTH
+        if alive != palive:
+            mask |= FIELD_ALIVE
+        if seq != pseq:
+            mask |= FIELD_SEQ
+        if direction != pdirection:
+            mask |= FIELD_DIRECTION
+
+    if mask & FIELD_HEALTH:
+        payload += _F32.pack(health)
+    if mask & FIELD_ALIVE:
+        payload += _U8.pack(1 if alive else 0)
+    if mask & FIELD_SEQ:
+        payload += _I32.pack(seq)
+    if mask & FIELD_DIRECTION:
+        payload += _I8.pack(direction)
+    return _RECORD.pack(handle, mask) + payload
+
+
+def _encode_string(value: str) -> bytes:
+    code = _STRING_INDEX.get(value)
+    if code is not None:
+        return _U8.pack(code)
+    raw = value.encode("utf-8")[:255]
+    return _U8.pack(STRING_INLINE) + _U8.pack(len(raw)) + raw
+
+
+def _clamp_int(value: float, minimum: int, maximum: int) -> int:
+    return max(minimum, min(maximum, int(round(value))))
+
+
+def _encode_spells(spells: list[dict[str, Any]]) -> bytes:
+    out = bytearray(_U16.pack(len(spells)))
+    for spell in spells:
+        has_ellipse = "rx" in spell
+        out += _SPELL.pack(
+            _quantize(spell["x"]),
+            _quantize(spell["y"]),
+            _clamp_int(spell["r"] * SPELL_SCALE, 0, 65535),
+            _clamp_int(spell["vx"] * SPELL_SCALE, _I16_MIN, _I16_MAX),
+            _clamp_int(spell["vy"] * SPELL_SCALE, _I16_MIN, _I16_MAX),
+            1 if has_ellipse else 0,
+        )
+        out += _encode_string(spell["e"])
+        out += _encode_string(spell["bh"])
+        if has_ellipse:
+            out += _ELLIPSE.pack(
+                _clamp_int(spell["rx"] * SPELL_SCALE, 0, 65535),
+                _clamp_int(spell["ry"] * SPELL_SCALE, 0, 65535),
+                _clamp_int(spell["ea"], _I16_MIN, _I16_MAX),
+            )
+    return bytes(out)
@@ -0,0 +1,114 @@
+"""
+spatial_grid.py -- Grille de hachage spatiale uniforme.
+
+Indexe des entites ponctuelles (ennemis, joueurs) par cellule carree pour
+remplacer les parcours complets de `instance.enemies` / `instance.players`
+par des requetes locales.  Les positions sont mises a jour incrementalement
+a chaque deplacement.
+"""
+from __future__ import annotations
+
+import math
+from typing import Hashable, Iterable
+
+CellKey = tuple[int, int]
+
+_MIN_CELL_SIZE = 64.0
+_CELLS_PER_AXIS = 64
+
+
+def cell_size_for_map(map_size: Iterable[float]) -> float:
+    """Taille de cellule derivee de la taille de la map (~64 cellules sur le grand axe)."""
+    width, height = map_size
+    return max(_MIN_CELL_SIZE, max(float(width), float(height)) / _CELLS_PER_AXIS)
+
+
+class SpatialHashGrid:
+    def __init__(self, cell_size: float):
+        self.cell_size = max(1.0, float(cell_size))
+        self._inv_cell = 1.0 / self.cell_size
+        self._cells: dict[CellKey, set[Hashable]] = {}
+        self._positions: dict[Hashable, tuple[float, float]] = {}
+        self._cell_of: dict[Hashable, CellKey] = {}
+        # Ordre d'insertion : les requetes rendent les cles dans cet ordre
+        # pour conserver le comportement des anciens parcours de dict.
+        self._order: dict[Hashable, int] = {}
+        self._next_order = 0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def _cell(self, x: float, y: float) -> CellKey:
+        return math.floor(x * self._inv_cell), math.floor(y * self._inv_cell)
+
+    def move(self, key: Hashable, x: float, y: float) -> None:
+        """Insere ou deplace une entite."""
+        cell = self._cell(x, y)
+        self._positions[key] = (x, y)
+        previous = self._cell_of.get(key)
+        if previous == cell:
+            return
+        if previous is not None:
+            bucket = self._cells[previous]
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[previous]
+        else:
+            self._order[key] = self._next_order
+            self._next_order += 1
+        self._cell_of[key] = cell
+        self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        cell = self._cell_of.pop(key, None)
+        if cell is None:
+            return
+        del self._positions[key]
+        del self._order[key]
+        bucket = self._cells[cell]
+        bucket.discard(key)
+        if not bucket:
+            del self._cells[cell]
+
+    def position(self, key: Hashable) -> tuple[float, float] | None:
+        return self._positions.get(key)
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._positions.clear()
+        self._cell_of.clear()
+        self._order.clear()
+
+    def query_radius(self, x: float, y: float, radius: float) -> list[Hashable]:
+        """Cles dont la position est a distance <= radius, dans l'ordre d'insertion."""
+        radius = max(0.0, float(radius))
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+
+        # Zone plus large que la population : un parcours direct est moins cher
+        span = (max_cx - min_cx + 1) * (max_cy - min_cy + 1)
+        if span >= len(self._cells):
+            candidates: Iterable[Hashable] = self._positions
+        else:
+            candidates = []
+            cells = self._cells
+            for cx in range(min_cx, max_cx + 1):
+                for cy in range(min_cy, max_cy + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket:
+                        candidates.extend(bucket)
+
+        r2 = radius * radius
+        positions = self._positions
+        found = []
+        for key in candidates:
+            px, py = positions[key]
+            dx = px - x
+            dy = py - y
+            if dx * dx + dy * dy <= r2:
+                found.append(key)
+        found.sort(key=self._order.__getitem__)
+        return found
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(slots=True, eq=False)
+class ActiveSpell:
+    """Sort actif dans une instance.
+
+    Unique chemin de construction pour tous les modules de sorts : les champs
+    numeriques sont normalises une fois ici, les ticks lisent des attributs.
+    Le format dict n'existe plus qu'a la frontiere reseau (`to_network_state`).
+    """
+
+    spell_id: str
+    owner_id: str
+    x: float
+    y: float
+    element: str = "neutral"
+    velocity_x: float = 0.0
+    velocity_y: float = 0.0
+    hitbox_radius: float = 12.0
+    hitbox_radius_x: float | None = None   # None -> hitbox_radius
+    hitbox_radius_y: float | None = None   # None -> hitbox_radius
+    ellipse_angle: float = 0.0
+    remaining: float = 0.0
+    initial_duration: float | None = None  # None -> remaining
+    tick_interval: float = 0.20
+    next_tick_at: float = 0.0
+
+    # Degats
+    damage_per_tick: float = 0.0
+    tick_damage: float = 0.0
+    impact_damage: float = 0.0
+    cone_half_angle: float = 0.0
+    spell_dir_x: float = 1.0
+    spell_dir_y: float = 0.0
+    pierce: bool = False
+    hit_targets: set[str] = field(default_factory=set)
+    hit_once: bool = False
+    compression: float = 0.0
+    fade_rate: float = 0.0
+    modifiers: list[dict[str, Any]] = field(default_factory=list)
+
+    # AOI : zone secondaire a l'impact
+    aoi: bool = False
+    aoi_radius: float = 60.0
+    aoi_tick_damage: float = 6.0
+    aoi_duration: float = 1.5
+    aoi_tick_interval: float = 0.20
+    aoi_explosion: bool = False
+
+    # Split : fragmentation a l'impact / a l'expiration
+    split_count: int = 0
+    split_on_impact: bool = False
+    split_triggered: bool = False
+    split_fragment: bool = False
+
+    # Sorts multi-phases (protocole s2)
+    s2_phases: list[dict] | None = None
+    s2_phase_idx: int = 0
+    s2_global_power: float = 0.5
+    s2_impact_kill: bool = False
+
+    def __post_init__(self) -> None:
+        self.x = float(self.x)
+        self.y = float(self.y)
+        self.velocity_x = float(self.velocity_x)
+        self.velocity_y = float(self.velocity_y)
+        self.hitbox_radius = float(self.hitbox_radius)
+        self.hitbox_radius_x = float(
+            self.hitbox_radius if self.hitbox_radius_x is None else self.hitbox_radius_x
+        )
+        self.hitbox_radius_y = float(
+            self.hitbox_radius if self.hitbox_radius_y is None else self.hitbox_radius_y
+        )
+        self.ellipse_angle = float(self.ellipse_angle)
+        self.remaining = float(self.remaining)
+        self.initial_duration = float(
+            self.remaining if self.initial_duration is None else self.initial_duration
+        )
+        # Le scheduler de tick n'accepte pas d'intervalle plus court
+        self.tick_interval = max(0.05, float(self.tick_interval))
+        self.next_tick_at = float(self.next_tick_at)
+        self.damage_per_tick = float(self.damage_per_tick)
+        self.tick_damage = float(self.tick_damage)
+        self.impact_damage = float(self.impact_damage)
+        self.cone_half_angle = float(self.cone_half_angle)
+        self.spell_dir_x = float(self.spell_dir_x)
+        self.spell_dir_y = float(self.spell_dir_y)
+        self.compression = float(self.compression)
+        self.fade_rate = float(self.fade_rate)
+
+    @property
+    def is_moving(self) -> bool:
+        return abs(self.velocity_x) > 1e-6 or abs(self.velocity_y) > 1e-6
+
+    @property
+    def bounding_radius(self) -> float:
+        return max(self.hitbox_radius_x, self.hitbox_radius_y)
+
+    def to_network_state(self) -> dict[str, Any]:
+        entry = {
+            "x":  round(self.x, 1),
+            "y":  round(self.y, 1),
+            "r":  round(self.hitbox_radius, 1),
+            "e":  self.element,
+            "vx": round(self.velocity_x, 1),
+            "vy": round(self.velocity_y, 1),
+            "bh": self.spell_id,
+        }
+        # Forme elliptique (mur) : envoyer rx/ry/angle
+        if abs(self.hitbox_radius_x - self.hitbox_radius_y) > 2.0:
+            entry["rx"] = round(self.hitbox_radius_x, 1)
+            entry["ry"] = round(self.hitbox_radius_y, 1)
+            entry["ea"] = round(math.degrees(self.ellipse_angle))
+        return entry
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-import math
-import time
 from typing import Any
 
+from server.spells.active_spell import ActiveSpell
 from server.spells.runtime import apply_enemy_damage, resolve_player_direction
 from server.spells.types import ServerSpellDefinition
 
@@ -44,48 +43,36 @@ def cast_fire_projectile(
     x = player_x + dir_x * (radius + 20.0)
     y = player_y + dir_y * (radius + 20.0)
 
-    instance.active_spells.append({
-        "spell_id":       "fire_projectile",
-        "owner_id":       client_id,
-        "x":              x,
-        "y":              y,
-        "velocity_x":     dir_x * speed,
-        "velocity_y":     dir_y * speed,
-        "hitbox_radius":  radius,
-        "hitbox_radius_x": radius,
-        "hitbox_radius_y": radius,
-        "ellipse_angle":  0.0,
-        "remaining":      duration,
-        "tick_interval":  0.05,
-        "damage_per_tick": 0.0,
-        "impact_damage":  damage,
-        "next_tick_at":   time.time(),
-        "hit_once":       False,
-    })
-
-
-def tick_fire_projectile(instance: Any, spell: dict[str, Any]) -> None:
-    if spell.get("hit_once"):
-        spell["remaining"] = 0.0
+    instance.active_spells.append(ActiveSpell(
+        spell_id="fire_projectile",
+        owner_id=client_id,
+        x=x,
+        y=y,
+        velocity_x=dir_x * speed,
+        velocity_y=dir_y * speed,
+        hitbox_radius=radius,
+        remaining=duration,
+        tick_interval=0.05,
+        impact_damage=damage,
+        next_tick_at=instance.clock(),
+    ))
+
+
+def tick_fire_projectile(instance: Any, spell: ActiveSpell) -> None:
+    if spell.hit_once:
+        spell.remaining = 0.0
         return
 
-    cx = float(spell["x"])
-    cy = float(spell["y"])
-    radius = max(1.0, float(spell.get("hitbox_radius", _BASE_RADIUS)))
-    damage = max(0.0, float(spell.get("impact_damage", _BASE_DAMAGE)))
+    cx = spell.x
+    cy = spell.y
+    radius = max(1.0, spell.hitbox_radius)
+    damage = max(0.0, spell.impact_damage)
 
     enemy_hr = instance.enemy_collision_size * 0.5
-    for enemy in instance.enemies.values():
-        if not enemy.get("alive", True):
-            continue
-        dx = enemy["x"] - cx
-        dy = enemy["y"] - cy
-        if math.hypot(dx, dy) > radius + enemy_hr:
-            continue
-
+    for _, enemy in instance.enemies_in_radius(cx, cy, radius + enemy_hr):
         apply_enemy_damage(enemy, damage)
-        spell["hit_once"] = True
-        spell["remaining"] = 0.0
+        spell.hit_once = True
+        spell.remaining = 0.0
         return
 
 
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import math
-import time
 from typing import Any
 
+from server.spells.active_spell import ActiveSpell
 from server.spells.runtime import apply_enemy_damage, facing_direction
 from server.spells.types import ServerSpellDefinition
 
@@ -51,48 +51,44 @@ def cast_fire_rune(instance: Any, client_id: str, payload: dict[str, Any], modif
     y = instance._clamp(raw_y, radius_y, max(radius_y, map_height - radius_y))
 
     instance.active_spells.append(
-        {
-            "spell_id": "fire_rune",
-            "owner_id": client_id,
-            "x": x,
-            "y": y,
-            "hitbox_radius": radius,
-            "hitbox_radius_x": radius_x,
-            "hitbox_radius_y": radius_y,
-            "ellipse_angle": ellipse_angle,
-            "velocity_x": velocity_x,
-            "velocity_y": velocity_y,
-            "remaining": duration,
-            "tick_interval": tick_interval,
-            "damage_per_tick": damage_per_tick,
-            "next_tick_at": time.time(),
-            "modifiers": modifiers,
-        }
+        ActiveSpell(
+            spell_id="fire_rune",
+            owner_id=client_id,
+            x=x,
+            y=y,
+            hitbox_radius=radius,
+            hitbox_radius_x=radius_x,
+            hitbox_radius_y=radius_y,
+            ellipse_angle=ellipse_angle,
+            velocity_x=velocity_x,
+            velocity_y=velocity_y,
+            remaining=duration,
+            tick_interval=tick_interval,
+            damage_per_tick=damage_per_tick,
+            next_tick_at=instance.clock(),
+            modifiers=modifiers,
+        )
     )
 
 
-def tick_fire_rune(instance: Any, spell: dict[str, Any]) -> None:
-    cx = float(spell["x"])
-    cy = float(spell["y"])
-    radius = float(spell.get("hitbox_radius", instance.fire_rune_min_radius))
-    radius_x = max(1.0, float(spell.get("hitbox_radius_x", radius)))
-    radius_y = max(1.0, float(spell.get("hitbox_radius_y", radius)))
-    ellipse_angle = float(spell.get("ellipse_angle", 0.0))
-    cos_angle = math.cos(ellipse_angle)
-    sin_angle = math.sin(ellipse_angle)
-    damage = max(0.0, float(spell.get("damage_per_tick", instance.fire_rune_tick_damage)))
+def tick_fire_rune(instance: Any, spell: ActiveSpell) -> None:
+    cx = spell.x
+    cy = spell.y
+    radius_x = max(1.0, spell.hitbox_radius_x)
+    radius_y = max(1.0, spell.hitbox_radius_y)
+    cos_angle = math.cos(spell.ellipse_angle)
+    sin_angle = math.sin(spell.ellipse_angle)
+    damage = max(0.0, spell.damage_per_tick)
     if damage <= 0.0:
         return
 
     enemy_hit_radius = instance.enemy_collision_size * 0.5
     broad_phase = max(radius_x, radius_y)
-    for enemy in instance.enemies.values():
+    for _, enemy in instance.enemies_in_radius(cx, cy, broad_phase + enemy_hit_radius):
         if not enemy.get("alive", True):
             continue
         dx = enemy["x"] - cx
         dy = enemy["y"] - cy
-        if math.hypot(dx, dy) > broad_phase + enemy_hit_radius:
-            continue
 
         if abs(radius_x - radius_y) <= 1e-6:
             if dx * dx + dy * dy > (radius_x + enemy_hit_radius) ** 2:
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-import time
 from typing import Any
 
+from server.spells.active_spell import ActiveSpell
 from server.spells.runtime import apply_enemy_damage, resolve_player_direction
 from server.spells.types import ServerSpellDefinition
 
@@ -45,41 +45,29 @@ def cast_lightning_rune(
     x = instance._clamp(player_x + dir_x * cast_dist, radius, map_w - radius)
     y = instance._clamp(player_y + dir_y * cast_dist, radius, map_h - radius)
 
-    instance.active_spells.append({
-        "spell_id":        "lightning_rune",
-        "owner_id":        client_id,
-        "x":               x,
-        "y":               y,
-        "hitbox_radius":   radius,
-        "hitbox_radius_x": radius,
-        "hitbox_radius_y": radius,
-        "ellipse_angle":   0.0,
-        "velocity_x":      0.0,
-        "velocity_y":      0.0,
-        "remaining":       duration,
-        "tick_interval":   tick_interval,
-        "damage_per_tick": damage,
-        "next_tick_at":    time.time(),
-    })
+    instance.active_spells.append(ActiveSpell(
+        spell_id="lightning_rune",
+        owner_id=client_id,
+        x=x,
+        y=y,
+        hitbox_radius=radius,
+        remaining=duration,
+        tick_interval=tick_interval,
+        damage_per_tick=damage,
+        next_tick_at=instance.clock(),
+    ))
 
 
-def tick_lightning_rune(instance: Any, spell: dict[str, Any]) -> None:
-    cx = float(spell["x"])
-    cy = float(spell["y"])
-    radius = max(1.0, float(spell.get("hitbox_radius", _BASE_RADIUS)))
-    damage = max(0.0, float(spell.get("damage_per_tick", _BASE_DAMAGE)))
+def tick_lightning_rune(instance: Any, spell: ActiveSpell) -> None:
+    cx = spell.x
+    cy = spell.y
+    radius = max(1.0, spell.hitbox_radius)
+    damage = max(0.0, spell.damage_per_tick)
     if damage <= 0.0:
         return
 
     enemy_hr = instance.enemy_collision_size * 0.5
-    r2 = (radius + enemy_hr) ** 2
-    for enemy in instance.enemies.values():
-        if not enemy.get("alive", True):
-            continue
-        dx = enemy["x"] - cx
-        dy = enemy["y"] - cy
-        if dx * dx + dy * dy > r2:
-            continue
+    for _, enemy in instance.enemies_in_radius(cx, cy, radius + enemy_hr):
         apply_enemy_damage(enemy, damage)
 
 
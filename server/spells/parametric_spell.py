@@ -15,10 +15,10 @@ Comportement derive des proprietes continues (pas de switch hardcode) :
 from __future__ import annotations
 
 import math
-import time
 from typing import Any
 
 from server.magic.spell_spec import ServerSpellSpec
+from server.spells.active_spell import ActiveSpell
 from server.spells.runtime import apply_enemy_damage, facing_direction, normalize_direction
 from server.spells.types import ServerSpellDefinition
 
@@ -39,6 +39,7 @@ _BASE_TICK_INTERVAL = 0.20
 _MAX_SPEED = 500.0
 _MIN_RADIUS = 8.0
 _MAX_RADIUS = 300.0
+_SWEEP_MARGIN = 1e-6
 
 
 def cast_parametric_spell(
@@ -182,7 +183,7 @@ def cast_parametric_spell(
     # ─── AOI : projectile qui crée une zone à l'impact ────────────
     # Si aoi=True, le projectile est simplifié (impact pur, pas de tick,
     # pas de pierce) et stocke les params de la zone secondaire.
-    aoi_fields: dict = {}
+    aoi_fields: dict[str, Any] = {}
     if spec.aoi and has_movement:
         aoi_spread = max(spec.spread, 0.15)
         aoi_radius = _clamp(
@@ -204,61 +205,57 @@ def cast_parametric_spell(
         tick_damage   = 0.0
         pierce        = False
 
-    spell_entry: dict = {
-        "spell_id":         "parametric",
-        "owner_id":         client_id,
-        "element":          element,
-        "x":                x,
-        "y":                y,
-        "velocity_x":       dir_x * speed,
-        "velocity_y":       dir_y * speed,
-        "hitbox_radius":    radius,
-        "hitbox_radius_x":  radius_x,
-        "hitbox_radius_y":  radius_y,
-        "ellipse_angle":    ellipse_angle,
-        "remaining":        duration,
-        "initial_duration": duration,
-        "tick_interval":    tick_interval,
-        "tick_damage":      tick_damage,
-        "impact_damage":    impact_damage,
-        "next_tick_at":     time.time(),
-        "cone_half_angle":  cone_half_angle,
-        "spell_dir_x":      dir_x,
-        "spell_dir_y":      dir_y,
-        "pierce":           pierce,
-        "hit_targets":      [],
-        "compression":      spec.compression,
-        "fade_rate":        spec.fade_rate,
-    }
-    if aoi_fields:
-        spell_entry.update(aoi_fields)
-
     # ─── Split (fragmentation à l'impact ou à l'expiration) ──────
-    if spec.split_count > 0 and not spell_entry.get("aoi"):
-        # AOI prioritaire : pas de split simultané (évite la surcharge)
-        spell_entry["split_count"]      = max(2, min(spec.split_count, 8))
-        spell_entry["split_on_impact"]  = spec.split_on_impact
-        spell_entry["split_triggered"]  = False  # garde-fou anti-double-spawn
-
-    instance.active_spells.append(spell_entry)
-
+    # AOI prioritaire : pas de split simultané (évite la surcharge)
+    split_fields: dict[str, Any] = {}
+    if spec.split_count > 0 and not aoi_fields:
+        split_fields = {
+            "split_count":     max(2, min(spec.split_count, 8)),
+            "split_on_impact": spec.split_on_impact,
+        }
 
-def tick_parametric_spell(instance: Any, spell: dict[str, Any]) -> None:
+    instance.active_spells.append(ActiveSpell(
+        spell_id="parametric",
+        owner_id=client_id,
+        element=element,
+        x=x,
+        y=y,
+        velocity_x=dir_x * speed,
+        velocity_y=dir_y * speed,
+        hitbox_radius=radius,
+        hitbox_radius_x=radius_x,
+        hitbox_radius_y=radius_y,
+        ellipse_angle=ellipse_angle,
+        remaining=duration,
+        tick_interval=tick_interval,
+        tick_damage=tick_damage,
+        impact_damage=impact_damage,
+        next_tick_at=instance.clock(),
+        cone_half_angle=cone_half_angle,
+        spell_dir_x=dir_x,
+        spell_dir_y=dir_y,
+        pierce=pierce,
+        compression=spec.compression,
+        fade_rate=spec.fade_rate,
+        **aoi_fields,
+        **split_fields,
+    ))
+
+
+def tick_parametric_spell(instance: Any, spell: ActiveSpell) -> None:
     """Tick handler unifie pour tous les sorts parametriques."""
-    cx = float(spell["x"])
-    cy = float(spell["y"])
-    radius = max(1.0, float(spell.get("hitbox_radius", _MIN_RADIUS)))
-    radius_x = max(1.0, float(spell.get("hitbox_radius_x", radius)))
-    radius_y = max(1.0, float(spell.get("hitbox_radius_y", radius)))
-    ellipse_angle = float(spell.get("ellipse_angle", 0.0))
-    tick_damage = max(0.0, float(spell.get("tick_damage", 0.0)))
-    impact_damage = max(0.0, float(spell.get("impact_damage", 0.0)))
-    cone_half_angle = float(spell.get("cone_half_angle", 0.0))
-    spell_dir_x = float(spell.get("spell_dir_x", 1.0))
-    spell_dir_y = float(spell.get("spell_dir_y", 0.0))
-    pierce = spell.get("pierce", False)
-    hit_targets: list[str] = spell.get("hit_targets", [])
-    fade_rate = float(spell.get("fade_rate", 0.0))
+    cx = spell.x
+    cy = spell.y
+    radius_x = max(1.0, spell.hitbox_radius_x)
+    radius_y = max(1.0, spell.hitbox_radius_y)
+    tick_damage = max(0.0, spell.tick_damage)
+    impact_damage = max(0.0, spell.impact_damage)
+    cone_half_angle = spell.cone_half_angle
+    spell_dir_x = spell.spell_dir_x
+    spell_dir_y = spell.spell_dir_y
+    pierce = spell.pierce
+    hit_targets = spell.hit_targets
+    fade_rate = spell.fade_rate
 
     if tick_damage <= 0.0 and impact_damage <= 0.0:
         return
@@ -266,16 +263,16 @@ def tick_parametric_spell(instance: Any, spell: dict[str, Any]) -> None:
     # Attenuation des degats de zone selon fade_rate (mare)
     effective_tick = tick_damage
     if fade_rate > 0.0 and tick_damage > 0.0:
-        initial_dur = max(spell.get("initial_duration", 1.0), 0.01)
-        elapsed_ratio = 1.0 - spell["remaining"] / initial_dur
+        initial_dur = max(spell.initial_duration, 0.01)
+        elapsed_ratio = 1.0 - spell.remaining / initial_dur
         effective_tick = tick_damage * max(0.0, 1.0 - elapsed_ratio * fade_rate)
 
-    cos_angle = math.cos(ellipse_angle)
-    sin_angle = math.sin(ellipse_angle)
+    cos_angle = math.cos(spell.ellipse_angle)
+    sin_angle = math.sin(spell.ellipse_angle)
     enemy_hr = instance.enemy_collision_size * 0.5
     broad_phase = max(radius_x, radius_y)
 
-    for enemy_id, enemy in instance.enemies.items():
+    for enemy_id, enemy in instance.enemies_in_radius(cx, cy, broad_phase + enemy_hr):
         if not enemy.get("alive", True):
             continue
 
@@ -283,9 +280,6 @@ def tick_parametric_spell(instance: Any, spell: dict[str, Any]) -> None:
         dy = enemy["y"] - cy
         dist = math.hypot(dx, dy)
 
-        if dist > broad_phase + enemy_hr:
-            continue
-
         # ── Hitbox elliptique ──
         if abs(radius_x - radius_y) > 1e-6:
             local_x = dx * cos_angle + dy * sin_angle
@@ -312,18 +306,18 @@ def tick_parametric_spell(instance: Any, spell: dict[str, Any]) -> None:
 
         if impact_damage > 0.0 and enemy_id not in hit_targets:
             damage += impact_damage
-            hit_targets.append(enemy_id)
-            if spell.get("aoi"):
+            hit_targets.add(enemy_id)
+            if spell.aoi:
                 # AOI prioritaire : explosion à l'impact, le projectile meurt
-                spell["remaining"] = 0.0
+                spell.remaining = 0.0
                 _spawn_aoe_explosion(instance, spell, cx, cy)
-            elif spell.get("split_on_impact") and not spell.get("split_triggered"):
+            elif spell.split_on_impact and not spell.split_triggered:
                 # Split à l'impact : fragmentation, le projectile meurt
-                spell["remaining"] = 0.0
-                spell["split_triggered"] = True
+                spell.remaining = 0.0
+                spell.split_triggered = True
                 _spawn_split_projectiles(instance, spell)
             elif not pierce:
-                spell["remaining"] = 0.0
+                spell.remaining = 0.0
 
         if effective_tick > 0.0:
             damage += effective_tick
@@ -333,13 +327,13 @@ def tick_parametric_spell(instance: Any, spell: dict[str, Any]) -> None:
 
         apply_enemy_damage(enemy, damage)
 
-        if spell["remaining"] <= 0.0:
+        if spell.remaining <= 0.0:
             return
 
 
 def _spawn_split_projectiles(
     instance: Any,
-    spell: dict[str, Any],
+    spell: ActiveSpell,
 ) -> None:
     """
     Fragmente le sort en N sous-projectiles en éventail.
@@ -351,42 +345,27 @@ def _spawn_split_projectiles(
     du sort.  Chaque fragment est plus petit, plus rapide et fait moins de
     dégâts que le sort parent.  Ils ne peuvent pas se fragmenter à nouveau.
     """
-    n = max(2, min(int(spell.get("split_count", 2)), 8))
+    n = max(2, min(spell.split_count, 8))
 
     # Direction d'origine du sort
-    dir_x = float(spell.get("spell_dir_x", 1.0))
-    dir_y = float(spell.get("spell_dir_y", 0.0))
-    base_angle = math.atan2(dir_y, dir_x)
+    base_angle = math.atan2(spell.spell_dir_y, spell.spell_dir_x)
 
     # Angle d'éventail total : 60° pour 2-3 fragments, 90° pour 4+
     spread_total = math.pi / 3.0 if n <= 3 else math.pi / 2.0
 
     # Vitesse des fragments (au moins 280 px/s, légèrement supérieure au parent)
-    parent_speed = math.hypot(
-        float(spell.get("velocity_x", 0.0)),
-        float(spell.get("velocity_y", 0.0)),
-    )
+    parent_speed = math.hypot(spell.velocity_x, spell.velocity_y)
     frag_speed = max(parent_speed * 1.05, 280.0)
 
     # Rayon et dégâts réduits
-    parent_radius = float(spell.get("hitbox_radius", 16.0))
+    parent_radius = spell.hitbox_radius
     frag_radius   = _clamp(parent_radius * 0.65, _MIN_RADIUS, parent_radius)
 
-    parent_impact = float(spell.get("impact_damage", _BASE_DAMAGE))
-    frag_impact   = parent_impact * 0.55
-
-    parent_tick   = float(spell.get("tick_damage", 0.0))
-    frag_tick     = parent_tick * 0.4
+    frag_impact   = spell.impact_damage * 0.55
+    frag_tick     = spell.tick_damage * 0.4
 
     # Durée réduite (les fragments sont éphémères)
-    parent_dur    = float(spell.get("initial_duration", 2.0))
-    frag_duration = _clamp(parent_dur * 0.45, 0.25, 3.5)
-
-    tick_int = float(spell.get("tick_interval", _BASE_TICK_INTERVAL))
-    element  = spell.get("element", "neutral")
-    owner    = spell["owner_id"]
-    x        = float(spell["x"])
-    y        = float(spell["y"])
+    frag_duration = _clamp(spell.initial_duration * 0.45, 0.25, 3.5)
 
     for i in range(n):
         if n == 1:
@@ -399,38 +378,29 @@ def _spawn_split_projectiles(
         fdir_x  = math.cos(angle)
         fdir_y  = math.sin(angle)
 
-        instance.active_spells.append({
-            "spell_id":         "parametric",
-            "owner_id":         owner,
-            "element":          element,
-            "x":                x,
-            "y":                y,
-            "velocity_x":       fdir_x * frag_speed,
-            "velocity_y":       fdir_y * frag_speed,
-            "hitbox_radius":    frag_radius,
-            "hitbox_radius_x":  frag_radius,
-            "hitbox_radius_y":  frag_radius,
-            "ellipse_angle":    0.0,
-            "remaining":        frag_duration,
-            "initial_duration": frag_duration,
-            "tick_interval":    tick_int,
-            "tick_damage":      frag_tick,
-            "impact_damage":    frag_impact,
-            "next_tick_at":     time.time(),
-            "cone_half_angle":  0.0,
-            "spell_dir_x":      fdir_x,
-            "spell_dir_y":      fdir_y,
-            "pierce":           False,
-            "hit_targets":      [],
-            "compression":      0.0,
-            "fade_rate":        0.0,
-            "split_fragment":   True,   # garde-fou : les fragments ne se divisent pas
-        })
+        instance.active_spells.append(ActiveSpell(
+            spell_id="parametric",
+            owner_id=spell.owner_id,
+            element=spell.element,
+            x=spell.x,
+            y=spell.y,
+            velocity_x=fdir_x * frag_speed,
+            velocity_y=fdir_y * frag_speed,
+            hitbox_radius=frag_radius,
+            remaining=frag_duration,
+            tick_interval=spell.tick_interval,
+            tick_damage=frag_tick,
+            impact_damage=frag_impact,
+            next_tick_at=instance.clock(),
+            spell_dir_x=fdir_x,
+            spell_dir_y=fdir_y,
+            split_fragment=True,   # garde-fou : les fragments ne se divisent pas
+        ))
 
 
 def _spawn_aoe_explosion(
     instance: Any,
-    spell: dict[str, Any],
+    spell: ActiveSpell,
     x: float,
     y: float,
 ) -> None:
@@ -441,73 +411,85 @@ def _spawn_aoe_explosion(
     de zone et expire normalement.  Le `fade_rate` lui donne un effet de
     dissolution visuelle.
     """
-    radius   = float(spell.get("aoi_radius",       60.0))
-    duration = float(spell.get("aoi_duration",      1.5))
-    tick_dmg = float(spell.get("aoi_tick_damage",  _BASE_DAMAGE * 0.5))
-    tick_int = float(spell.get("aoi_tick_interval", _BASE_TICK_INTERVAL))
+    radius = spell.aoi_radius
 
     # Clamp position sur la carte
     map_w, map_h = instance.map_data.get("size", [1280, 720])
     cx = _clamp(x, radius, max(radius, map_w - radius))
     cy = _clamp(y, radius, max(radius, map_h - radius))
 
-    instance.active_spells.append({
-        "spell_id":         "parametric",
-        "owner_id":         spell["owner_id"],
-        "element":          spell.get("element", "neutral"),
-        "x":                cx,
-        "y":                cy,
-        "velocity_x":       0.0,
-        "velocity_y":       0.0,
-        "hitbox_radius":    radius,
-        "hitbox_radius_x":  radius,
-        "hitbox_radius_y":  radius,
-        "ellipse_angle":    0.0,
-        "remaining":        duration,
-        "initial_duration": duration,
-        "tick_interval":    tick_int,
-        "tick_damage":      tick_dmg,
-        "impact_damage":    0.0,          # l'explosion ne fait pas d'impact
-        "next_tick_at":     time.time(),
-        "cone_half_angle":  0.0,
-        "spell_dir_x":      1.0,
-        "spell_dir_y":      0.0,
-        "pierce":           False,
-        "hit_targets":      [],
-        "compression":      0.0,
-        "fade_rate":        0.35,         # se dissout progressivement
-        "aoi_explosion":    True,         # flag debug / réseau
-    })
-
-
-def resolve_spell_vs_spell(active: list[dict]) -> list[dict]:
+    instance.active_spells.append(ActiveSpell(
+        spell_id="parametric",
+        owner_id=spell.owner_id,
+        element=spell.element,
+        x=cx,
+        y=cy,
+        hitbox_radius=radius,
+        remaining=spell.aoi_duration,
+        tick_interval=spell.aoi_tick_interval,
+        tick_damage=spell.aoi_tick_damage,
+        impact_damage=0.0,          # l'explosion ne fait pas d'impact
+        next_tick_at=instance.clock(),
+        fade_rate=0.35,             # se dissout progressivement
+        aoi_explosion=True,         # flag debug / réseau
+    ))
+
+
+def resolve_spell_vs_spell(active: list[ActiveSpell]) -> list[ActiveSpell]:
     """
     Collision sort-vs-sort : le sort avec la compression la plus elevee
     absorbe l'autre en cas de chevauchement significatif.
     Les sorts du meme proprietaire ne se neutralisent pas.
+
+    Broad phase sort-and-sweep sur l'axe x : seules les paires dont les
+    extents se chevauchent sont testees.  Les paires sont ensuite resolues
+    dans l'ordre (i, j) croissant, comme l'ancienne double boucle, pour
+    garder exactement le meme ordre de suppression.
     """
     to_remove: set[int] = set()
-    for i in range(len(active)):
-        for j in range(i + 1, len(active)):
-            if i in to_remove or j in to_remove:
+    for i, j in _overlapping_spell_pairs(active):
+        if i in to_remove or j in to_remove:
+            continue
+        ci = active[i].compression
+        cj = active[j].compression
+        if ci > cj:
+            to_remove.add(j)
+        elif cj > ci:
+            to_remove.add(i)
+        # egalite : les deux survivent
+    if not to_remove:
+        return active
+    return [s for k, s in enumerate(active) if k not in to_remove]
+
+
+def _overlapping_spell_pairs(active: list[ActiveSpell]) -> list[tuple[int, int]]:
+    """Paires (i, j), i < j, de proprietaires differents qui se chevauchent, triees."""
+    # Chevauchement : dist < (ri + rj) / 2, donc |dx| < ri/2 + rj/2.
+    # La marge garde la broad phase conservatrice face aux arrondis.
+    half_extents = [s.bounding_radius * 0.5 + _SWEEP_MARGIN for s in active]
+    order = sorted(range(len(active)), key=lambda k: active[k].x - half_extents[k])
+
+    pairs: list[tuple[int, int]] = []
+    sweep: list[int] = []
+    for k in order:
+        sk = active[k]
+        start = sk.x - half_extents[k]
+        sweep = [m for m in sweep if active[m].x + half_extents[m] > start]
+        for m in sweep:
+            sm = active[m]
+            if sm.owner_id == sk.owner_id:
                 continue
-            si, sj = active[i], active[j]
-            if si.get("owner_id") == sj.get("owner_id"):
+            if abs(sm.y - sk.y) >= half_extents[m] + half_extents[k]:
                 continue
-            dist = math.hypot(si["x"] - sj["x"], si["y"] - sj["y"])
-            ri = max(si.get("hitbox_radius_x", si["hitbox_radius"]),
-                     si.get("hitbox_radius_y", si["hitbox_radius"]))
-            rj = max(sj.get("hitbox_radius_x", sj["hitbox_radius"]),
-                     sj.get("hitbox_radius_y", sj["hitbox_radius"]))
-            if dist < (ri + rj) * 0.5:
-                ci = si.get("compression", 0.0)
-                cj = sj.get("compression", 0.0)
-                if ci > cj:
-                    to_remove.add(j)
-                elif cj > ci:
-                    to_remove.add(i)
-                # egalite : les deux survivent
-    return [s for k, s in enumerate(active) if k not in to_remove]
+            if sm.compression == sk.compression:
+                continue  # egalite : aucun effet
+            dist = math.hypot(sm.x - sk.x, sm.y - sk.y)
+            if dist < (sm.bounding_radius + sk.bounding_radius) * 0.5:
+                pairs.append((m, k) if m < k else (k, m))
+        sweep.append(k)
+
+    pairs.sort()
+    return pairs
 
 
 PARAMETRIC_SPELL_DEFINITION = ServerSpellDefinition(
@@ -3,8 +3,10 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Callable, Iterator
 
+from server.spells.active_spell import ActiveSpell
+
 ServerCastHandler = Callable[[Any, str, dict[str, Any], list[dict[str, Any]]], None]
-ServerTickHandler = Callable[[Any, dict[str, Any]], None]
+ServerTickHandler = Callable[[Any, ActiveSpell], None]
 
 
 @dataclass(slots=True, frozen=True)
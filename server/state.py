@@ -1,3 +1,4 @@
-CLIENTS = {}
+CLIENTS = {}  # client_id -> ClientConnection
 INSTANCES = {}
+CLIENT_INSTANCES = {}  # client_id -> GameInstance du joueur
 CLIENT_SEQ = 0